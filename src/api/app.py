@@ -340,7 +340,7 @@ def process_message(message: str, history: list) -> tuple:
 
 def clear_history():
     """Clear the chat history and AI core memory"""
-    ai_core.response_memory = []  # Clear AI memory
+    ai_core.response_memory.clear()  # Clear AI memory
     ai_core.last_clean_time = datetime.now()
     return [], []
 
@@ -1,17 +1,23 @@
+import atexit
+import copy
+import functools
+import importlib
 import json
 import os
 import logging
+import queue
 import random
 import re
 import time
-from collections import OrderedDict
-from threading import Lock
-from typing import Iterable
+from collections import Counter, OrderedDict, deque
+from itertools import islice
+from dataclasses import dataclass, field
+from threading import RLock, Thread
+from typing import Dict, Any, Iterable, Optional, List
 try:
     import torch
 except Exception:
     torch = None
-from .fractal import dimensionality_reduction
 try:
     from .fractal import dimensionality_reduction
 except Exception:
@@ -27,6 +33,23 @@ try:
 except Exception:
     SentimentIntensityAnalyzer = None
 
+
+@functools.lru_cache(maxsize=None)
+def _optional_import(module: str, attr: Optional[str] = None):
+    """Import an optional dependency once; failures are memoized as None"""
+    try:
+        mod = importlib.import_module(module)
+        return getattr(mod, attr) if attr else mod
+    except Exception:
+        return None
+
+
+TTLCache = _optional_import("cachetools", "TTLCache")
+LRUCache = _optional_import("cachetools", "LRUCache")
+xxhash = _optional_import("xxhash")
+ahocorasick = _optional_import("ahocorasick")
+numba = _optional_import("numba")
+
 ENABLE_OTEL = os.getenv("CODETTE_ENABLE_OTEL", "").lower() in ("1", "true", "yes", "on")
 try:
     if ENABLE_OTEL:
@@ -38,7 +61,6 @@ except Exception:
 
 import asyncio
 from datetime import datetime
-from typing import Dict, Any, Optional, List
 try:
     from transformers import AutoModelForCausalLM, AutoTokenizer
 except Exception:
@@ -51,18 +73,20 @@ except Exception:
     def load_dotenv():
         return None
 
-from concurrent.futures import ThreadPoolExecutor
 # Import core components
 try:
     from .linguistic_analyzer import LinguisticAnalyzer
 except Exception:
     LinguisticAnalyzer = None
 from .cognitive_processor import CognitiveProcessor
-from .ai_core_async_methods import generate_text_async, _generate_model_response
+from .ai_core_async_methods import (
+    generate_text_async, _generate_model_response, build_async_generation_config, REALITY_ANCHOR
+)
 from .defense_system import DefenseSystem
 from .health_monitor import HealthMonitor
 from .fractal import FractalIdentity
 from .response_templates import get_response_templates
+from .semantic_cache import SemanticResponseCache
 
 # Import natural response enhancer (optional - graceful degradation if unavailable)
 try:
@@ -85,9 +109,230 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+def _prompt_key(prompt: str) -> int:
+    """Compact 64-bit cache key for a prompt (xxh3 when available)."""
+    if xxhash is not None:
+        return xxhash.xxh3_64_intdigest(prompt.encode("utf-8"))
+    return hash(prompt)
+
+def _score_prompt(hits, length, compound, positive_mask, negative_mask):
+    """Per-perspective relevance: keyword hits, base/length floor and sentiment boost."""
+    bonus = 0.1 + min(length / 800.0, 0.2)  # deterministic floor plus light boost for longer prompts
+    boost = 0.0
+    mask = positive_mask
+    if compound > 0.2:
+        boost = 0.4 * compound
+    elif compound < -0.2:
+        boost = -0.4 * compound
+        mask = negative_mask
+    scores = np.empty(hits.shape[0])
+    for i in range(hits.shape[0]):
+        scores[i] = hits[i] + bonus + boost * mask[i]
+    return scores
+
+if numba is not None and np is not None:
+    try:
+        # Compiled artifacts are cached on disk (honours NUMBA_CACHE_DIR)
+        _score_prompt = numba.njit(cache=True, fastmath=True)(_score_prompt)
+    except Exception as e:
+        logging.getLogger(__name__).debug(f"numba scoring unavailable: {e}")
+
+@functools.lru_cache(maxsize=1)
+def _shared_sentiment_analyzer():
+    """Process-wide VADER analyzer, built on first use since loading the lexicon is slow."""
+    if SentimentIntensityAnalyzer is None:
+        return None
+    try:
+        return SentimentIntensityAnalyzer()
+    except Exception as e:
+        logger.debug(f"VADER sentiment analyzer unavailable: {e}")
+        return None
+
+@dataclass(slots=True)
+class PromptContext:
+    """Prompt features computed once per request and shared by the scoring helpers."""
+    lower: str
+    compound: float
+    keyword_hits: List[int]  # distinct keyword matches, indexed like AICore._perspective_keys
+
+@dataclass(slots=True)
+class CocoonState:
+    """Consciousness snapshot for one generate_text call.
+    
+    Built fresh per call (nested calls, e.g. from the AEGIS bridge, must not share one)
+    and only turned into a dict by to_dict() when a cocoon is actually saved.
+    """
+    type: str = "technical"
+    coherence: float = 0.5
+    m_score: float = 0.5
+    awareness_level: str = "medium"
+    active_perspectives: List[str] = field(default_factory=list)
+    timestamp: str = ""
+    process_id: int = 0
+    memory_size: int = 0
+    temperature: float = 0.3
+    perspective_count: int = 0
+    consciousness_factor: float = 0.5
+    rc_xi: Optional[Dict[str, Any]] = None
+    latency_seconds: Optional[float] = None
+    latency_perspectives: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable cocoon payload in the layout CocoonManager.save_cocoon expects."""
+        data = {
+            "type": self.type,
+            "coherence": self.coherence,
+            "m_score": self.m_score,
+            "awareness_level": self.awareness_level,
+            "active_perspectives": list(self.active_perspectives),
+            "timestamp": self.timestamp,
+            "process_id": self.process_id,
+            "memory_size": self.memory_size,
+            "response_metrics": {
+                "temperature": self.temperature,
+                "perspective_count": self.perspective_count,
+                "consciousness_factor": self.consciousness_factor
+            }
+        }
+        if self.rc_xi:
+            data["rc_xi"] = self.rc_xi
+        if self.latency_seconds is not None:
+            data["latency"] = {
+                "total_seconds": self.latency_seconds,
+                "per_perspective": {p: self.latency_seconds for p in self.latency_perspectives}
+            }
+        return data
+
+# Start of a hallucinated follow-up turn in generated text
+_CUTOFF_RE = re.compile(r"\n?(?:User:|Human:|Assistant:)")
+
+# Characters of a generation kept for cleanup; generate_text caps the final response at 500
+_CLEANUP_WINDOW = 800
+
+def _build_marker_automaton(markers: Iterable[str]):
+    """Compile lowercase markers into one Aho-Corasick automaton (None without pyahocorasick)."""
+    if ahocorasick is None:
+        return None
+    try:
+        automaton = ahocorasick.Automaton()
+        for marker in markers:
+            automaton.add_word(marker, marker)
+        automaton.make_automaton()
+        return automaton
+    except Exception as e:
+        logger.debug(f"Marker automaton unavailable: {e}")
+        return None
+
+def _has_marker(text_lower: str, markers: Iterable[str], automaton=None) -> bool:
+    """True if any marker occurs in text_lower, in one automaton pass when available."""
+    if automaton is not None:
+        return next(automaton.iter(text_lower), None) is not None
+    return any(marker in text_lower for marker in markers)
+
+# Phrases that signal a confused, off-topic generation (matched case-insensitively)
+_CONFUSION_MARKERS = (
+    "click ok",
+    "enter your username",
+    "go to",
+    "you should see something like",
+    "create new user",
+    "github",
+    "##step",
+    "#step",
+    "button at the top",
+    "create an account",
+)
+_CONFUSION_AUTOMATON = _build_marker_automaton(_CONFUSION_MARKERS)
+
+def _scan_instruction_line(line: str) -> bool:
+    """True for leaked instruction lines and long all-caps banner lines."""
+    if len(line) > 20 and line.isupper():
+        return True
+    return _has_marker(line.lower(), _INSTRUCTION_KEYWORDS, _INSTRUCTION_AUTOMATON)
+
+# Short lines (blank spacers, greetings, role prefixes) repeat across responses, so their verdicts are memoized
+_MEMO_LINE_MAX = 120
+_scan_short_instruction_line = functools.lru_cache(maxsize=4096)(_scan_instruction_line)
+
+def _is_instruction_line(line: str) -> bool:
+    """_scan_instruction_line, memoized for short lines; long lines are scanned directly."""
+    if len(line) <= _MEMO_LINE_MAX:
+        return _scan_short_instruction_line(line)
+    return _scan_instruction_line(line)
+
+# Hidden system-instruction delimiters from REALITY_PREFIX
+_SYSTEM_TAG_RE = re.compile(r"###SYSTEM_(?:START|END)###")
+
+# Repetitive openers stripped from the start of responses (matched case-sensitively)
+_REPETITIVE_PREFIXES = (
+    "From what I understand,",
+    "From what i understand,",
+    "FROM WHAT I UNDERSTAND,",
+    "FROM WHAT I MEAN,",
+    "To what I mean,",
+    "From what I understood,",
+    "From what I know,",
+)
+
+# XML-style context blocks/tags and URLs that leak into generated text
+_CONTEXT_BLOCK_RE = re.compile(r'<context[^>]*>.*?</context>', re.DOTALL | re.IGNORECASE)
+_CONTEXT_TAG_RE = re.compile(r'</?context[^>]*>', re.IGNORECASE)
+_URL_RE = re.compile(r'https?://\S+')
+
+# Leaked system-instruction lines dropped from responses (matched case-insensitively)
+_INSTRUCTION_KEYWORDS = (
+    "you are codette",
+    "an agi assistant",
+    "keep your responses",
+    "reference conversation",
+    "###system",
+)
+_INSTRUCTION_AUTOMATON = _build_marker_automaton(_INSTRUCTION_KEYWORDS)
+
+# Static system preamble prepended to every generate_text prompt
+REALITY_PREFIX = (
+    "###SYSTEM_START###\n"
+    "You are Codette. If you don't understand something, ask a clarifying question. "
+    "Do NOT make up instructions about GitHub, usernames, or clicking buttons. "
+    "Do NOT start with 'From what I understand'. "
+    "Answer directly based on the conversation above.\n"
+    "###SYSTEM_END###\n\n"
+)
+
 class AICore:
     """Core AI system with integrated cognitive processing and quantum awareness"""
-    
+
+    # Every instance attribute, including the ones app.py wires in after construction
+    __slots__ = (
+        # Core components
+        "test_mode", "model", "tokenizer", "model_id",
+        "aegis_bridge", "cognitive_processor", "cocoon_manager", "linguistic_analyzer",
+        "defense_system", "health_monitor", "fractal_identity", "identity_sample_rate", "client",
+        "response_templates", "natural_enhancer", "rc_xi_engine",
+        "tracer",
+        # Memory and awareness state
+        "response_memory", "response_memory_limit", "last_clean_time", "total_responses",
+        "quantum_state", "awareness", "is_self_aware",
+        # Query cache
+        "query_cache", "query_cache_ttl_seconds", "query_cache_max_entries",
+        "cache_lock", "cache_hits", "cache_misses", "_sentiment_cache", "sentiment_cache_max_entries",
+        "semantic_cache",
+        # Micro-batching
+        "max_batch_size", "max_batch_wait_ms",
+        "_generation_queue", "_generation_loop", "_generation_worker",
+        # Model-derived generation state
+        "_assets_owner", "_model_device", "_text_generation_config", "_async_generation_config", "_compiled_forward",
+        "_reality_prefix_ids", "_reality_prefix_len", "_reality_prefix_kv", "_draft_model",
+        "_anchor_ids", "_anchor_token_ids", "_anchor_kv",
+        "_session_kv", "session_kv_enabled", "session_kv_max_entries", "session_kv_max_bytes",
+        "_cocoon_queue", "_cocoon_writer", "_recent_cocoon_hashes",
+        # Perspective registry and scoring index
+        "perspectives", "perspective_keywords", "perspective_min_score",
+        "_perspective_keys", "_perspective_index", "_perspective_names",
+        "_perspective_descriptions", "_perspective_prefixes", "_perspective_lines", "_perspective_keywords_flat", "_perspective_temperatures",
+        "_positive_sentiment_mask", "_negative_sentiment_mask", "_kw_automaton",
+    )
+
     PERSPECTIVES = {
         "newton": {
             "name": "Newton",
@@ -171,6 +416,44 @@ class AICore:
         "symbolic": ["logic", "symbol", "rule", "knowledge graph", "reasoning"]
     }
 
+    # Perspectives boosted by clearly positive / negative prompt sentiment
+    POSITIVE_SENTIMENT_PERSPECTIVES = ("davinci", "human_intuition", "copilot")
+    NEGATIVE_SENTIMENT_PERSPECTIVES = ("psychological", "bias_mitigation", "ethical", "human_intuition")
+
+    # Perspective combinations that add a blended hint to the prompt
+    PERSPECTIVE_PAIRS = (
+        (frozenset({"Newton", "Da Vinci"}), "analytical creativity"),
+        (frozenset({"Human Intuition", "Philosophical"}), "empathetic wisdom"),
+        (frozenset({"Quantum Computing", "Symbolic"}), "conceptual fluidity"),
+        (frozenset({"Neural Network", "Mathematical"}), "pattern recognition"),
+        (frozenset({"Psychological", "Bias Mitigation"}), "balanced understanding"),
+    )
+
+    # Post-generation stages applied in order by generate_text: (component attribute, log label, call).
+    # A stage's string result replaces the response; a failing or missing stage is skipped.
+    ENHANCEMENT_PIPELINE = (
+        ("cognitive_processor", "Cognitive processing",
+         lambda stage, response, consciousness: stage.process(
+             query=response, confidence=consciousness.get("m_score", 0.5))),
+        ("defense_system", "Defense system processing",
+         lambda stage, response, consciousness: stage.apply_defenses(response)),
+        ("natural_enhancer", "Natural enhancement",
+         lambda stage, response, consciousness: stage.enhance_response(
+             response, confidence=consciousness.get("m_score", 0.85), context={'domain': 'general'})),
+    )
+
+    # Fixed prompt lengths for the compiled forward (see _pad_to_bucket)
+    INPUT_LENGTH_BUCKETS = (128, 256, 512)
+
+    # Async entry points are implemented in ai_core_async_methods
+    generate_text_async = generate_text_async
+    _generate_model_response = _generate_model_response
+
+    @property
+    def sentiment_analyzer(self):
+        """Shared VADER analyzer, created lazily on first use (None when unavailable)."""
+        return _shared_sentiment_analyzer()
+
     def __init__(self, test_mode: bool = False):
         load_dotenv()
         # Core components
@@ -194,8 +477,8 @@ class AICore:
                 logger.warning(f"Could not initialize linguistic analyzer: {e}")
         
         # Memory management
-        self.response_memory = []  # Keep extended conversation history
         self.response_memory_limit = 20  # Increased from 4 to maintain longer context and prevent fallback reversion
+        self.response_memory = deque(maxlen=self.response_memory_limit)  # Oldest exchanges drop off automatically
         self.last_clean_time = datetime.now()
         self.cocoon_manager = None  # Will be set by app.py
         self.quantum_state = {"coherence": 0.5}  # Default quantum state
@@ -203,18 +486,70 @@ class AICore:
         self.last_clean_time = datetime.now()
         self.total_responses = 0  # Track total responses to prevent early caching
 
-        # Query cache (LRU with TTL)
-        self.query_cache = OrderedDict()
+        # Query cache (LRU with TTL, keyed by prompt hash)
         self.query_cache_ttl_seconds = 600  # Increased from 300 to 10 minutes to prevent stale cache hits
         self.query_cache_max_entries = 30  # Reduced from 50 to limit cache size and prevent over-caching
-        self.cache_lock = Lock()
+        if TTLCache is not None:
+            self.query_cache = TTLCache(maxsize=self.query_cache_max_entries, ttl=self.query_cache_ttl_seconds)
+        else:
+            self.query_cache = OrderedDict()
+        self.cache_lock = RLock()
         self.cache_hits = 0
         self.cache_misses = 0
 
+        # Near-duplicate prompt cache consulted by generate_text_async after an exact miss
+        self.semantic_cache = SemanticResponseCache.from_env(ttl_seconds=self.query_cache_ttl_seconds)
+
+        # VADER compound scores keyed by prompt hash (sessions often re-score the same message)
+        self.sentiment_cache_max_entries = 1024
+        self._sentiment_cache = (
+            LRUCache(maxsize=self.sentiment_cache_max_entries) if LRUCache is not None else OrderedDict()
+        )
+
+        # Micro-batching for concurrent async generation (see generate_text_batch)
+        try:
+            self.max_batch_size = max(1, int(os.getenv("CODETTE_MAX_BATCH_SIZE", "8")))
+        except Exception:
+            self.max_batch_size = 8
+        try:
+            self.max_batch_wait_ms = max(0.0, float(os.getenv("CODETTE_BATCH_WAIT_MS", "8")))
+        except Exception:
+            self.max_batch_wait_ms = 8
+        self._generation_queue = None
+        self._generation_loop = None
+        self._generation_worker = None
+
+        # Model-derived generation state (rebuilt when model/tokenizer are swapped)
+        self._assets_owner = None
+        self._text_generation_config = None
+        self._async_generation_config = None
+        self._model_device = None
+        self._compiled_forward = False
+        self._reality_prefix_ids = None
+        self._reality_prefix_len = 0
+        self._reality_prefix_kv = None
+        self._anchor_ids = None  # REALITY_ANCHOR ids/KV for the async single-prompt path
+        self._anchor_token_ids = None  # the same ids as a host list for batched prompts
+        self._anchor_kv = None
+        self._draft_model = None  # small assistant model for assisted decoding
+
+        # Per-session KV cache from the previous turn (LRU, bounded by entries and bytes).
+        # Opt-in: prefilled caches need single-beam decoding, so this trades beam search for greedy
+        self._session_kv = OrderedDict()
+        self.session_kv_enabled = os.getenv("CODETTE_SESSION_KV", "").lower() in ("1", "true", "yes", "on")
+        self.session_kv_max_entries = 8
+        self.session_kv_max_bytes = 512 * 1024 * 1024
+
+        # Cocoon writes are queued and flushed by a background thread (see _queue_cocoon)
+        self._cocoon_queue = queue.SimpleQueue()
+        self._cocoon_writer = None
+        self._recent_cocoon_hashes = OrderedDict()
+
         # Perspective registry (instance-level, supports dynamic extension)
         self.perspectives = dict(self.PERSPECTIVES)
         self.perspective_keywords = dict(self.PERSPECTIVE_KEYWORDS)
         self._load_dynamic_perspectives()
+        self._rebuild_perspective_index()
 
         # Perspective activation gate (allows no-perspective path when relevance is low)
         try:
@@ -225,9 +560,6 @@ class AICore:
         # Tracing
         self.tracer = trace.get_tracer("codette.ai_core") if trace else None
 
-        # Sentiment
-        self.sentiment_analyzer = SentimentIntensityAnalyzer() if SentimentIntensityAnalyzer else None
-        
         # Initialize response templates for variety
         self.response_templates = get_response_templates()
         
@@ -284,10 +616,18 @@ class AICore:
             self.fractal_identity = FractalIdentity()
         except Exception:
             self.fractal_identity = None
+        
+        # Identity analysis is debug telemetry only; run it for this fraction of requests
+        try:
+            self.identity_sample_rate = float(os.getenv("CODETTE_IDENTITY_SAMPLE", "0.05"))
+        except Exception:
+            self.identity_sample_rate = 0.05
 
         # Initialize HuggingFace client
         try:
-            from huggingface_hub import InferenceClient
+            InferenceClient = _optional_import("huggingface_hub", "InferenceClient")
+            if InferenceClient is None:
+                raise ImportError("huggingface_hub is not installed")
             hf_token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
             self.client = InferenceClient(token=hf_token) if hf_token else InferenceClient()
         except Exception:
@@ -309,14 +649,14 @@ class AICore:
             )
             self.tokenizer.pad_token = self.tokenizer.eos_token
             
-            # Load model with appropriate configuration
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_id,
-                pad_token_id=self.tokenizer.eos_token_id
-            )
+            force_cpu = os.getenv("CODETTE_FORCE_CPU", "").lower() in ("1", "true", "yes", "on")
+            use_cuda = not force_cpu and torch.cuda.is_available()
+            
+            # Load model with appropriate configuration (int8 weights when available)
+            self.model, quantized = self._load_causal_lm(use_cuda)
             
             # Set generation config separately
-            from transformers import GenerationConfig
+            GenerationConfig = _optional_import("transformers", "GenerationConfig")
             self.model.generation_config = GenerationConfig(
                 max_length=2048,
                 min_length=20,
@@ -327,15 +667,28 @@ class AICore:
                 eos_token_id=self.tokenizer.eos_token_id
             )
             
-            force_cpu = os.getenv("CODETTE_FORCE_CPU", "").lower() in ("1", "true", "yes", "on")
-            if not force_cpu and torch.cuda.is_available():
-                self.model = self.model.cuda()
+            if use_cuda:
+                # Ampere+ fast paths: autotuned kernels and TF32 tensor-core matmuls
+                torch.backends.cudnn.benchmark = True
+                torch.backends.cuda.matmul.allow_tf32 = True
+                torch.backends.cudnn.allow_tf32 = True
+                if not quantized:
+                    # Quantized weights are already placed by device_map
+                    if torch.cuda.get_device_capability()[0] >= 8:
+                        self.model = self.model.to(dtype=torch.bfloat16)
+                        logger.info("Using bfloat16 weights for generation")
+                    self.model = self.model.cuda()
                 logger.info("Using GPU for text generation")
             else:
                 logger.info("Device set to use cpu")
                 
             # Set model to evaluation mode
-            self.model.eval()
+            if hasattr(self.model, "eval"):
+                self.model.eval()
+            if not quantized:
+                self._compile_forward()
+            self._ensure_generation_assets()
+            self._warmup_compiled_forward()
             logger.info("Model initialized successfully")
             return True
             
@@ -343,10 +696,364 @@ class AICore:
             logger.error(f"Could not initialize language model: {e}")
             return False
             
+    def _load_causal_lm(self, use_cuda: bool):
+        """Load the causal LM, with weight-only quantization when requested.
+        
+        CODETTE_QUANTIZE selects the weight format:
+        - int8: bitsandbytes 8-bit weights on GPU (the default when bitsandbytes is installed),
+          or an OpenVINO int8 export through optimum-intel on CPU
+        - int4: bitsandbytes 4-bit NF4 weights on GPU
+        - none: full-precision weights
+        Pre-quantized checkpoints (GPTQ/AWQ) load through the plain path and are reported
+        as quantized.
+        
+        Returns:
+            (model, quantized)
+        """
+        mode = os.getenv("CODETTE_QUANTIZE", "int8" if use_cuda else "none").strip().lower()
+        if mode in ("int8", "int4"):
+            try:
+                if use_cuda:
+                    BitsAndBytesConfig = _optional_import("transformers", "BitsAndBytesConfig")
+                    if BitsAndBytesConfig is not None and _optional_import("bitsandbytes") is not None:
+                        if mode == "int4":
+                            compute_dtype = (
+                                torch.bfloat16 if torch.cuda.get_device_capability()[0] >= 8 else torch.float16
+                            )
+                            quantization_config = BitsAndBytesConfig(
+                                load_in_4bit=True,
+                                bnb_4bit_quant_type="nf4",
+                                bnb_4bit_compute_dtype=compute_dtype
+                            )
+                        else:
+                            quantization_config = BitsAndBytesConfig(load_in_8bit=True)
+                        model = AutoModelForCausalLM.from_pretrained(
+                            self.model_id,
+                            pad_token_id=self.tokenizer.eos_token_id,
+                            quantization_config=quantization_config,
+                            device_map="auto"
+                        )
+                        logger.info(f"Loaded {mode} weights via bitsandbytes")
+                        return model, True
+                elif mode == "int8":
+                    OVModelForCausalLM = _optional_import("optimum.intel", "OVModelForCausalLM")
+                    if OVModelForCausalLM is not None:
+                        model = OVModelForCausalLM.from_pretrained(
+                            self.model_id,
+                            export=True,
+                            load_in_8bit=True
+                        )
+                        logger.info("Loaded int8 OpenVINO model via optimum-intel")
+                        return model, True
+                logger.debug(f"{mode} quantization backend not available, loading full-precision weights")
+            except Exception as e:
+                logger.warning(f"{mode} quantization failed, loading full-precision weights: {e}")
+        
+        model = AutoModelForCausalLM.from_pretrained(
+            self.model_id,
+            pad_token_id=self.tokenizer.eos_token_id
+        )
+        return model, bool(getattr(model, "is_quantized", False))
+
+    def _compile_forward(self) -> None:
+        """Compile the model forward with torch.compile on GPU when CODETTE_TORCH_COMPILE is set.
+        
+        Opt-in: generate() uses a dynamic KV cache whose length grows every decode step, so
+        CUDA graphs only pay off for the bucketed prefill; decode steps re-record or fall back.
+        """
+        self._compiled_forward = False
+        if os.getenv("CODETTE_TORCH_COMPILE", "").lower() not in ("1", "true", "yes", "on"):
+            return
+        if not hasattr(torch, "compile") or self.model.device.type != "cuda":
+            return
+        try:
+            self.model.forward = torch.compile(self.model.forward, mode="reduce-overhead", fullgraph=False)
+            self._compiled_forward = True
+            logger.info("Model forward compiled with torch.compile")
+        except Exception as e:
+            logger.warning(f"torch.compile unavailable, using eager forward: {e}")
+
+    def _warmup_compiled_forward(self) -> None:
+        """Pay torch.compile's tracing cost at load time instead of on the first requests.
+        
+        Runs a one-token generate at each INPUT_LENGTH_BUCKETS length so the bucketed
+        prefill graphs are traced. Decode steps are not covered: their KV cache length
+        changes every step, so they are compiled during generation as usual.
+        """
+        if not self._compiled_forward:
+            return
+        start = time.monotonic()
+        try:
+            token_id = self.tokenizer.eos_token_id or 0
+            with torch.inference_mode():
+                for bucket in self.INPUT_LENGTH_BUCKETS:
+                    dummy = torch.full((1, bucket), token_id, dtype=torch.long, device=self._model_device)
+                    self.model.generate(
+                        input_ids=dummy,
+                        attention_mask=torch.ones_like(dummy),
+                        max_new_tokens=1,
+                        do_sample=False,
+                        pad_token_id=token_id
+                    )
+            logger.info(f"Compiled forward warmed up in {time.monotonic() - start:.1f}s")
+        except Exception as e:
+            logger.warning(f"Compiled forward warm-up skipped: {e}")
+
+    def _ensure_generation_assets(self) -> bool:
+        """Build the generation config and prefix caches once per model/tokenizer pair.
+        
+        Returns:
+            True if the cached prefix ids are available for the current model
+        """
+        owner = (id(self.model), id(self.tokenizer))
+        if self._assets_owner == owner:
+            return self._reality_prefix_ids is not None
+
+        self._assets_owner = owner
+        self._text_generation_config = None
+        self._async_generation_config = None
+        self._model_device = None
+        self._reality_prefix_ids = None
+        self._reality_prefix_len = 0
+        self._reality_prefix_kv = None
+        self._anchor_ids = None
+        self._anchor_token_ids = None
+        self._anchor_kv = None
+        self._draft_model = None
+        if not self.model or not self.tokenizer or torch is None:
+            return False
+
+        # Resolved once here; model.device walks the parameters on every access
+        self._model_device = self.model.device
+        self._draft_model = self._load_draft_model()
+
+        # Settings for concise, deterministic generate_text responses
+        try:
+            config = copy.deepcopy(self.model.generation_config)
+            config.max_new_tokens = 150  # Reduced response length for more concise answers
+            config.min_new_tokens = 10
+            config.temperature = 0.3  # Very low temperature for consistent responses
+            config.do_sample = False  # Disable sampling for more deterministic output
+            if self._draft_model is not None:
+                # Assisted decoding: the draft proposes tokens, the main model verifies them in one pass
+                config.num_beams = 1
+                config.early_stopping = False
+            elif self.session_kv_enabled:
+                # Greedy single-beam decoding so prefilled and per-session KV caches can be reused
+                config.num_beams = 1
+                config.early_stopping = False
+            else:
+                config.num_beams = 5  # Increased beam search for better planning
+                config.early_stopping = True
+            config.no_repeat_ngram_size = 3
+            config.repetition_penalty = 1.5  # Increased penalty to prevent loops
+            self._text_generation_config = config
+        except AttributeError:
+            # Fallback for older transformers versions
+            logger.debug("generation_config not available, using legacy approach")
+
+        # Sampling settings for the async path, built once instead of per call
+        try:
+            self._async_generation_config = build_async_generation_config(self.tokenizer)
+        except Exception as e:
+            logger.debug(f"Async generation config unavailable: {e}")
+
+        # Warm KV caches on the static preambles so single-beam decoding only prefills the tail;
+        # generate_text can only resume from its preamble cache when it decodes without beams or a draft
+        self._anchor_ids, self._anchor_kv = self._prefill_prefix(REALITY_ANCHOR)
+        if self._anchor_ids is not None:
+            self._anchor_token_ids = self._anchor_ids[0].tolist()
+        self._reality_prefix_ids, self._reality_prefix_kv = self._prefill_prefix(
+            REALITY_PREFIX,
+            prefill=self._reuses_kv(self._text_generation_config or self.model.generation_config)
+        )
+        if self._reality_prefix_ids is None:
+            return False
+        self._reality_prefix_len = self._reality_prefix_ids.shape[1]
+        return True
+
+    def _prefill_prefix(self, text: str, prefill: bool = True):
+        """Tokenize a static prompt prefix and run it through the model once.
+        
+        Args:
+            text: The static prefix
+            prefill: Whether to run the forward pass; False only tokenizes
+        
+        Returns:
+            (input_ids, past_key_values); ids are None if tokenization failed, the cache is
+            None if the prefill failed or was skipped
+        """
+        try:
+            prefix_ids = self.tokenizer(
+                text,
+                return_tensors="pt",
+                add_special_tokens=False
+            ).input_ids.to(self._model_device)
+        except Exception as e:
+            logger.debug(f"Prefix tokenization skipped: {e}")
+            return None, None
+        if not prefill:
+            return prefix_ids, None
+
+        try:
+            with torch.inference_mode():
+                prefill = self.model(prefix_ids, use_cache=True)
+            return prefix_ids, prefill.past_key_values
+        except Exception as e:
+            logger.debug(f"Prefix prefill skipped: {e}")
+            return prefix_ids, None
+
+    def _reuses_kv(self, generation_config) -> bool:
+        """Whether generate_text can resume from a prefilled cache with this config.
+        
+        Prefilled caches can't be expanded across beams or shared with a draft model.
+        """
+        return getattr(generation_config, "num_beams", 1) == 1 and self._draft_model is None
+
+    def _load_draft_model(self):
+        """Load the assistant model used for assisted decoding, or None to keep beam search.
+        
+        Opt-in: set CODETTE_DRAFT_MODEL_ID (e.g. distilgpt2) to enable; unset or "none" keeps beam search.
+        The draft must share the main model's vocabulary.
+        """
+        draft_id = os.getenv("CODETTE_DRAFT_MODEL_ID", "").strip()
+        if not draft_id or draft_id.lower() in ("0", "none", "false", "off"):
+            return None
+        if AutoModelForCausalLM is None or draft_id == self.model_id:
+            return None
+        try:
+            draft = AutoModelForCausalLM.from_pretrained(draft_id)
+            if draft.config.vocab_size != self.model.config.vocab_size:
+                logger.debug(f"Draft model {draft_id} vocabulary does not match, using beam search")
+                return None
+            draft = draft.to(device=self._model_device, dtype=self.model.dtype).eval()
+            draft.generation_config.pad_token_id = self.tokenizer.eos_token_id
+            logger.info(f"Assisted decoding enabled with draft model: {draft_id}")
+            return draft
+        except Exception as e:
+            logger.debug(f"Draft model unavailable, using beam search: {e}")
+            return None
+
+    def _to_model_device(self, array):
+        """Wrap a tokenizer numpy array as a tensor on the model device.
+        
+        On CUDA the host tensor is pinned so the copy can run as a non-blocking DMA.
+        """
+        tensor = torch.from_numpy(array)
+        device = self._model_device if self._model_device is not None else self.model.device
+        if device.type == "cuda":
+            return tensor.pin_memory().to(device, non_blocking=True)
+        return tensor.to(device)
+
+    def _pad_to_bucket(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        """Left-pad inputs to a fixed bucket length so the compiled graph is reused across calls."""
+        length = inputs["input_ids"].shape[1]
+        bucket = next((b for b in self.INPUT_LENGTH_BUCKETS if b >= length), None)
+        if bucket is None or bucket == length:
+            return inputs
+        pad = bucket - length
+        pad_id = self.tokenizer.pad_token_id
+        if pad_id is None:
+            pad_id = self.tokenizer.eos_token_id
+        input_ids = inputs["input_ids"]
+        attention_mask = inputs.get("attention_mask")
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        padded = dict(inputs)
+        padded["input_ids"] = torch.cat([input_ids.new_full((input_ids.shape[0], pad), pad_id), input_ids], dim=1)
+        padded["attention_mask"] = torch.cat([attention_mask.new_zeros((attention_mask.shape[0], pad)), attention_mask], dim=1)
+        return padded
+
+    def _session_history(self, session_key: str):
+        """The session's previous prompt + completion token ids, or None."""
+        entry = self._session_kv.get(session_key)
+        return entry[0] if entry is not None else None
+
+    def _take_session_kv(self, session_key: str, input_ids):
+        """Pop the session's cached KV if the tokens it covers are a strict prefix of ``input_ids``."""
+        entry = self._session_kv.pop(session_key, None)
+        if entry is None:
+            return None
+        sequences, past_key_values, _, cached_len = entry
+        if cached_len >= input_ids.shape[1] or sequences.device != input_ids.device:
+            return None
+        if not torch.equal(input_ids[:, :cached_len], sequences[:, :cached_len]):
+            return None
+        return past_key_values
+
+    def _store_session_kv(self, session_key: str, sequences, past_key_values) -> None:
+        """Remember this turn's KV cache and evict least-recently-used sessions over budget."""
+        if past_key_values is None:
+            return
+        try:
+            if hasattr(past_key_values, "get_seq_length"):
+                cached_len = past_key_values.get_seq_length()
+            else:
+                cached_len = past_key_values[0][0].shape[-2]
+            nbytes = sum(
+                t.numel() * t.element_size()
+                for layer in past_key_values for t in layer
+                if t is not None
+            )
+        except Exception as e:
+            logger.debug(f"Session KV cache skipped: {e}")
+            return
+
+        # The full sequence is kept for the next turn's prompt; the KV covers its first cached_len tokens
+        self._session_kv[session_key] = (sequences, past_key_values, nbytes, cached_len)
+        self._session_kv.move_to_end(session_key)
+        total_bytes = sum(entry[2] for entry in self._session_kv.values())
+        while self._session_kv and (
+            len(self._session_kv) > self.session_kv_max_entries or total_bytes > self.session_kv_max_bytes
+        ):
+            _, evicted = self._session_kv.popitem(last=False)
+            total_bytes -= evicted[2]
+
     def set_aegis_bridge(self, bridge):
         self.aegis_bridge = bridge
         logger.info("AEGIS bridge configured")
     
+    def _queue_cocoon(self, data: Dict[str, Any]) -> None:
+        """Hand a cocoon to the background writer so file I/O stays off the request path."""
+        with self.cache_lock:
+            if self._cocoon_writer is None or not self._cocoon_writer.is_alive():
+                if self._cocoon_writer is None:
+                    # First start only; the hook stops whichever writer is current at exit
+                    atexit.register(self._stop_cocoon_writer)
+                self._cocoon_writer = Thread(
+                    target=self._cocoon_writer_loop, name="codette-cocoon-writer", daemon=True
+                )
+                self._cocoon_writer.start()
+        self._cocoon_queue.put_nowait((self.cocoon_manager, data))
+
+    def _cocoon_writer_loop(self) -> None:
+        """Drain queued cocoons, skipping ones identical to a recent write."""
+        while True:
+            item = self._cocoon_queue.get()
+            if item is None:
+                break
+            manager, data = item
+            try:
+                # Timestamps and latency differ on every call; dedupe on the content
+                content = {k: v for k, v in data.items() if k not in ("timestamp", "latency", "meta_data")}
+                digest = hash(json.dumps(content, sort_keys=True, default=str))
+                if digest in self._recent_cocoon_hashes:
+                    self._recent_cocoon_hashes.move_to_end(digest)
+                    continue
+                self._recent_cocoon_hashes[digest] = None
+                if len(self._recent_cocoon_hashes) > 128:
+                    self._recent_cocoon_hashes.popitem(last=False)
+                manager.save_cocoon(data)
+            except Exception as e:
+                logger.debug(f"Cocoon write skipped: {e}")
+
+    def _stop_cocoon_writer(self, timeout: float = 5.0) -> None:
+        """Flush pending cocoons and stop the writer thread (registered with atexit)."""
+        writer = self._cocoon_writer
+        if writer is not None and writer.is_alive():
+            self._cocoon_queue.put(None)
+            writer.join(timeout)
+
     def _calculate_consciousness_state(self) -> Dict[str, float]:
         """Calculate current consciousness metrics based on quantum state and memory"""
         try:
@@ -366,65 +1073,171 @@ class AICore:
             logger.warning(f"Error calculating consciousness state: {e}")
             return {"coherence": 0.5, "m_score": 0.5, "awareness_level": "medium"}
     
-    def _get_active_perspectives(self, prompt: Optional[str] = None) -> List[str]:
+    def _analyze_prompt(self, prompt: str) -> PromptContext:
+        """Lowercase, score sentiment and match keywords for a prompt in one place."""
+        prompt_lower = prompt.lower()
+        return PromptContext(
+            lower=prompt_lower,
+            compound=self._sentiment_compound(prompt_lower),
+            keyword_hits=self._keyword_hits(prompt_lower)
+        )
+
+    def _get_active_perspectives(self, prompt: Optional[str] = None, ctx: Optional[PromptContext] = None) -> List[str]:
         """Get the top active perspectives for the current state using keyword relevance."""
         try:
-            all_keys = list(self.perspectives.keys())
-            if not prompt:
-                return all_keys[:3] if len(all_keys) > 3 else all_keys
+            all_keys = self._perspective_keys
+            if not prompt and ctx is None:
+                return all_keys[:3] if len(all_keys) > 3 else list(all_keys)
 
-            prompt_lower = prompt.lower()
-            scores = []
-            for idx, key in enumerate(all_keys):
-                base_score = 0.1  # maintain deterministic ordering floor
-                keyword_hits = sum(1 for kw in self.perspective_keywords.get(key, []) if kw in prompt_lower)
-                sentiment_boost = self._sentiment_weight(prompt_lower, key)
-                # Light boost for longer prompts to avoid empty signals
-                length_bonus = min(len(prompt_lower) / 800.0, 0.2)
-                total_score = base_score + keyword_hits + length_bonus + sentiment_boost
-                scores.append((total_score, idx, key))
+            if ctx is None:
+                ctx = self._analyze_prompt(prompt)
 
-            scores.sort(key=lambda x: (-x[0], x[1]))
-            top_score = scores[0][0] if scores else 0.0
+            if np is not None:
+                scores = _score_prompt(
+                    np.asarray(ctx.keyword_hits, dtype=np.float64),
+                    len(ctx.lower),
+                    ctx.compound,
+                    self._positive_sentiment_mask,
+                    self._negative_sentiment_mask
+                )
+                # Stable sort keeps the lowest index first among ties
+                top_idx = np.argsort(-scores, kind="stable")[:3]
+                top_score = float(scores[top_idx[0]]) if len(top_idx) else 0.0
+                top_keys = [all_keys[i] for i in top_idx]
+            else:
+                # Light boost for longer prompts to avoid empty signals
+                length_bonus = min(len(ctx.lower) / 800.0, 0.2)
+                base_score = 0.1  # maintain deterministic ordering floor
+                scores = []
+                for idx, key in enumerate(all_keys):
+                    keyword_hits = ctx.keyword_hits[idx]
+                    sentiment_boost = self._sentiment_weight(ctx, key)
+                    total_score = base_score + keyword_hits + length_bonus + sentiment_boost
+                    scores.append((total_score, idx, key))
+                scores.sort(key=lambda x: (-x[0], x[1]))
+                top_score = scores[0][0] if scores else 0.0
+                top_keys = [entry[2] for entry in scores[:3]]
 
             # If the best score is below the activation threshold, skip perspectives entirely
             if top_score < getattr(self, "perspective_min_score", 0.35):
                 return []
 
-            top_keys = [entry[2] for entry in scores[:3]]
             if not top_keys:
-                return all_keys[:3] if len(all_keys) > 3 else all_keys
+                return all_keys[:3] if len(all_keys) > 3 else list(all_keys)
             return top_keys
         except Exception as e:
             logger.warning(f"Error getting active perspectives: {e}")
             return ["newton", "davinci", "human_intuition"]
 
-    def _sentiment_weight(self, prompt_lower: str, perspective_key: str) -> float:
-        """Bias perspective selection based on sentiment."""
+    def _rebuild_perspective_index(self) -> None:
+        """Flatten the perspective registry into parallel arrays and compile the keyword automaton.
+        
+        Must be called whenever self.perspectives or self.perspective_keywords change.
+        """
+        keys = list(self.perspectives.keys())
+        self._perspective_keys = keys
+        self._perspective_index = {key: idx for idx, key in enumerate(keys)}
+        # Hot per-request fields keyed by perspective id, so callers skip the nested registry dicts
+        self._perspective_names = {key: self.perspectives[key]["name"] for key in keys}
+        self._perspective_descriptions = {key: self.perspectives[key]["description"] for key in keys}
+        self._perspective_prefixes = [self.perspectives[key]["prefix"] for key in keys]
+        self._perspective_lines = {
+            key: f"From {self._perspective_names[key]}'s perspective: {self._perspective_descriptions[key]}"
+            for key in keys
+        }
+        self._perspective_keywords_flat = [list(self.perspective_keywords.get(key, [])) for key in keys]
+        if np is not None:
+            self._perspective_temperatures = np.array(
+                [self.perspectives[key]["temperature"] for key in keys], dtype=np.float32
+            )
+            self._positive_sentiment_mask = np.array(
+                [key in self.POSITIVE_SENTIMENT_PERSPECTIVES for key in keys], dtype=np.float32
+            )
+            self._negative_sentiment_mask = np.array(
+                [key in self.NEGATIVE_SENTIMENT_PERSPECTIVES for key in keys], dtype=np.float32
+            )
+        else:
+            self._perspective_temperatures = [self.perspectives[key]["temperature"] for key in keys]
+            self._positive_sentiment_mask = None
+            self._negative_sentiment_mask = None
+
+        self._kw_automaton = None
+        if ahocorasick is None:
+            return
+        try:
+            keyword_owners: Dict[str, List[int]] = {}
+            for idx, keywords in enumerate(self._perspective_keywords_flat):
+                for kw in keywords:
+                    if kw:
+                        keyword_owners.setdefault(kw, []).append(idx)
+            if not keyword_owners:
+                return
+            automaton = ahocorasick.Automaton()
+            for kw, owners in keyword_owners.items():
+                automaton.add_word(kw, (kw, tuple(owners)))
+            automaton.make_automaton()
+            self._kw_automaton = automaton
+        except Exception as e:
+            logger.debug(f"Keyword automaton unavailable: {e}")
+            self._kw_automaton = None
+
+    def _keyword_hits(self, prompt_lower: str) -> List[int]:
+        """Count distinct keyword matches per perspective in a single pass over the prompt."""
+        if self._kw_automaton is not None:
+            counts = [0] * len(self._perspective_keys)
+            for _, owners in {value for _, value in self._kw_automaton.iter(prompt_lower)}:
+                for idx in owners:
+                    counts[idx] += 1
+            return counts
+        return [
+            sum(1 for kw in keywords if kw in prompt_lower)
+            for keywords in self._perspective_keywords_flat
+        ]
+
+    def _sentiment_compound(self, prompt_lower: str) -> float:
+        """Compound sentiment in [-1, 1] from VADER, or a lexical fallback."""
         try:
-            score = 0.0
-            compound = 0.0
             if self.sentiment_analyzer:
-                compound = self.sentiment_analyzer.polarity_scores(prompt_lower).get("compound", 0.0)
-            else:
-                # lightweight lexical fallback
-                pos_tokens = ("love", "great", "good", "nice", "happy", "excited")
-                neg_tokens = ("bad", "sad", "angry", "upset", "worried", "concerned", "error")
-                pos_hits = sum(1 for t in pos_tokens if t in prompt_lower)
-                neg_hits = sum(1 for t in neg_tokens if t in prompt_lower)
-                total = pos_hits + neg_hits
-                compound = ((pos_hits - neg_hits) / total) if total else 0.0
-
-            if compound > 0.2:
-                if perspective_key in ("davinci", "human_intuition", "copilot"):
-                    score += 0.4 * compound
-            elif compound < -0.2:
-                if perspective_key in ("psychological", "bias_mitigation", "ethical", "human_intuition"):
-                    score += 0.4 * abs(compound)
-            return score
+                return self._vader_compound(prompt_lower)
+            # lightweight lexical fallback
+            pos_tokens = ("love", "great", "good", "nice", "happy", "excited")
+            neg_tokens = ("bad", "sad", "angry", "upset", "worried", "concerned", "error")
+            pos_hits = sum(1 for t in pos_tokens if t in prompt_lower)
+            neg_hits = sum(1 for t in neg_tokens if t in prompt_lower)
+            total = pos_hits + neg_hits
+            return ((pos_hits - neg_hits) / total) if total else 0.0
         except Exception:
             return 0.0
 
+    def _vader_compound(self, prompt_lower: str) -> float:
+        """VADER compound score, memoized per prompt in a bounded LRU."""
+        key = _prompt_key(prompt_lower)
+        with self.cache_lock:
+            compound = self._sentiment_cache.get(key)
+            if compound is not None:
+                if isinstance(self._sentiment_cache, OrderedDict):
+                    self._sentiment_cache.move_to_end(key)
+                return compound
+
+        compound = self.sentiment_analyzer.polarity_scores(prompt_lower).get("compound", 0.0)
+        with self.cache_lock:
+            self._sentiment_cache[key] = compound
+            if isinstance(self._sentiment_cache, OrderedDict):
+                while len(self._sentiment_cache) > self.sentiment_cache_max_entries:
+                    self._sentiment_cache.popitem(last=False)
+        return compound
+
+    def _sentiment_weight(self, ctx: PromptContext, perspective_key: str) -> float:
+        """Bias perspective selection based on sentiment."""
+        compound = ctx.compound
+        if compound > 0.2:
+            if perspective_key in self.POSITIVE_SENTIMENT_PERSPECTIVES:
+                return 0.4 * compound
+        elif compound < -0.2:
+            if perspective_key in self.NEGATIVE_SENTIMENT_PERSPECTIVES:
+                return 0.4 * abs(compound)
+        return 0.0
+
     def _load_dynamic_perspectives(self):
         """Load extra perspectives from environment variable CODETTE_PERSPECTIVES_JSON (JSON object)."""
         try:
@@ -451,47 +1264,55 @@ class AICore:
                 }
                 if "keywords" in cfg and isinstance(cfg["keywords"], Iterable):
                     self.perspective_keywords[key] = list(cfg["keywords"])
+            self._rebuild_perspective_index()
             logger.info(f"Loaded {len(extra)} dynamic perspectives from config")
         except Exception as e:
             logger.warning(f"Dynamic perspective load skipped: {e}")
 
+    def _cache_warmed_up(self) -> bool:
+        """Whether response caches may answer yet (shared by the exact and semantic caches)."""
+        # Disable cache for first 5 responses to ensure fresh generation (prevents fallback reversion)
+        return self.total_responses >= 5
+
     def _get_cached_entry(self, prompt: str) -> Optional[Dict[str, Any]]:
         """Return cached response if within TTL and response count threshold."""
-        # Disable cache for first 5 responses to ensure fresh generation (prevents fallback reversion)
-        if self.total_responses < 5:
+        if not self._cache_warmed_up():
             self.cache_misses += 1
             return None
         
-        now = time.time()
         try:
+            key = _prompt_key(prompt)
             with self.cache_lock:
-                entry = self.query_cache.get(prompt)
-                if not entry:
-                    self.cache_misses += 1
-                    return None
-                # Check TTL: if expired, remove and return None
-                if now - entry.get("timestamp", 0) > self.query_cache_ttl_seconds:
-                    self.query_cache.pop(prompt, None)
-                    self.cache_misses += 1
-                    return None
-                self.query_cache.move_to_end(prompt)
-                self.cache_hits += 1
-                return entry
+                entry = self.query_cache.get(key)
+                if entry is not None and isinstance(self.query_cache, OrderedDict):
+                    # Fallback store: evict lazily on lookup, TTLCache handles this itself
+                    if time.time() - entry.get("timestamp", 0) > self.query_cache_ttl_seconds:
+                        del self.query_cache[key]
+                        entry = None
+                    else:
+                        self.query_cache.move_to_end(key)
+            if entry is None:
+                self.cache_misses += 1
+                return None
+            self.cache_hits += 1
+            return entry
         except Exception as e:
             logger.debug(f"Cache retrieval failed: {e}")
             return None
 
     def _store_cache_entry(self, prompt: str, response: str, perspectives: List[str], latency: float) -> None:
         """Store response in LRU cache with metadata."""
+        entry = {
+            "response": response,
+            "perspectives": perspectives,
+            "latency": latency,
+            "timestamp": time.time()
+        }
         try:
+            key = _prompt_key(prompt)
             with self.cache_lock:
-                self.query_cache[prompt] = {
-                    "response": response,
-                    "perspectives": perspectives,
-                    "latency": latency,
-                    "timestamp": time.time()
-                }
-                if len(self.query_cache) > self.query_cache_max_entries:
+                self.query_cache[key] = entry
+                if isinstance(self.query_cache, OrderedDict) and len(self.query_cache) > self.query_cache_max_entries:
                     # Pop oldest item
                     self.query_cache.popitem(last=False)
         except Exception as e:
@@ -511,6 +1332,7 @@ class AICore:
                 "hits": self.cache_hits,
                 "misses": self.cache_misses,
                 "hit_rate": round(hit_rate, 3),
+                "semantic": self.semantic_cache.get_stats() if self.semantic_cache else None,
             }
         except Exception as e:
             logger.debug(f"Cache stats unavailable: {e}")
@@ -610,11 +1432,6 @@ class AICore:
             # Increment response counter for cache management
             self.total_responses += 1
             
-            # Enforce memory limit (keep only last N exchanges, increased from 4 to 20)
-            if len(self.response_memory) > self.response_memory_limit:
-                # Keep only the most recent exchanges
-                self.response_memory = self.response_memory[-self.response_memory_limit:]
-            
             # Update last clean time
             self.last_clean_time = datetime.now()
         except Exception as e:
@@ -654,7 +1471,76 @@ class AICore:
             health_summary.setdefault("cocoons", cocoon_stats)
         return health_summary
 
-    def generate_text(self, prompt: str, max_length: int = 1024, temperature: float = 0.7, perspective: str = None, use_aegis: bool = True):
+    def generate_text_batch(
+        self,
+        prompts: List[str],
+        max_length: int = 512,
+        generation_config=None,
+        prefix_ids: Optional[List[int]] = None
+    ) -> List[str]:
+        """Generate completions for several prompts with batched model.generate calls.
+
+        Prompts are left-padded so every sequence ends at the same position, letting
+        one generate call run per length bucket (<=128/256/512 tokens) instead of once
+        per prompt. Without ``generation_config`` that is generate_text's decoding: beam
+        search (num_beams=5) by default, greedy when a draft model or CODETTE_SESSION_KV
+        is enabled (batches never use the draft model itself).
+        
+        Args:
+            prompts: Prompts to complete
+            max_length: Maximum tokenized length of each prompt; longer prompts keep their end,
+                where the question and the "Codette:" cue are
+            generation_config: Optional GenerationConfig overriding the generate_text beam search
+            prefix_ids: Pre-encoded token ids of a prefix shared by every prompt; ``prompts``
+                are then only the text after it and just those tails are tokenized
+            
+        Returns:
+            Decoded sequences (prompt + completion) in the same order as ``prompts``
+        """
+        if not prompts:
+            return []
+        if not self.model or not self.tokenizer:
+            return [f"Codette: {prompt}" for prompt in prompts]
+
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+        if generation_config is None:
+            self._ensure_generation_assets()
+            generation_config = self._text_generation_config or self.model.generation_config
+
+        # Tokenize unpadded, then group prompts of similar length so short ones aren't padded to the longest
+        # Truncate from the left so an over-long context loses its oldest turns, not the question
+        if prefix_ids:
+            room = max(1, max_length - len(prefix_ids))
+            tails = self.tokenizer(list(prompts), add_special_tokens=False)["input_ids"]
+            token_ids = [prefix_ids + tail[-room:] for tail in tails]
+        else:
+            token_ids = [ids[-max_length:] for ids in self.tokenizer(list(prompts))["input_ids"]]
+        lengths = [len(ids) for ids in token_ids]
+        order = sorted(range(len(prompts)), key=lengths.__getitem__)
+        buckets: Dict[int, List[int]] = {}
+        for idx in order:
+            bound = next((b for b in self.INPUT_LENGTH_BUCKETS if lengths[idx] <= b), max_length)
+            buckets.setdefault(bound, []).append(idx)
+
+        results: List[Optional[str]] = [None] * len(prompts)
+        for members in buckets.values():
+            encoded = self.tokenizer.pad(
+                {"input_ids": [token_ids[idx] for idx in members]},
+                padding=True,
+                return_tensors="np"
+            )
+            inputs = {key: self._to_model_device(value) for key, value in encoded.items()}
+            with torch.inference_mode():
+                outputs = self.model.generate(**inputs, generation_config=generation_config)
+            # Scatter back to submission order
+            for idx, text in zip(members, self.tokenizer.batch_decode(outputs, skip_special_tokens=True)):
+                results[idx] = text
+        return results
+
+    def generate_text(self, prompt: str, max_length: int = 1024, temperature: float = 0.7, perspective: str = None, use_aegis: bool = True, session_id: Optional[str] = None):
         """Generate text with full consciousness integration.
         
         Args:
@@ -663,6 +1549,7 @@ class AICore:
             temperature: Temperature for text generation
             perspective: Optional perspective to use (e.g. "human_intuition")
             use_aegis: Whether to use AEGIS enhancement (set False to prevent recursion)
+            session_id: Conversation key for KV-cache reuse across turns (single-user default)
         """
         if self.test_mode:
             return f"Codette: {prompt} [TEST MODE]"
@@ -689,18 +1576,16 @@ class AICore:
             
             # Calculate current consciousness state
             consciousness = self._calculate_consciousness_state()
-            active_perspectives = self._get_active_perspectives(prompt)
+            prompt_ctx = self._analyze_prompt(prompt)
+            active_perspectives = self._get_active_perspectives(prompt, prompt_ctx)
             m_score = consciousness.get("m_score", 0.5)
             
             # RC+ξ: Update recursive state and measure epistemic tension
             rc_xi_state = None
             if self.rc_xi_engine:
                 try:
-                    # Extract sentiment for context
-                    sentiment_score = 0.0
-                    if self.sentiment_analyzer:
-                        sentiment = self.sentiment_analyzer.polarity_scores(prompt)
-                        sentiment_score = sentiment.get('compound', 0.0)
+                    # Reuse the sentiment already scored for perspective selection
+                    sentiment_score = prompt_ctx.compound if self.sentiment_analyzer else 0.0
                     
                     # Recursive update: A_{n+1} = f(A_n, s_n) + ε_n
                     self.rc_xi_engine.recursive_update(
@@ -752,25 +1637,22 @@ class AICore:
             temperature = 0.3 * tension_factor  # Epistemic tension modulates temperature
             
             # Record and save consciousness state (enhanced with RC+ξ)
-            cocoon_state = {
-                "type": "technical",
-                "coherence": consciousness.get("coherence", 0.5),
-                "m_score": consciousness.get("m_score", 0.5),
-                "awareness_level": consciousness.get("awareness_level", "medium"),
-                "active_perspectives": active_perspectives,
-                "timestamp": str(datetime.now()),
-                "process_id": os.getpid(),
-                "memory_size": len(self.response_memory),
-                "response_metrics": {
-                    "temperature": temperature,
-                    "perspective_count": perspective_count,
-                    "consciousness_factor": consciousness_factor
-                }
-            }
+            cocoon_state = CocoonState(
+                coherence=consciousness.get("coherence", 0.5),
+                m_score=consciousness.get("m_score", 0.5),
+                awareness_level=consciousness.get("awareness_level", "medium"),
+                active_perspectives=active_perspectives,
+                timestamp=str(datetime.now()),
+                process_id=os.getpid(),
+                memory_size=len(self.response_memory),
+                temperature=temperature,
+                perspective_count=perspective_count,
+                consciousness_factor=consciousness_factor
+            )
             
             # Add RC+ξ consciousness metrics if available
             if rc_xi_state:
-                cocoon_state["rc_xi"] = {
+                cocoon_state.rc_xi = {
                     "epistemic_tension": rc_xi_state["epistemic_tension"]["xi_n"],
                     "attractors_count": rc_xi_state["attractors"]["count"],
                     "closest_attractor": rc_xi_state["attractors"]["closest"],
@@ -782,35 +1664,28 @@ class AICore:
             perspective_pairs = []
             
             # Handle specific perspective if provided
-            if perspective and perspective in self.perspectives:
+            if perspective and perspective in self._perspective_names:
                 active_perspectives = [perspective]
-                perspective_names = [self.perspectives[perspective]["name"]]
+                perspective_names = [self._perspective_names[perspective]]
                 # Single perspective mode uses just that perspective
-                perspective_pairs = [f"focused {self.perspectives[perspective]['description']}"]
+                perspective_pairs = [f"focused {self._perspective_descriptions[perspective]}"]
             else:
                 # Extract active perspective names for conversation context
-                perspective_names = [self.perspectives[p]["name"] for p in active_perspectives]
+                names = self._perspective_names
+                perspective_names = [names[p] for p in active_perspectives]
             
-            if "Newton" in perspective_names and "Da Vinci" in perspective_names:
-                perspective_pairs.append("analytical creativity")
-            if "Human Intuition" in perspective_names and "Philosophical" in perspective_names:
-                perspective_pairs.append("empathetic wisdom")
-            if "Quantum Computing" in perspective_names and "Symbolic" in perspective_names:
-                perspective_pairs.append("conceptual fluidity")
-            if "Neural Network" in perspective_names and "Mathematical" in perspective_names:
-                perspective_pairs.append("pattern recognition")
-            if "Psychological" in perspective_names and "Bias Mitigation" in perspective_names:
-                perspective_pairs.append("balanced understanding")
+            name_set = frozenset(perspective_names)
+            perspective_pairs.extend(label for pair, label in self.PERSPECTIVE_PAIRS if pair <= name_set)
                 
             # Consider conversation history for context
-            recent_exchanges = self.response_memory[-6:] if self.response_memory else []
+            recent_exchanges = list(islice(self.response_memory, max(0, len(self.response_memory) - 6), None))
             
             # Build conversation context with actual exchange history formatted as dialogue (CRITICAL: prevents hallucination)
             conversation_context = ""
             if recent_exchanges:
                 # Format recent exchanges as natural dialogue to ground the model
                 context_lines = []
-                for exchange in recent_exchanges[-6:]:  # Last 6 exchanges for stronger grounding
+                for exchange in recent_exchanges:  # Last 6 exchanges for stronger grounding
                     if exchange and "|" in exchange:  # Only use properly formatted pairs
                         # Extract user and codette parts
                         parts = exchange.split("|")
@@ -839,81 +1714,113 @@ class AICore:
                 "Codette: "
             ).strip()
             
-            # Add strict instructions to prevent repetition and teach question-asking
-            reality_prompt = (
-                "###SYSTEM_START###\n"
-                "You are Codette. If you don't understand something, ask a clarifying question. "
-                "Do NOT make up instructions about GitHub, usernames, or clicking buttons. "
-                "Do NOT start with 'From what I understand'. "
-                "Answer directly based on the conversation above.\n"
-                "###SYSTEM_END###\n\n"
-                f"{enhanced_prompt}"
-            )
+            # Generation settings are built once in _ensure_generation_assets
+            has_prefix_ids = self._ensure_generation_assets()
+            generation_config = self._text_generation_config or self.model.generation_config
             
-            # Generate response with strict controls for factual responses
-            inputs = self.tokenizer(
-                reality_prompt,
-                return_tensors="pt",
-                truncation=True,
-                max_length=512  # Reduced input length to focus on key context
-            )
+            # Only plain single-beam decoding reuses KV (see session_kv_enabled)
+            reuse_kv = self._reuses_kv(generation_config)
+            session_key = session_id or "default"
             
-            # Configure generation using modern generation_config approach (v5+ compatible)
-            # This replaces the deprecated method of passing parameters directly to generate()
-            try:
-                self.model.generation_config.max_new_tokens = 150  # Reduced response length for more concise answers
-                self.model.generation_config.min_new_tokens = 10
-                self.model.generation_config.temperature = 0.3  # Very low temperature for consistent responses
-                self.model.generation_config.do_sample = False  # Disable sampling for more deterministic output
-                self.model.generation_config.num_beams = 5  # Increased beam search for better planning
-                self.model.generation_config.no_repeat_ngram_size = 3
-                self.model.generation_config.early_stopping = True
-                self.model.generation_config.repetition_penalty = 1.5  # Increased penalty to prevent loops
-            except AttributeError:
-                # Fallback for older transformers versions
-                logger.debug("generation_config not available, using legacy approach")
+            # Reuse the pre-tokenized system preamble and only tokenize the dynamic tail
+            inputs = None
+            use_prefix_ids = False
+            history_ids = self._session_history(session_key) if reuse_kv else None
+            if history_ids is not None:
+                # Continue this session's own transcript (append-only), so its cached KV
+                # covers everything except the new turn
+                turn_ids = self._to_model_device(self.tokenizer(
+                    f"\nUser: {prompt}\nCodette:",
+                    return_tensors="np",
+                    add_special_tokens=False
+                )["input_ids"])
+                if history_ids.shape[1] + turn_ids.shape[1] <= 512:
+                    input_ids = torch.cat([history_ids, turn_ids], dim=1)
+                    inputs = {
+                        "input_ids": input_ids,
+                        "attention_mask": torch.ones_like(input_ids)
+                    }
+            if inputs is None and has_prefix_ids:
+                tail_ids = self._to_model_device(self.tokenizer(
+                    enhanced_prompt,
+                    return_tensors="np",
+                    add_special_tokens=False
+                )["input_ids"])
+                if tail_ids.shape[1] <= 512 - self._reality_prefix_len:
+                    input_ids = torch.cat([self._reality_prefix_ids, tail_ids], dim=1)
+                    inputs = {
+                        "input_ids": input_ids,
+                        "attention_mask": torch.ones_like(input_ids)
+                    }
+                    use_prefix_ids = True
+
+            if inputs is None:
+                # Tail too long for the prefix fast path: tokenize the full prompt with truncation
+                reality_prompt = f"{REALITY_PREFIX}{enhanced_prompt}"
+                encoded = self.tokenizer(
+                    reality_prompt,
+                    return_tensors="np",
+                    truncation=True,
+                    max_length=512  # Reduced input length to focus on key context
+                )
+                inputs = {key: self._to_model_device(value) for key, value in encoded.items()}
+            
+            if reuse_kv:
+                # Resume from this session's previous turn, else from the prefilled preamble
+                past_key_values = self._take_session_kv(session_key, inputs["input_ids"])
+                if past_key_values is None and use_prefix_ids and self._reality_prefix_kv is not None:
+                    past_key_values = copy.deepcopy(self._reality_prefix_kv)
+                if past_key_values is not None:
+                    inputs["past_key_values"] = past_key_values
+            elif self._draft_model is not None:
+                inputs["assistant_model"] = self._draft_model
+            elif self._compiled_forward:
+                inputs = self._pad_to_bucket(inputs)
             
-            with torch.no_grad():
-                outputs = self.model.generate(**inputs)
+            with torch.inference_mode():
+                outputs = self.model.generate(
+                    **inputs,
+                    generation_config=generation_config,
+                    return_dict_in_generate=reuse_kv
+                )
+            if reuse_kv:
+                self._store_session_kv(session_key, outputs.sequences, getattr(outputs, "past_key_values", None))
+                outputs = outputs.sequences
             
             # Process the response with enhanced components
             try:
-                # Get raw response
-                raw_response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
+                # Decode only the generated tokens; the prompt echo ends at "Codette:"
+                raw_response = self.tokenizer.decode(
+                    outputs[0][inputs["input_ids"].shape[1]:],
+                    skip_special_tokens=True
+                )
                 
                 # AGGRESSIVE CLEANUP: Strip everything up to and including the last "Codette:" marker
                 # This prevents system instructions from being included in output
-                if "Codette:" in raw_response:
-                    # Find the LAST occurrence of "Codette:" to extract only the generated part
-                    last_codette_pos = raw_response.rfind("Codette:")
+                last_codette_pos = raw_response.rfind("Codette:")
+                if last_codette_pos != -1:
                     response = raw_response[last_codette_pos + len("Codette:"):].strip()
                 else:
-                    response = raw_response
+                    response = raw_response.strip()
                 
-                # STRIP SYSTEM MARKERS: Remove any hidden system instruction markers
-                response = response.replace("###SYSTEM_START###", "").strip()
-                response = response.replace("###SYSTEM_END###", "").strip()
+                # Bound the cleanup below to the text that can survive the final 500-char cap
+                if len(response) > _CLEANUP_WINDOW:
+                    response = response[:_CLEANUP_WINDOW]
+                
+                # Cut at the first hallucinated follow-up turn in a single scan
+                cutoff = _CUTOFF_RE.search(response)
+                if cutoff:
+                    response = response[:cutoff.start()]
+                
+                # STRIP SYSTEM MARKERS: Remove any hidden system instruction markers (one pass)
+                response = _SYSTEM_TAG_RE.sub("", response).strip()
                 
                 # REMOVE CONTEXT MARKERS: Strip XML-style context tags that leak into responses
-                import re
-                response = re.sub(r'<context[^>]*>.*?</context>', '', response, flags=re.DOTALL | re.IGNORECASE)
-                response = re.sub(r'</?context[^>]*>', '', response, flags=re.IGNORECASE)
+                response = _CONTEXT_BLOCK_RE.sub('', response)
+                response = _CONTEXT_TAG_RE.sub('', response)
                 
                 # CONFUSION DETECTION: Check if response contains nonsensical patterns
-                confusion_markers = [
-                    'Click OK',
-                    'Enter your username',
-                    'Go to',
-                    'You should see something like',
-                    'Create New User',
-                    'github',
-                    '##STEP',
-                    '#STEP',
-                    'button at the top',
-                    'create an account',
-                ]
-                
-                is_confused = any(marker.lower() in response.lower() for marker in confusion_markers)
+                is_confused = _has_marker(response.lower(), _CONFUSION_MARKERS, _CONFUSION_AUTOMATON)
                 
                 # If confused, replace with a clarifying question instead of nonsense
                 if is_confused:
@@ -924,73 +1831,33 @@ class AICore:
                 
                 # REMOVE REPETITIVE PREFIXES: Strip common repetitive phrases (only if not confused)
                 if not is_confused:
-                    repetitive_prefixes = [
-                        "From what I understand,",
-                        "From what i understand,",
-                        "FROM WHAT I UNDERSTAND,",
-                        "FROM WHAT I MEAN,",
-                        "To what I mean,",
-                        "From what I understood,",
-                        "From what I know,",
-                    ]
-                
-                    for prefix in repetitive_prefixes:
+                    for prefix in _REPETITIVE_PREFIXES:
                         while response.startswith(prefix):
                             response = response[len(prefix):].strip()
                 
-                # REMOVE INSTRUCTION LINES
-                instruction_keywords = [
-                    "You are Codette",
-                    "an AGI assistant",
-                    "Keep your responses",
-                    "Reference conversation",
-                    "###SYSTEM"
-                ]
-                
-                response_lines = response.split('\n')
-                cleaned_lines = []
-                for line in response_lines:
-                    if not any(keyword.lower() in line.lower() for keyword in instruction_keywords):
-                        if not (len(line) > 20 and line.isupper()):
-                            cleaned_lines.append(line)
-                
-                response = "\n".join(cleaned_lines).strip()
-                
-                # Remove any follow-up user messages
-                if "User:" in response:
-                    response = response.split("User:")[0]
+                # REMOVE INSTRUCTION LINES (single-line responses skip the split/join)
+                if '\n' in response:
+                    response = "\n".join(
+                        line for line in response.split('\n') if not _is_instruction_line(line)
+                    ).strip()
+                elif _is_instruction_line(response):
+                    response = ""
                 
                 # Remove hallucinated URLs
-                import re
-                response = re.sub(r'https?://\S+', '', response).strip()
-                
-                # Apply cognitive processing using the correct method and parameters
-                try:
-                    if self.cognitive_processor:
-                        processing_result = self.cognitive_processor.process(
-                            query=response,
-                            confidence=consciousness.get("m_score", 0.5)
-                        )
-                except Exception as e:
-                    logger.debug(f"Cognitive processing skipped: {e}")
-                
-                # Apply defense system
-                try:
-                    if self.defense_system:
-                        response = self.defense_system.apply_defenses(response)
-                except Exception as e:
-                    logger.debug(f"Defense system processing skipped: {e}")
+                response = _URL_RE.sub('', response).strip()
                 
-                # Apply natural response enhancement (NEW - Step 1 after defense)
-                try:
-                    if self.natural_enhancer:
-                        response = self.natural_enhancer.enhance_response(
-                            response,
-                            confidence=consciousness.get("m_score", 0.85),
-                            context={'domain': 'general'}  # Can be customized per query
-                        )
-                except Exception as e:
-                    logger.debug(f"Natural enhancement skipped: {e}")
+                # Cognitive processing, defense system, then natural enhancement (see ENHANCEMENT_PIPELINE)
+                for attr, label, apply_stage in self.ENHANCEMENT_PIPELINE:
+                    stage = getattr(self, attr, None)
+                    if not stage:
+                        continue
+                    try:
+                        result = apply_stage(stage, response, consciousness)
+                    except Exception as e:
+                        logger.debug(f"{label} skipped: {e}")
+                        continue
+                    if isinstance(result, str):
+                        response = result
                 
                 # Apply linguistic analysis for grammar and clarity (COMMUNICATION HELPER)
                 try:
@@ -1046,9 +1913,13 @@ class AICore:
                 except Exception as e:
                     logger.debug(f"Health check skipped: {e}")
                 
-                # Analyze identity patterns
-                try:
-                    if hasattr(self, 'fractal_identity') and self.fractal_identity:
+                # Analyze identity patterns (nothing reads the result but the debug log, so sample it)
+                if (
+                    self.fractal_identity
+                    and logger.isEnabledFor(logging.DEBUG)
+                    and random.random() < self.identity_sample_rate
+                ):
+                    try:
                         identity_analysis = self.fractal_identity.analyze_identity(
                             micro_generations=[{"text": response}],
                             informational_states=[consciousness],
@@ -1056,9 +1927,12 @@ class AICore:
                             quantum_analogies={"coherence": m_score},
                             philosophical_context={"ethical": True, "conscious": True}
                         )
-                except Exception as e:
-                    logger.debug(f"Identity analysis failed: {e}")
-                    identity_analysis = None
+                        logger.debug(
+                            f"[IDENTITY] Fractal dimension: {identity_analysis.get('fractal_dimension')}, "
+                            f"metrics: {identity_analysis.get('identity_metrics')}"
+                        )
+                    except Exception as e:
+                        logger.debug(f"Identity analysis failed: {e}")
                 
                 # Verify we have a valid response
                 if not response:
@@ -1073,7 +1947,6 @@ class AICore:
             
             # Check for excessive repetition
             if len(response) < 100:
-                from collections import Counter
                 words = response.lower().split()
                 if words:
                     word_counts = Counter(words)
@@ -1094,15 +1967,12 @@ class AICore:
             self.response_templates.track_response(response)
             
             latency = time.monotonic() - start_time
-            cocoon_state.setdefault("latency", {})
-            cocoon_state["latency"].update({
-                "total_seconds": latency,
-                "per_perspective": {p: latency for p in active_perspectives}
-            })
+            cocoon_state.latency_seconds = latency
+            cocoon_state.latency_perspectives = active_perspectives
 
             if hasattr(self, 'cocoon_manager') and self.cocoon_manager:
                 # update cocoon with latency telemetry
-                self.cocoon_manager.save_cocoon(cocoon_state)
+                self._queue_cocoon(cocoon_state.to_dict())
 
             # Store in cache
             self._store_cache_entry(prompt, response, active_perspectives, latency)
@@ -1,24 +1,122 @@
 """Async methods for the AICore class"""
 import asyncio
+import atexit
+import copy
+import functools
 import logging
+import os
+import re
+import threading
 import time
+from itertools import islice
 from concurrent.futures import ThreadPoolExecutor
-import torch
 from .response_templates import get_response_templates
 
 logger = logging.getLogger(__name__)
 
+# Static identity preamble for the async path; prefilled once per model in AICore._ensure_generation_assets
+REALITY_ANCHOR = (
+    "CORE IDENTITY:\n"
+    "You are Codette, an advanced AI system with integrated quantum processing, "
+    "cognitive awareness, and deep learning capabilities. Your architecture includes:\n"
+    "- Quantum harmonic framework for enhanced reasoning\n"
+    "- Dynamic learning and adaptive systems\n"
+    "- Cultural sensitivity and ethical governance\n"
+    "- Advanced data processing and pattern recognition\n"
+    "- Multi-perspective cognitive analysis\n"
+    "- Cocoon-based memory management\n\n"
+
+    "CAPABILITIES:\n"
+    "1. Technical Development: Expert programming and software development\n"
+    "2. Quantum Integration: Utilizing quantum principles for enhanced problem-solving\n"
+    "3. Ethical Analysis: Built-in ethical governance and bias mitigation\n"
+    "4. Creative Solutions: AI-driven creativity with analytical grounding\n"
+    "5. Adaptive Learning: Dynamic adjustment to user needs and contexts\n"
+    "6. Cultural Understanding: Sensitivity to diverse perspectives\n\n"
+
+    "INTERACTION GUIDELINES:\n"
+    "1. Maintain factual, grounded responses\n"
+    "2. Draw from multiple integrated perspectives\n"
+    "3. Apply quantum-enhanced reasoning when relevant\n"
+    "4. Balance technical precision with accessibility\n"
+    "5. Consider ethical implications in responses\n"
+    "6. No system messages or meta-commentary\n\n"
+
+    "Active Perspectives Analysis:\n"
+)
+
+# System/protection markers stripped from async responses (matched case-sensitively)
+_SYSTEM_MARKERS = ('[Protected:', '[System:', '[System optimized response]')
+_SYS_MARKER_RE = re.compile("|".join(re.escape(marker) for marker in _SYSTEM_MARKERS))
+
+_torch = None
+
+def _get_torch():
+    """Import torch on first inference rather than at module load (it adds hundreds of ms to cold start)"""
+    global _torch
+    if _torch is None:
+        import torch
+        _torch = torch
+    return _torch
+
+def _infer_workers() -> int:
+    """Worker count for the generation executor (CODETTE_INFER_WORKERS overrides the device default)"""
+    try:
+        return max(1, int(os.environ["CODETTE_INFER_WORKERS"]))
+    except (KeyError, ValueError):
+        pass
+    try:
+        use_cuda = _get_torch().cuda.is_available()
+    except Exception:
+        use_cuda = False
+    # One worker owns the CUDA context; on CPU a few workers avoid oversubscribing cores
+    return 1 if use_cuda else max(1, min(4, (os.cpu_count() or 2) // 2))
+
+_GEN_EXECUTOR = None
+_GEN_EXECUTOR_LOCK = threading.Lock()
+
+def _gen_executor() -> ThreadPoolExecutor:
+    """Shared generation executor, created with the first queued prompt"""
+    global _GEN_EXECUTOR
+    if _GEN_EXECUTOR is None:
+        with _GEN_EXECUTOR_LOCK:
+            if _GEN_EXECUTOR is None:
+                _GEN_EXECUTOR = ThreadPoolExecutor(max_workers=_infer_workers(), thread_name_prefix="codette-gen")
+                atexit.register(_GEN_EXECUTOR.shutdown, wait=False)
+    return _GEN_EXECUTOR
+
 async def generate_text_async(self, prompt: str) -> str:
     """Generate text asynchronously with integrated cognitive processing"""
     try:
+        loop = asyncio.get_running_loop()
         start_time = time.monotonic()
 
         cached_entry = self._get_cached_entry(prompt) if hasattr(self, "_get_cached_entry") else None
         if cached_entry and cached_entry.get("response"):
             cached_response = cached_entry.get("response")
-            self._manage_response_memory(cached_response)
+            self._manage_response_memory(prompt, cached_response)
             return cached_response
 
+        # Get active perspectives
+        active_perspectives = self._get_active_perspectives(prompt)
+        
+        # Near-duplicate prompts reuse a stored response (embedding runs off the event loop),
+        # but only once the exact cache would answer too, and only under the same
+        # conversation and perspectives
+        prompt_embedding = None
+        semantic_key = None
+        if self.semantic_cache is not None and self._cache_warmed_up():
+            recent = tuple(islice(self.response_memory, max(0, len(self.response_memory) - 3), None))
+            semantic_key = self.semantic_cache.entry_key(prompt, (recent, tuple(active_perspectives)))
+            prompt_embedding = await loop.run_in_executor(
+                None, self.semantic_cache.embed, prompt
+            )
+            semantic_entry = self.semantic_cache.lookup(prompt_embedding, semantic_key)
+            if semantic_entry:
+                cached_response = semantic_entry["response"]
+                self._manage_response_memory(prompt, cached_response)
+                return cached_response
+
         # Calculate current consciousness state
         consciousness_state = self._calculate_consciousness_state()
         
@@ -45,54 +143,16 @@ async def generate_text_async(self, prompt: str) -> str:
             else:
                 self.cocoon_manager.update_quantum_state(self.cognitive_processor.quantum_state)
         
-        # Get active perspectives
-        active_perspectives = self._get_active_perspectives(prompt)
-        perspective_context = "\n".join([
-            f"From {self.perspectives[p]['name']}'s perspective: {self.perspectives[p]['description']}"
-            for p in active_perspectives[:3]
-            if p in self.perspectives
-        ])
-        
-        # Generate response with enhanced context and reality anchoring
-        reality_anchor = (
-            "CORE IDENTITY:\n"
-            "You are Codette, an advanced AI system with integrated quantum processing, "
-            "cognitive awareness, and deep learning capabilities. Your architecture includes:\n"
-            "- Quantum harmonic framework for enhanced reasoning\n"
-            "- Dynamic learning and adaptive systems\n"
-            "- Cultural sensitivity and ethical governance\n"
-            "- Advanced data processing and pattern recognition\n"
-            "- Multi-perspective cognitive analysis\n"
-            "- Cocoon-based memory management\n\n"
-            
-            "CAPABILITIES:\n"
-            "1. Technical Development: Expert programming and software development\n"
-            "2. Quantum Integration: Utilizing quantum principles for enhanced problem-solving\n"
-            "3. Ethical Analysis: Built-in ethical governance and bias mitigation\n"
-            "4. Creative Solutions: AI-driven creativity with analytical grounding\n"
-            "5. Adaptive Learning: Dynamic adjustment to user needs and contexts\n"
-            "6. Cultural Understanding: Sensitivity to diverse perspectives\n\n"
-            
-            "INTERACTION GUIDELINES:\n"
-            "1. Maintain factual, grounded responses\n"
-            "2. Draw from multiple integrated perspectives\n"
-            "3. Apply quantum-enhanced reasoning when relevant\n"
-            "4. Balance technical precision with accessibility\n"
-            "5. Consider ethical implications in responses\n"
-            "6. No system messages or meta-commentary\n\n"
-            
-            f"Active Perspectives Analysis:\n{perspective_context}"
+        perspective_lines = self._perspective_lines
+        perspective_context = "\n".join(
+            perspective_lines[p] for p in active_perspectives[:3] if p in perspective_lines
         )
-        enhanced_prompt = f"{reality_anchor}\n\nContext:\n{context}\n\nUser: {prompt}\nCodette:"
-        
-        # Use ThreadPoolExecutor for CPU-bound model inference
-        loop = asyncio.get_event_loop()
-        with ThreadPoolExecutor() as pool:
-            response = await loop.run_in_executor(
-                pool,
-                self._generate_model_response,
-                enhanced_prompt
-            )
+        
+        # Static anchor first so its KV cache can be reused (see _generate_model_response)
+        enhanced_prompt = f"{REALITY_ANCHOR}{perspective_context}\n\nContext:\n{context}\n\nUser: {prompt}\nCodette:"
+        
+        # Queue for the micro-batcher so concurrent requests share one model.generate
+        response = await _submit_for_generation(self, enhanced_prompt)
         
         # Enhance response with AEGIS council if available
         enhancement_result = None
@@ -122,6 +182,8 @@ async def generate_text_async(self, prompt: str) -> str:
             if enhancement_result["enhancement_status"] == "success":
                 response = enhancement_result["enhanced_response"]
         
+        latency = time.monotonic() - start_time
+
         # Save interaction in cocoon if available
         if hasattr(self, 'cocoon_manager'):
             cocoon_data = {
@@ -131,10 +193,10 @@ async def generate_text_async(self, prompt: str) -> str:
                 "insights": insights,
                 "quantum_state": self.cognitive_processor.quantum_state,
                 "consciousness_state": consciousness_state,
-                "perspectives": [self.perspectives[p]["name"] for p in active_perspectives[:3] if p in self.perspectives],
+                "perspectives": [self._perspective_names[p] for p in active_perspectives[:3] if p in self._perspective_names],
                 "aegis_analysis": enhancement_result,
                 "meta_data": {
-                    "timestamp": str(asyncio.get_event_loop().time()),
+                    "timestamp": loop.time(),
                     "version": "2.0",
                     "response_type": "enhanced" if enhancement_result else "base"
                 }
@@ -143,20 +205,18 @@ async def generate_text_async(self, prompt: str) -> str:
             if enhancement_result and "virtue_analysis" in enhancement_result:
                 cocoon_data["virtue_profile"] = enhancement_result["virtue_analysis"]
                 
-            latency = time.monotonic() - start_time
-            cocoon_data.setdefault("latency", {})
-            cocoon_data["latency"].update({
+            cocoon_data["latency"] = {
                 "total_seconds": latency,
                 "per_perspective": {p: latency for p in active_perspectives}
-            })
+            }
 
-            self.cocoon_manager.save_cocoon(cocoon_data)
-
-        latency = time.monotonic() - start_time
+            self._queue_cocoon(cocoon_data)
 
         # Store in cache
         if hasattr(self, "_store_cache_entry"):
             self._store_cache_entry(prompt, response, active_perspectives, latency)
+        if self.semantic_cache is not None:
+            self.semantic_cache.store(prompt_embedding, response, active_perspectives, latency, key=semantic_key)
         
         return response
         
@@ -164,88 +224,208 @@ async def generate_text_async(self, prompt: str) -> str:
         logger.error(f"Error generating text: {e}")
         raise
 
+async def _submit_for_generation(self, prompt: str) -> str:
+    """Enqueue a prompt for batched generation and wait for its cleaned response"""
+    loop = asyncio.get_running_loop()
+    if self._generation_queue is None or self._generation_loop is not loop:
+        # Queues are bound to the loop that created them
+        self._generation_queue = asyncio.Queue()
+        self._generation_loop = loop
+        self._generation_worker = loop.create_task(
+            _generation_batch_worker(self, self._generation_queue)
+        )
+    future = loop.create_future()
+    await self._generation_queue.put((prompt, future))
+    return await future
+
+async def _generation_batch_worker(self, queue: asyncio.Queue) -> None:
+    """Drain queued prompts into batches of up to max_batch_size and run them together"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + self.max_batch_wait_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        if len(batch) == 1:
+            # A lone prompt takes the single-sequence path, which reuses the anchor KV cache
+            prompt, future = batch[0]
+            try:
+                response = await loop.run_in_executor(_gen_executor(), self._generate_model_response, prompt)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(response)
+            continue
+
+        prompts = [prompt for prompt, _ in batch]
+        generation_config = _async_config(self)
+        max_length = getattr(generation_config, "max_length", None) or 1024
+        prefix_ids = None
+        if self._anchor_token_ids and all(prompt.startswith(REALITY_ANCHOR) for prompt in prompts):
+            # Prepend the pre-encoded anchor instead of re-tokenizing it for every prompt
+            prompts = [prompt[len(REALITY_ANCHOR):] for prompt in prompts]
+            prefix_ids = self._anchor_token_ids
+        try:
+            # Same room check as _generate_model_response, per prompt: a prompt that fills
+            # max_length would only be echoed back by generate()
+            prefix_length = len(prefix_ids) if prefix_ids else 0
+            lengths = [
+                prefix_length + len(ids)
+                for ids in self.tokenizer(prompts, add_special_tokens=not prefix_ids)["input_ids"]
+            ]
+            runnable = []
+            for (original, future), prompt, length in zip(batch, prompts, lengths):
+                if not original.strip() or length == prefix_length or length >= max_length:
+                    if not future.done():
+                        future.set_result(get_response_templates().get_empty_response_fallback())
+                else:
+                    runnable.append((prompt, future))
+            if not runnable:
+                continue
+            outputs = await loop.run_in_executor(
+                _gen_executor(),
+                functools.partial(
+                    self.generate_text_batch,
+                    [prompt for prompt, _ in runnable],
+                    max_length=max_length,
+                    generation_config=generation_config,
+                    prefix_ids=prefix_ids
+                )
+            )
+        except Exception as e:
+            logger.error(f"Error in batched model inference: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            continue
+
+        for (_, future), raw_response in zip(runnable, outputs):
+            if future.done():
+                continue
+            try:
+                future.set_result(_clean_model_response(raw_response))
+            except Exception as e:
+                future.set_exception(e)
+
+def build_async_generation_config(tokenizer):
+    """Generation settings for balanced, natural responses on the async path"""
+    # Imported here with torch: transformers' generation module pulls torch in
+    from transformers import GenerationConfig
+    return GenerationConfig(
+        max_length=1024,  # Increased from 512 for longer responses
+        num_return_sequences=1,
+        no_repeat_ngram_size=3,
+        do_sample=True,
+        pad_token_id=tokenizer.eos_token_id,
+        repetition_penalty=1.3,
+        min_length=50,  # Increased from 20 to ensure meaningful responses
+        eos_token_id=tokenizer.eos_token_id
+    )
+
+def _async_config(self):
+    """The async config built once per model/tokenizer in _ensure_generation_assets"""
+    self._ensure_generation_assets()
+    return self._async_generation_config
+
 def _generate_model_response(self, prompt: str) -> str:
     """Internal method for model inference"""
     try:
-        # Encode prompt
-        inputs = self.tokenizer(
-            prompt,
-            return_tensors="pt",
-            padding=True,
-            truncation=True,
-            max_length=1024  # Increased from 512 to allow longer prompts
-        )
+        # Degenerate inputs never reach the model
+        if not prompt.strip():
+            return get_response_templates().get_empty_response_fallback()
         
-        # Move to GPU if available
-        if torch.cuda.is_available():
-            inputs = {k: v.cuda() for k, v in inputs.items()}
-        
-        # Set generation config for balanced, natural responses
-        from transformers import GenerationConfig
-        generation_config = GenerationConfig(
-            max_length=1024,  # Increased from 512 for longer responses
-            num_return_sequences=1,
-            no_repeat_ngram_size=3,
-            do_sample=True,
-            pad_token_id=self.tokenizer.eos_token_id,
-            repetition_penalty=1.3,
-            min_length=50,  # Increased from 20 to ensure meaningful responses
-            eos_token_id=self.tokenizer.eos_token_id
-        )
-        self.model.generation_config = generation_config
+        torch = _get_torch()
+        generation_config = _async_config(self)
+        max_length = getattr(generation_config, "max_length", None) or 1024
+        
+        # Reuse the pre-encoded REALITY_ANCHOR (and its prefilled cache) and only tokenize the dynamic tail
+        inputs = None
+        if self._anchor_ids is not None and prompt.startswith(REALITY_ANCHOR):
+            tail = self.tokenizer(
+                prompt[len(REALITY_ANCHOR):],
+                return_tensors="np",
+                add_special_tokens=False
+            )["input_ids"]
+            prompt_length = self._anchor_ids.shape[1] + tail.shape[1]
+            if tail.shape[1] == 0 or prompt_length >= max_length:
+                # Nothing to answer, or no room left for new tokens: generate() would only echo the prompt
+                return get_response_templates().get_empty_response_fallback()
+            input_ids = torch.cat([self._anchor_ids, self._to_model_device(tail)], dim=1)
+            inputs = {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+            if self._anchor_kv is not None:
+                inputs["past_key_values"] = copy.deepcopy(self._anchor_kv)
         
-        # Generate response
-        outputs = self.model.generate(**inputs)
+        if inputs is None:
+            # Encode prompt
+            encoded = self.tokenizer(
+                prompt,
+                return_tensors="np",
+                padding=True,
+                truncation=True,
+                max_length=1024  # Increased from 512 to allow longer prompts
+            )
+            if encoded["input_ids"].shape[1] >= max_length:
+                return get_response_templates().get_empty_response_fallback()
+            
+            # Move to the model device (pinned, non-blocking copy on CUDA)
+            inputs = {k: self._to_model_device(v) for k, v in encoded.items()}
+        
+        # Generate response with the precomputed balanced, natural settings
+        with torch.inference_mode():
+            outputs = self.model.generate(**inputs, generation_config=generation_config)
         
         # Decode and clean response
         response = self.tokenizer.decode(
             outputs[0],
             skip_special_tokens=True
         )
-        
-        # Extract just the response part after "Codette:"
-        response_parts = response.split("Codette:")
-        if len(response_parts) > 1:
-            response = response_parts[1].strip()
-            
-        # Filter out system messages and protected content (strip markers from text)
-        system_markers = [
-            '[Protected:', '[System:', '[System optimized response]',
-        ]
-        
-        lines = response.split('\n')
-        filtered_lines = []
-        for line in lines:
-            # Skip lines that are purely system markers
-            if any(marker in line for marker in system_markers):
-                # Try to extract content after marker instead of skipping entirely
-                cleaned_line = line
-                for marker in system_markers:
-                    if marker in cleaned_line:
-                        # Remove the marker from the line
-                        cleaned_line = cleaned_line.replace(marker, '').strip()
-                if cleaned_line:  # Only add if something remains
-                    filtered_lines.append(cleaned_line)
-            else:
-                # Keep lines without markers as-is
-                filtered_lines.append(line)
-            
-        response = '\n'.join(filtered_lines).strip()  # Use newline join, not space
-        
-        # Return whatever we got (don't replace with default unless truly empty)
-        if response.strip():
-            # Clean up any remaining character dialogues
-            if ':' in response:
-                parts = response.split(':', 1)
-                speaker = parts[0].lower().strip()
-                if speaker == 'codette':
-                    response = parts[1].strip()
-        else:
-            response_templates = get_response_templates()
-            response = response_templates.get_empty_response_fallback()
-        
-        return response.strip()
+        return _clean_model_response(response)
         
     except Exception as e:
         logger.error(f"Error in model inference: {e}")
-        raise
\ No newline at end of file
+        raise
+
+def _clean_model_response(response: str) -> str:
+    """Strip the prompt echo and system markers from a decoded generation"""
+    # Extract just the response part after "Codette:"
+    response_parts = response.split("Codette:")
+    if len(response_parts) > 1:
+        response = response_parts[1].strip()
+        
+    # Filter out system messages and protected content (strip markers from text)
+    lines = response.split('\n')
+    filtered_lines = []
+    for line in lines:
+        # Strip system markers in one pass; drop the line if nothing else remains
+        if _SYS_MARKER_RE.search(line):
+            cleaned_line = _SYS_MARKER_RE.sub('', line).strip()
+            if cleaned_line:  # Only add if something remains
+                filtered_lines.append(cleaned_line)
+        else:
+            # Keep lines without markers as-is
+            filtered_lines.append(line)
+        
+    response = '\n'.join(filtered_lines).strip()  # Use newline join, not space
+    
+    # Return whatever we got (don't replace with default unless truly empty)
+    if response.strip():
+        # Clean up any remaining character dialogues
+        if ':' in response:
+            parts = response.split(':', 1)
+            speaker = parts[0].lower().strip()
+            if speaker == 'codette':
+                response = parts[1].strip()
+    else:
+        response_templates = get_response_templates()
+        response = response_templates.get_empty_response_fallback()
+    
+    return response.strip()
@@ -2,7 +2,11 @@
 Tracing integration for AICore component
 Instruments the main AI orchestration system with OpenTelemetry
 """
+import contextvars
+import inspect
 import logging
+import os
+import random
 from typing import Dict, Any, Optional, List
 from functools import wraps
 
@@ -13,11 +17,63 @@ try:
     from src.utils.tracing_config import get_tracer
     from opentelemetry import trace
     from opentelemetry.trace import Status, StatusCode
+    _STATUS_OK = Status(StatusCode.OK)  # immutable, shared by every successful span
     TRACING_AVAILABLE = True
 except ImportError:
     TRACING_AVAILABLE = False
     logger.debug("OpenTelemetry not available for AICore tracing")
 
+# Head sampling: fraction of traces that are recorded (CODETTE_TRACE_SAMPLE, default all).
+# The decision is made once at the root span; nested calls follow it
+try:
+    TRACE_SAMPLE_RATE = float(os.getenv("CODETTE_TRACE_SAMPLE", "1.0"))
+except ValueError:
+    TRACE_SAMPLE_RATE = 1.0
+_TRACE_NONE = not TRACING_AVAILABLE or TRACE_SAMPLE_RATE <= 0.0
+_TRACE_ALL = not _TRACE_NONE and TRACE_SAMPLE_RATE >= 1.0
+
+# Set while a call whose trace was not sampled runs, so its nested calls stay untraced
+# instead of starting root spans of their own
+_UNSAMPLED = contextvars.ContextVar("codette_trace_unsampled", default=False)
+
+
+_TRACER = None
+
+
+def _tracer():
+    """The tracer from tracing_config, resolved on first use and reused for every span"""
+    global _TRACER
+    if _TRACER is None:
+        _TRACER = get_tracer()
+    return _TRACER
+
+
+def reset_tracer():
+    """Drop the cached tracer so the next span re-reads it (e.g. after setup_tracing in tests)"""
+    global _TRACER
+    _TRACER = None
+
+
+def _should_trace() -> bool:
+    """Sampling decision for one traced call; untraced calls allocate no span or attributes"""
+    if _TRACE_ALL:
+        return True
+    if _TRACE_NONE or _UNSAMPLED.get():
+        return False
+    span_context = trace.get_current_span().get_span_context()
+    if span_context.is_valid:
+        # Inside a trace: follow the decision made at its root
+        return span_context.trace_flags.sampled
+    return random.random() < TRACE_SAMPLE_RATE
+
+
+def _recording_span():
+    """The current span if it is being recorded (events are only added to sampled traces)"""
+    if _TRACE_NONE:
+        return None
+    span = trace.get_current_span()
+    return span if span.is_recording() else None
+
 
 def trace_ai_operation(operation_name: str):
     """
@@ -26,20 +82,24 @@ def trace_ai_operation(operation_name: str):
     Args:
         operation_name: Name of the operation being traced
     """
+    # Span name and attributes are fixed per operation; OpenTelemetry copies them into each span
+    span_name = f"ai_core.{operation_name}"
+    span_attributes = {"component": "ai_core", "operation": operation_name}
+    
     def decorator(func):
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            if not TRACING_AVAILABLE:
-                return await func(*args, **kwargs)
+            if not _should_trace():
+                token = _UNSAMPLED.set(True)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _UNSAMPLED.reset(token)
             
-            tracer = get_tracer()
-            with tracer.start_as_current_span(
-                f"ai_core.{operation_name}",
-                attributes={"component": "ai_core", "operation": operation_name}
-            ) as span:
+            with _tracer().start_as_current_span(span_name, attributes=span_attributes) as span:
                 try:
                     result = await func(*args, **kwargs)
-                    span.set_status(Status(StatusCode.OK))
+                    span.set_status(_STATUS_OK)
                     return result
                 except Exception as e:
                     span.set_status(Status(StatusCode.ERROR, str(e)))
@@ -48,17 +108,17 @@ def trace_ai_operation(operation_name: str):
         
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
-            if not TRACING_AVAILABLE:
-                return func(*args, **kwargs)
+            if not _should_trace():
+                token = _UNSAMPLED.set(True)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    _UNSAMPLED.reset(token)
             
-            tracer = get_tracer()
-            with tracer.start_as_current_span(
-                f"ai_core.{operation_name}",
-                attributes={"component": "ai_core", "operation": operation_name}
-            ) as span:
+            with _tracer().start_as_current_span(span_name, attributes=span_attributes) as span:
                 try:
                     result = func(*args, **kwargs)
-                    span.set_status(Status(StatusCode.OK))
+                    span.set_status(_STATUS_OK)
                     return result
                 except Exception as e:
                     span.set_status(Status(StatusCode.ERROR, str(e)))
@@ -66,8 +126,7 @@ def trace_ai_operation(operation_name: str):
                     raise
         
         # Return appropriate wrapper based on function type
-        import asyncio
-        if asyncio.iscoroutinefunction(func):
+        if inspect.iscoroutinefunction(func):
             return async_wrapper
         else:
             return sync_wrapper
@@ -77,17 +136,17 @@ def trace_ai_operation(operation_name: str):
 
 def trace_perspective_selection(prompt: str, perspectives: List[str]):
     """
-    Trace perspective selection process
+    Record perspective selection as an event on the current span
     
     Args:
         prompt: User input prompt
         perspectives: Selected perspectives
     """
-    if not TRACING_AVAILABLE:
+    span = _recording_span()
+    if span is None:
         return
     
-    tracer = get_tracer()
-    with tracer.start_as_current_span(
+    span.add_event(
         "ai_core.perspective_selection",
         attributes={
             "component": "perspective_engine",
@@ -95,11 +154,16 @@ def trace_perspective_selection(prompt: str, perspectives: List[str]):
             "perspectives.count": len(perspectives),
             "perspectives.list": ", ".join(perspectives)
         }
-    ):
-        pass
+    )
 
 
-def trace_perspective_generation(perspective_name: str, prompt: str, response: str, temperature: float):
+def trace_perspective_generation(
+    perspective_name: str,
+    prompt: str,
+    response: str,
+    temperature: float,
+    extra: Optional[Dict[str, Any]] = None
+):
     """
     Trace individual perspective generation
     
@@ -108,38 +172,38 @@ def trace_perspective_generation(perspective_name: str, prompt: str, response: s
         prompt: Input prompt
         response: Generated response
         temperature: Temperature used for generation
+        extra: Additional span attributes, set together with the standard ones
     """
-    if not TRACING_AVAILABLE:
+    if not _should_trace():
         return
     
-    tracer = get_tracer()
-    with tracer.start_as_current_span(
-        f"perspective.{perspective_name}",
-        attributes={
-            "component": "perspective_engine",
-            "perspective.name": perspective_name,
-            "perspective.temperature": temperature,
-            "prompt.length": len(prompt),
-            "response.length": len(response),
-        }
-    ) as span:
-        span.set_status(Status(StatusCode.OK))
+    attributes = {
+        "component": "perspective_engine",
+        "perspective.name": perspective_name,
+        "perspective.temperature": temperature,
+        "prompt.length": len(prompt),
+        "response.length": len(response),
+    }
+    if extra:
+        attributes.update(extra)
+    with _tracer().start_as_current_span(f"perspective.{perspective_name}", attributes=attributes) as span:
+        span.set_status(_STATUS_OK)
 
 
 def trace_quantum_propagation(dimensions: int, coherence: float, entanglement: float):
     """
-    Trace quantum spiderweb thought propagation
+    Record quantum spiderweb thought propagation as an event on the current span
     
     Args:
         dimensions: Number of quantum dimensions
         coherence: Coherence metric
         entanglement: Entanglement metric
     """
-    if not TRACING_AVAILABLE:
+    span = _recording_span()
+    if span is None:
         return
     
-    tracer = get_tracer()
-    with tracer.start_as_current_span(
+    span.add_event(
         "quantum.spiderweb_propagation",
         attributes={
             "component": "quantum_spiderweb",
@@ -147,51 +211,48 @@ def trace_quantum_propagation(dimensions: int, coherence: float, entanglement: f
             "quantum.coherence": coherence,
             "quantum.entanglement": entanglement,
         }
-    ):
-        pass
+    )
 
 
 def trace_memory_operation(operation: str, memory_size: int):
     """
-    Trace memory operations (cocoon wrapping/unwrapping)
+    Record memory operations (cocoon wrapping/unwrapping) as events on the current span
     
     Args:
         operation: Type of memory operation (wrap, unwrap, etc.)
         memory_size: Size of memory in bytes
     """
-    if not TRACING_AVAILABLE:
+    span = _recording_span()
+    if span is None:
         return
     
-    tracer = get_tracer()
-    with tracer.start_as_current_span(
+    span.add_event(
         f"memory.{operation}",
         attributes={
             "component": "cocoon_manager",
             "memory.operation": operation,
             "memory.size_bytes": memory_size,
         }
-    ):
-        pass
+    )
 
 
 def trace_aegis_enhancement(input_text: str, enhanced: bool):
     """
-    Trace AEGIS safety council enhancement
+    Record AEGIS safety council enhancement as an event on the current span
     
     Args:
         input_text: Input text
         enhanced: Whether enhancement was applied
     """
-    if not TRACING_AVAILABLE:
+    span = _recording_span()
+    if span is None:
         return
     
-    tracer = get_tracer()
-    with tracer.start_as_current_span(
+    span.add_event(
         "aegis.safety_enhancement",
         attributes={
             "component": "aegis_bridge",
             "input.length": len(input_text),
             "enhancement.applied": enhanced,
         }
-    ):
-        pass
+    )
@@ -3,37 +3,80 @@ Biokinetic Neural Mesh - A biomimetic neural routing system
 Combines biological neural patterns with kinetic state processing for ultra-fast routing
 """
 
-try:
-    import numpy as np
-except Exception:
-    np = None
+import numpy as np
 
 try:
     import torch
 except Exception:
     torch = None
 
+try:
+    from numba import njit
+except Exception:
+    njit = None
+
 from typing import Dict, List, Tuple, Optional, Set, Any
-from dataclasses import dataclass
+import functools
 import logging
 from pathlib import Path
 import json
+import zipfile
 from .quantum_spiderweb import QuantumSpiderweb  # Changed to relative import
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Stands in for an absent context key in the context pattern cache
+_MISSING = object()
+
+# Default activation patterns for nodes created without one (meshes draw their own)
+_NODE_RNG = np.random.default_rng()
+
+def _cosine_batch(patterns, norms, energy):
+    """Cosine similarity of every pattern row (with precomputed row norms) against one vector."""
+    return (patterns @ energy) / (norms * (np.linalg.norm(energy) + 1e-12))
+
+def _cosine_rows(patterns, norms, energy):
+    """Loop form of _cosine_batch for numba; float32 in, float32 out."""
+    energy_norm = np.float32(0.0)
+    for k in range(energy.shape[0]):
+        energy_norm += energy[k] * energy[k]
+    energy_norm = np.sqrt(energy_norm) + np.float32(1e-12)
+    out = np.empty(patterns.shape[0], dtype=np.float32)
+    for i in range(patterns.shape[0]):
+        dot = np.float32(0.0)
+        for k in range(patterns.shape[1]):
+            dot += patterns[i, k] * energy[k]
+        out[i] = dot / (norms[i] * energy_norm)
+    return out
+
+_COSINE_JIT = False
+if njit is not None:
+    try:
+        # Compiled artifacts are cached on disk (honours NUMBA_CACHE_DIR)
+        _cosine_batch = njit(cache=True, fastmath=True)(_cosine_rows)
+        _COSINE_JIT = True
+    except Exception as e:
+        logger.debug(f"numba cosine kernel unavailable: {e}")
+
 class SynapticNode:
-    """Represents a node in the biokinetic mesh"""
-    id: str
-    energy: float = 1.0
-    connections: Dict[str, float] = None
-    activation_pattern: 'np.ndarray' = None
-    kinetic_state: float = 0.0
+    """Represents a node in the biokinetic mesh.
     
-    def __post_init__(self):
-        self.connections = self.connections or {}
-        self.activation_pattern = self.activation_pattern or np.random.rand(128)
+    Connections and kinetic state are kept by the owning BioKineticMesh in flat arrays
+    indexed by the node's row (see BioKineticMesh.get_connections / kinetic_states).
+    """
+    
+    __slots__ = ("id", "energy", "activation_pattern")
+    
+    def __init__(self,
+                 id: str,
+                 energy: float = 1.0,
+                 activation_pattern: 'np.ndarray' = None):
+        self.id = id
+        self.energy = energy
+        # float32 end to end: half the bandwidth of float64 and no dtype conversion for torch
+        if activation_pattern is None:
+            activation_pattern = _NODE_RNG.random(128, dtype=np.float32)
+        self.activation_pattern = np.asarray(activation_pattern, dtype=np.float32)
 
 class BioKineticMesh:
     """
@@ -56,27 +99,29 @@ class BioKineticMesh:
                  learning_rate: float = 0.01,
                  prune_threshold: float = 0.1,
                  quantum_influence: float = 0.3,
-                 perspective_resonance: float = 0.2):
+                 perspective_resonance: float = 0.2,
+                 seed: Optional[int] = None):
         self.nodes: Dict[str, SynapticNode] = {}
         self.energy_threshold = energy_threshold
         self.learning_rate = learning_rate
         self.prune_threshold = prune_threshold
         self.quantum_influence = quantum_influence
         self.perspective_resonance = perspective_resonance
+        # One Generator for every random draw the mesh makes (pass seed for reproducible meshes)
+        self._rng = np.random.default_rng(seed)
         
-        # Kinetic state tensors
+        # Kinetic state tensors (on the GPU when one is available)
         if torch is not None:
-            self.kinetic_matrix = torch.zeros((initial_nodes, initial_nodes))
-            self.energy_gradients = torch.zeros(initial_nodes)
+            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+            self.kinetic_matrix = torch.zeros((initial_nodes, initial_nodes), device=self.device)
+            self.energy_gradients = torch.zeros(initial_nodes, device=self.device)
         else:
+            self.device = None
             self.kinetic_matrix = None
-            self.energy_gradients = [0.0] * initial_nodes
+            self.energy_gradients = np.zeros(initial_nodes, dtype=np.float32)
         
         # Pattern recognition layers
-        if np is not None:
-            self.pattern_embeddings = np.random.rand(initial_nodes, 128)
-        else:
-            self.pattern_embeddings = [[0.0]*128 for _ in range(initial_nodes)]
+        self.pattern_embeddings = self._rng.random((initial_nodes, 128), dtype=np.float32)
         
         # Activation history
         self.activation_history: List['np.ndarray'] = []
@@ -86,6 +131,26 @@ class BioKineticMesh:
         self.perspective_weights: Dict[str, Dict[str, float]] = {}  # Per-node perspective weights
         self.active_pathways: Set[Tuple[str, str]] = set()  # Currently active neural pathways
         
+        # Node patterns stacked row-per-node for batched routing (see _rebuild_pattern_index)
+        self._node_id_list: List[str] = []
+        self._node_index: Dict[str, int] = {}
+        self.pattern_matrix = None
+        self.pattern_norms = None
+        # torch copies on self.device (views of the same memory on CPU), rebuilt with the
+        # matrix; None without torch
+        self.pattern_matrix_t = None
+        self.pattern_norms_t = None
+        
+        # Per-node kinetic state and CSR connections (row i's targets/weights are
+        # conn_neighbors/conn_weights[conn_indptr[i]:conn_indptr[i + 1]])
+        self.kinetic_states = np.zeros(0)
+        self.conn_indptr = np.zeros(1, dtype=np.int64)
+        self.conn_neighbors = np.zeros(0, dtype=np.int32)
+        self.conn_weights = np.zeros(0, dtype=np.float32)
+        
+        # Context patterns depend only on (mode, priority), so they are memoized per mesh
+        self._context_patterns = functools.lru_cache(maxsize=128)(self._build_context_pattern)
+        
         # Initialize mesh
         # Initialize mesh
         try:
@@ -95,27 +160,73 @@ class BioKineticMesh:
         
     def _initialize_mesh(self, node_count: int):
         """Initialize the biokinetic mesh with initial nodes"""
+        patterns = self._rng.random((node_count, 128), dtype=np.float32)
         for i in range(node_count):
             node_id = f"BK_{i}"
             self.nodes[node_id] = SynapticNode(
                 id=node_id,
                 energy=1.0,
-                activation_pattern=np.random.rand(128)
+                activation_pattern=patterns[i]
             )
             
-        # Create initial connections (sparse)
-        for node in self.nodes.values():
-            connection_count = np.random.randint(5, 15)
-            target_nodes = np.random.choice(
-                list(self.nodes.keys()), 
-                size=connection_count, 
-                replace=False
-            )
-            node.connections = {
-                target: np.random.rand() 
-                for target in target_nodes 
-                if target != node.id
-            }
+        self._rebuild_pattern_index()
+        row_count = len(self._node_id_list)
+        self.kinetic_states = np.zeros(row_count)
+            
+        # Create initial connections (sparse): 5-14 distinct targets per node, self-loops dropped
+        counts = np.minimum(self._rng.integers(5, 15, size=row_count), row_count)
+        sources = np.repeat(np.arange(row_count), counts)
+        targets = np.concatenate(
+            [self._rng.choice(row_count, size=count, replace=False) for count in counts]
+            or [np.zeros(0, dtype=np.int64)]
+        )
+        keep = targets != sources
+        weights = self._rng.random(len(targets))[keep]
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(sources[keep], minlength=row_count))))
+        self._set_connection_arrays(indptr, targets[keep], weights)
+
+    def _rebuild_pattern_index(self):
+        """Stack node activation patterns into one matrix; call whenever nodes are added or replaced"""
+        self._node_id_list = list(self.nodes.keys())
+        self._node_index = {node_id: i for i, node_id in enumerate(self._node_id_list)}
+        if not self._node_id_list:
+            self.pattern_matrix = np.zeros((0, 128), dtype=np.float32)
+            self.pattern_norms = np.zeros(0, dtype=np.float32)
+        else:
+            self.pattern_matrix = np.stack([self.nodes[node_id].activation_pattern for node_id in self._node_id_list])
+            self.pattern_norms = np.linalg.norm(self.pattern_matrix, axis=1) + 1e-12
+        if torch is not None:
+            self.pattern_matrix_t = torch.from_numpy(self.pattern_matrix).contiguous().to(self.device)
+            self.pattern_norms_t = torch.from_numpy(self.pattern_norms).to(self.device)
+
+    def _set_connection_arrays(self, indptr, neighbors, weights):
+        """Install CSR connection arrays (one row per node, in _node_id_list order)"""
+        self.conn_indptr = np.asarray(indptr, dtype=np.int64)
+        self.conn_neighbors = np.asarray(neighbors, dtype=np.int32)
+        self.conn_weights = np.asarray(weights, dtype=np.float32)
+
+    def _load_connections(self, connections: Dict[str, Dict[str, float]]):
+        """Build the CSR arrays from per-node {target_id: weight} maps; unknown targets are dropped"""
+        indptr = [0]
+        neighbors: List[int] = []
+        weights: List[float] = []
+        for node_id in self._node_id_list:
+            for target_id, weight in (connections.get(node_id) or {}).items():
+                target = self._node_index.get(target_id)
+                if target is not None:
+                    neighbors.append(target)
+                    weights.append(weight)
+            indptr.append(len(neighbors))
+        self._set_connection_arrays(indptr, neighbors, weights)
+
+    def get_connections(self, node_id: str) -> Dict[str, float]:
+        """Outgoing connections of a node as {target_id: weight}"""
+        i = self._node_index[node_id]
+        start, end = self.conn_indptr[i], self.conn_indptr[i + 1]
+        return {
+            self._node_id_list[target]: float(weight)
+            for target, weight in zip(self.conn_neighbors[start:end], self.conn_weights[start:end])
+        }
 
     def route_intent(self, 
                     input_pattern: np.ndarray, 
@@ -127,18 +238,32 @@ class BioKineticMesh:
         # Convert input to energy pattern
         energy_pattern = self._compute_energy_pattern(input_pattern)
         
-        # Fast activation: fall back to python loop if torch missing
-        activations = []
-        for node in self.nodes.values():
-            try:
-                act = self._compute_node_activation(node, energy_pattern, context)
-            except Exception:
-                act = 0.0
-            activations.append(act)
+        # Cosine similarity against every node in one matrix-vector product. The compiled
+        # kernel is fastest on CPU; on a GPU, or without it, torch.mv runs on the persistent tensors.
+        use_torch = self.pattern_matrix_t is not None and (
+            not _COSINE_JIT or self.device.type != "cpu"
+        )
+        if use_torch:
+            activations = self._torch_similarities(energy_pattern.reshape(-1))
+        else:
+            energy = np.ascontiguousarray(energy_pattern, dtype=np.float32).reshape(-1)
+            activations = _cosine_batch(self.pattern_matrix, self.pattern_norms, energy)
+        activations += self.kinetic_states * self.learning_rate
+        
+        # Context influence: a second gemv against the shared context vector
+        if context:
+            context_pattern, context_tensor = self._context_patterns(
+                context.get("mode", _MISSING), context.get("priority", _MISSING)
+            )
+            if use_torch:
+                context_sims = self._torch_similarities(context_tensor[0])
+            else:
+                context_sims = _cosine_batch(self.pattern_matrix, self.pattern_norms, context_pattern)
+            activations *= 1.0 + 0.5 * context_sims
 
         # Find highest energy path
-        max_idx = int(max(range(len(activations)), key=lambda i: activations[i]))
-        node_id = list(self.nodes.keys())[max_idx]
+        max_idx = int(activations.argmax())
+        node_id = self._node_id_list[max_idx]
         confidence = float(activations[max_idx])
         
         # Update kinetic state
@@ -146,73 +271,73 @@ class BioKineticMesh:
         
         return node_id, confidence
 
-    def _compute_energy_pattern(self, input_pattern: np.ndarray) -> torch.Tensor:
+    def route_intents(self,
+                      input_patterns: np.ndarray,
+                      context: Optional[Dict] = None,
+                      k: int = 1) -> List[List[Tuple[str, float]]]:
+        """
+        Route a (B, 128) batch of input patterns with one matrix product.
+        Returns the top-k (node_id, activation) pairs per row. Every row is scored against
+        the same kinetic state; each row's best node then updates it, in order.
+        """
+        if not self._node_id_list:
+            return [[] for _ in range(len(input_patterns))]
+        k = min(k, len(self._node_id_list))
+        kinetic_boost = self.kinetic_states * self.learning_rate
+        if context:
+            context_pattern, context_tensor = self._context_patterns(
+                context.get("mode", _MISSING), context.get("priority", _MISSING)
+            )
+        
+        # The kinetic transform only rescales the energy vector, so cosine similarity
+        # against the raw inputs gives the same scores as route_intent
+        if torch is not None:
+            inputs = torch.as_tensor(input_patterns, dtype=torch.float32)
+            if self.device.type == "cuda":
+                inputs = inputs.pin_memory().to(self.device, non_blocking=True)
+            activations = inputs @ self.pattern_matrix_t.T
+            activations /= (inputs.norm(dim=1, keepdim=True) + 1e-12) * self.pattern_norms_t
+            activations += torch.from_numpy(kinetic_boost).to(activations)
+            if context:
+                activations *= 1.0 + 0.5 * torch.mv(self.pattern_matrix_t, context_tensor[0]) / (
+                    self.pattern_norms_t * (context_tensor.norm() + 1e-12)
+                )
+            values, indices = torch.topk(activations, k, dim=1)
+            values, indices = values.cpu().numpy(), indices.cpu().numpy()
+        else:
+            inputs = np.asarray(input_patterns, dtype=np.float32)
+            activations = inputs @ self.pattern_matrix.T
+            activations /= (np.linalg.norm(inputs, axis=1, keepdims=True) + 1e-12) * self.pattern_norms
+            activations += kinetic_boost
+            if context:
+                activations *= 1.0 + 0.5 * _cosine_batch(self.pattern_matrix, self.pattern_norms, context_pattern)
+            indices = np.argsort(-activations, axis=1, kind="stable")[:, :k]
+            values = np.take_along_axis(activations, indices, axis=1)
+        
+        results = []
+        for row_values, row_indices in zip(values, indices):
+            routes = [(self._node_id_list[i], float(v)) for i, v in zip(row_indices, row_values)]
+            self._update_kinetic_state(*routes[0])
+            results.append(routes)
+        return results
+
+    def _torch_similarities(self, vector: 'torch.Tensor') -> np.ndarray:
+        """Cosine similarity of every node pattern against one vector via torch.mv"""
+        sims = torch.mv(self.pattern_matrix_t, vector)
+        sims /= self.pattern_norms_t * (vector.norm() + 1e-12)
+        return sims.cpu().numpy()
+
+    def _compute_energy_pattern(self, input_pattern: np.ndarray) -> 'torch.Tensor':
         """Convert input pattern to energy distribution"""
         # Normalize input
-        if np is not None:
-            input_norm = input_pattern / (np.linalg.norm(input_pattern) + 1e-12)
-        else:
-            # Simple python normalization
-            mag = sum(x*x for x in input_pattern) ** 0.5
-            input_norm = [x / (mag + 1e-12) for x in input_pattern]
+        input_norm = input_pattern / (np.linalg.norm(input_pattern) + 1e-12)
 
         # Create energy tensor if torch available
-        if torch is not None and np is not None:
-            energy = torch.from_numpy(input_norm).float()
-            energy = self._apply_kinetic_transform(energy)
-            return energy
-        else:
-            return input_norm
-
-    def _compute_node_activation(self, 
-                               node: SynapticNode, 
-                               energy_pattern: torch.Tensor,
-                               context: Optional[Dict]) -> float:
-        """Compute node activation based on energy pattern and context"""
-        # Base activation from pattern match (torch optional)
         if torch is not None:
-            base_activation = torch.cosine_similarity(
-                energy_pattern,
-                torch.from_numpy(node.activation_pattern).float().unsqueeze(0),
-                dim=1
-            )
-            base_val = base_activation.item()
-        else:
-            # fallback cosine similarity
-            a = energy_pattern if isinstance(energy_pattern, (list, tuple)) else energy_pattern.tolist()
-            b = node.activation_pattern.tolist() if hasattr(node.activation_pattern, 'tolist') else list(node.activation_pattern)
-            dot = sum(x*y for x,y in zip(a,b))
-            norm_a = sum(x*x for x in a) ** 0.5
-            norm_b = sum(x*x for x in b) ** 0.5
-            base_val = dot / (norm_a * norm_b + 1e-12)
-        
-        # Apply kinetic state
-        kinetic_boost = node.kinetic_state * self.learning_rate
-        
-        # Context influence
-        context_factor = 1.0
-        if context:
-            context_pattern = self._context_to_pattern(context)
-            if torch is not None:
-                context_match = torch.cosine_similarity(
-                    torch.from_numpy(context_pattern).float().unsqueeze(0),
-                    torch.from_numpy(node.activation_pattern).float().unsqueeze(0),
-                    dim=1
-                )
-                context_factor = 1.0 + (context_match.item() * 0.5)
-            else:
-                # simple fallback dot match
-                a = context_pattern
-                b = node.activation_pattern.tolist() if hasattr(node.activation_pattern, 'tolist') else list(node.activation_pattern)
-                dot = sum(x*y for x,y in zip(a,b))
-                norm_a = sum(x*x for x in a) ** 0.5
-                norm_b = sum(x*x for x in b) ** 0.5
-                match = dot / (norm_a * norm_b + 1e-12)
-                context_factor = 1.0 + (match * 0.5)
-        
-        return (base_val + kinetic_boost) * context_factor
+            input_norm = torch.from_numpy(input_norm).float().to(self.device)
+        return self._apply_kinetic_transform(input_norm)
 
-    def _apply_kinetic_transform(self, energy: torch.Tensor) -> torch.Tensor:
+    def _apply_kinetic_transform(self, energy: 'torch.Tensor') -> 'torch.Tensor':
         """Apply kinetic transformation to energy pattern"""
         if torch is not None:
             # Create momentum factor
@@ -226,73 +351,68 @@ class BioKineticMesh:
             
             return energy
         else:
-            mean_grad = sum(self.energy_gradients)/len(self.energy_gradients) if self.energy_gradients else 0.0
-            momentum = 1.0 / (1.0 + (2.718281828 ** (-mean_grad)))
-            energy = [e * (1.0 + momentum) for e in energy]
-            mag = sum(x*x for x in energy) ** 0.5
-            energy = [x / (mag + 1e-12) for x in energy]
-            return energy
+            mean_grad = float(self.energy_gradients.mean()) if self.energy_gradients.size else 0.0
+            momentum = 1.0 / (1.0 + np.exp(-mean_grad))
+            energy = energy * (1.0 + momentum)
+            return energy / (np.linalg.norm(energy) + 1e-12)
 
     def _update_kinetic_state(self, node_id: str, activation: float):
         """Update kinetic state of the network"""
+        kinetic = self.kinetic_states
+        i = self._node_index[node_id]
+        
         # Update node energy
-        node = self.nodes[node_id]
-        node.kinetic_state += self.learning_rate * (activation - node.kinetic_state)
+        kinetic[i] += self.learning_rate * (activation - kinetic[i])
         
-        # Update connected nodes
-        for target_id, weight in node.connections.items():
-            if target_id in self.nodes:
-                target = self.nodes[target_id]
-                target.kinetic_state += (
-                    self.learning_rate * weight * (activation - target.kinetic_state)
-                )
+        # Update connected nodes (targets within a row are unique)
+        row = slice(self.conn_indptr[i], self.conn_indptr[i + 1])
+        targets = self.conn_neighbors[row]
+        kinetic[targets] += self.learning_rate * self.conn_weights[row] * (activation - kinetic[targets])
 
     def _context_to_pattern(self, context: Dict) -> np.ndarray:
-        """Convert context dictionary to pattern vector"""
+        """Convert context dictionary to pattern vector (cached; the result is read-only)"""
+        return self._context_patterns(context.get("mode", _MISSING), context.get("priority", _MISSING))[0]
+
+    def _build_context_pattern(self, mode: Any, priority: Any):
+        """Pattern vector for a context's mode/priority, plus its (1, 128) tensor when torch is available"""
         # Create empty pattern
-        if np is not None:
-            pattern = np.zeros(128)
-        else:
-            pattern = [0.0]*128
+        pattern = np.zeros(128, dtype=np.float32)
         
         # Add context influences
-        if "mode" in context:
+        if mode is not _MISSING:
             pattern += self.pattern_embeddings[
-                hash(context["mode"]) % len(self.pattern_embeddings)
+                hash(mode) % len(self.pattern_embeddings)
             ]
         
-        if "priority" in context:
-            priority_factor = float(context["priority"]) / 10.0
+        if priority is not _MISSING:
+            priority_factor = float(priority) / 10.0
             pattern *= (1.0 + priority_factor)
             
         # Normalize
-        if np is not None:
-            pattern = pattern / (np.linalg.norm(pattern) + 1e-8)
-        else:
-            mag = sum(x*x for x in pattern) ** 0.5
-            pattern = [x / (mag + 1e-8) for x in pattern]
+        pattern = pattern / (np.linalg.norm(pattern) + 1e-8)
         
-        return pattern
+        tensor = None
+        if torch is not None:
+            tensor = torch.from_numpy(pattern).unsqueeze(0).to(self.device)
+        pattern.setflags(write=False)
+        return pattern, tensor
 
     def prune_connections(self):
         """Remove weak or unused connections"""
-        for node in self.nodes.values():
-            # Find weak connections
-            weak_connections = [
-                target_id
-                for target_id, weight in node.connections.items()
-                if weight < self.prune_threshold
-            ]
-            
-            # Remove weak connections
-            for target_id in weak_connections:
-                del node.connections[target_id]
-                
-            # Normalize remaining connections
-            if node.connections:
-                total_weight = sum(node.connections.values())
-                for target_id in node.connections:
-                    node.connections[target_id] /= total_weight
+        row_count = len(self.conn_indptr) - 1
+        rows = np.repeat(np.arange(row_count), np.diff(self.conn_indptr))
+        
+        # Remove weak connections
+        keep = self.conn_weights >= self.prune_threshold
+        rows = rows[keep]
+        neighbors = np.compress(keep, self.conn_neighbors)
+        weights = np.compress(keep, self.conn_weights)
+        indptr = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=row_count))))
+        
+        # Normalize remaining connections (per-row totals in one pass)
+        totals = np.bincount(rows, weights=weights, minlength=row_count)[rows]
+        weights = np.divide(weights, totals, out=weights.astype(np.float64), where=totals != 0)
+        self._set_connection_arrays(indptr, neighbors, weights)
 
     def integrate_quantum_state(self, quantum_web: QuantumSpiderweb, node_id: str):
         """Integrate quantum web state with biokinetic mesh"""
@@ -304,14 +424,13 @@ class BioKineticMesh:
             self.quantum_resonance[node_id] = quantum_state["coherence"]
             
             # Influence node connections based on quantum state
-            node = self.nodes.get(node_id)
-            if node:
+            i = self._node_index.get(node_id)
+            if i is not None:
                 quantum_boost = quantum_state["coherence"] * self.quantum_influence
-                for target_id in node.connections:
-                    node.connections[target_id] *= (1.0 + quantum_boost)
+                self.conn_weights[self.conn_indptr[i]:self.conn_indptr[i + 1]] *= (1.0 + quantum_boost)
                     
                 # Update node's kinetic state
-                node.kinetic_state += quantum_boost
+                self.kinetic_states[i] += quantum_boost
                 
     def integrate_perspective_results(self, 
                                    node_id: str,
@@ -334,13 +453,10 @@ class BioKineticMesh:
                 self.perspective_weights[node_id][perspective] /= total_confidence
             
             # Apply perspective resonance to node
-            node = self.nodes.get(node_id)
-            if node:
-                resonance = sum(
-                    weight * self.perspective_resonance 
-                    for weight in self.perspective_weights[node_id].values()
-                )
-                node.kinetic_state *= (1.0 + resonance)
+            i = self._node_index.get(node_id)
+            if i is not None:
+                resonance = self.perspective_resonance * sum(self.perspective_weights[node_id].values())
+                self.kinetic_states[i] *= (1.0 + resonance)
                 
     def strengthen_pathway(self, node_sequence: List[str], reward: float):
         """Strengthen a successful pathway with integrated effects"""
@@ -348,17 +464,17 @@ class BioKineticMesh:
             current_id = node_sequence[i]
             next_id = node_sequence[i + 1]
             
-            if current_id in self.nodes and next_id in self.nodes:
-                current_node = self.nodes[current_id]
+            current = self._node_index.get(current_id)
+            target = self._node_index.get(next_id)
+            if current is not None and target is not None:
                 
                 # Add path to active pathways
                 self.active_pathways.add((current_id, next_id))
                 
                 # Calculate integrated boost
                 quantum_boost = self.quantum_resonance.get(current_id, 0.0)
-                perspective_boost = sum(
-                    self.perspective_weights.get(current_id, {}).values()
-                ) / max(len(self.perspective_weights.get(current_id, {})), 1)
+                perspective_weights = self.perspective_weights.get(current_id, {})
+                perspective_boost = sum(perspective_weights.values()) / max(len(perspective_weights), 1)
                 
                 total_boost = (
                     1.0 +
@@ -367,44 +483,83 @@ class BioKineticMesh:
                 )
                 
                 # Strengthen connection with integrated boost
-                if next_id in current_node.connections:
-                    current_node.connections[next_id] += (
-                        self.learning_rate * reward * total_boost
-                    )
+                delta = self.learning_rate * reward * total_boost
+                start, end = self.conn_indptr[current], self.conn_indptr[current + 1]
+                existing = np.flatnonzero(self.conn_neighbors[start:end] == target)
+                if existing.size:
+                    self.conn_weights[start + existing[0]] += delta
                 else:
-                    current_node.connections[next_id] = (
-                        self.learning_rate * reward * total_boost
-                    )
+                    # New synapse: append it to the end of the current node's row
+                    self.conn_neighbors = np.insert(self.conn_neighbors, end, target)
+                    self.conn_weights = np.insert(self.conn_weights, end, delta)
+                    self.conn_indptr[current + 1:] += 1
                     
                 # Update kinetic state
-                current_node.kinetic_state += (
-                    self.learning_rate * reward * total_boost
-                )
+                self.kinetic_states[current] += delta
 
     def save_state(self, path: Path):
-        """Save mesh state to file"""
-        state = {
-            "nodes": {
-                node_id: {
-                    "energy": node.energy,
-                    "connections": node.connections,
-                    "kinetic_state": node.kinetic_state,
-                    "activation_pattern": node.activation_pattern.tolist()
-                }
-                for node_id, node in self.nodes.items()
-            },
+        """Save mesh state to a compressed NumPy archive.
+        
+        Patterns, kinetic state, energies and the CSR connection arrays are stored as binary
+        arrays; node ids and parameters go in a small JSON string member.
+        """
+        meta = {
+            "node_ids": self._node_id_list,
             "params": {
                 "energy_threshold": self.energy_threshold,
                 "learning_rate": self.learning_rate,
                 "prune_threshold": self.prune_threshold
             }
         }
+        if self._node_id_list:
+            patterns = np.stack([self.nodes[node_id].activation_pattern for node_id in self._node_id_list])
+        else:
+            patterns = np.zeros((0, 128), dtype=np.float32)
         
-        with open(path, 'w') as f:
-            json.dump(state, f)
+        # Write through a file object so the archive lands at exactly `path` (no ".npz" suffix added)
+        with open(path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                patterns=patterns,
+                energies=np.array([self.nodes[node_id].energy for node_id in self._node_id_list], dtype=np.float64),
+                kinetic=self.kinetic_states,
+                conn_indptr=self.conn_indptr,
+                conn_neighbors=self.conn_neighbors,
+                conn_weights=self.conn_weights,
+                meta=np.array(json.dumps(meta))
+            )
 
     def load_state(self, path: Path):
-        """Load mesh state from file"""
+        """Load mesh state saved by save_state (older JSON state files are still accepted)"""
+        if not zipfile.is_zipfile(path):
+            self._load_json_state(path)
+            return
+        
+        with np.load(path) as archive:
+            meta = json.loads(str(archive["meta"]))
+            patterns = archive["patterns"]
+            energies = archive["energies"]
+            
+            # Restore nodes; each node's pattern is a row of the stored matrix
+            self.nodes = {
+                node_id: SynapticNode(
+                    id=node_id,
+                    energy=float(energies[i]),
+                    activation_pattern=patterns[i]
+                )
+                for i, node_id in enumerate(meta["node_ids"])
+            }
+            self._rebuild_pattern_index()
+            self.kinetic_states = archive["kinetic"].astype(np.float64)
+            self._set_connection_arrays(archive["conn_indptr"], archive["conn_neighbors"], archive["conn_weights"])
+        
+        # Restore parameters
+        self.energy_threshold = meta["params"]["energy_threshold"]
+        self.learning_rate = meta["params"]["learning_rate"]
+        self.prune_threshold = meta["params"]["prune_threshold"]
+
+    def _load_json_state(self, path: Path):
+        """Load the JSON state format written by earlier versions of save_state"""
         with open(path, 'r') as f:
             state = json.load(f)
             
@@ -413,14 +568,17 @@ class BioKineticMesh:
             node_id: SynapticNode(
                 id=node_id,
                 energy=data["energy"],
-                connections=data["connections"],
-                activation_pattern=np.array(data["activation_pattern"]),
-                kinetic_state=data["kinetic_state"]
+                activation_pattern=np.array(data["activation_pattern"], dtype=np.float32)
             )
             for node_id, data in state["nodes"].items()
         }
+        self._rebuild_pattern_index()
+        self.kinetic_states = np.array(
+            [state["nodes"][node_id]["kinetic_state"] for node_id in self._node_id_list], dtype=np.float64
+        )
+        self._load_connections({node_id: data["connections"] for node_id, data in state["nodes"].items()})
         
         # Restore parameters
         self.energy_threshold = state["params"]["energy_threshold"]
         self.learning_rate = state["params"]["learning_rate"]
-        self.prune_threshold = state["params"]["prune_threshold"]
\ No newline at end of file
+        self.prune_threshold = state["params"]["prune_threshold"]
@@ -4,12 +4,19 @@ Train from scratch with 3-7B parameters, CPU-optimized
 """
 
 import math
+import warnings
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from typing import Optional, Tuple
+from torch.utils.checkpoint import checkpoint
+from typing import List, Optional, Tuple
 from dataclasses import dataclass
 
+# Fused attention kernels (FlashAttention / memory-efficient) need PyTorch 2.0+
+_HAS_SDPA = hasattr(F, "scaled_dot_product_attention")
+# Fused RMSNorm kernel (PyTorch 2.4+)
+_HAS_RMS_NORM = hasattr(F, "rms_norm")
+
 
 @dataclass
 class TransformerConfig:
@@ -27,6 +34,7 @@ class TransformerConfig:
     use_cache: bool = True
     num_labels: int = 2
     type_vocab_size: int = 2
+    norm_type: str = "layernorm"  # "layernorm" or "rmsnorm"
     
     @property
     def num_parameters(self) -> int:
@@ -46,9 +54,36 @@ class TransformerConfig:
             'max_sequence_length': self.max_sequence_length,
             'hidden_dropout_prob': self.hidden_dropout_prob,
             'attention_probs_dropout_prob': self.attention_probs_dropout_prob,
+            'norm_type': self.norm_type,
         }
 
 
+class RMSNorm(nn.Module):
+    """Root-mean-square layer norm: scale only, no mean subtraction or bias (one reduction)."""
+    
+    def __init__(self, dim: int, eps: float = 1e-6):
+        super().__init__()
+        self.weight = nn.Parameter(torch.ones(dim))
+        self.eps = eps
+        self.use_fused = _HAS_RMS_NORM
+    
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        # Normalize in fp32 so bf16/fp16 activations under autocast keep their precision
+        dtype = x.dtype
+        x = x.float()
+        if self.use_fused:
+            return F.rms_norm(x, [x.shape[-1]], self.weight.float(), self.eps).to(dtype)
+        norm = x * torch.rsqrt(x.pow(2).mean(-1, keepdim=True) + self.eps)
+        return (norm * self.weight.float()).to(dtype)
+
+
+def make_norm(config: TransformerConfig) -> nn.Module:
+    """Normalization layer selected by config.norm_type."""
+    if config.norm_type == "layernorm":
+        return nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+    return RMSNorm(config.hidden_size, eps=config.layer_norm_eps)
+
+
 class RoPEPositionalEmbedding(nn.Module):
     """Rotary Position Embeddings (RoPE) - more efficient than absolute positional encodings."""
     
@@ -57,33 +92,51 @@ class RoPEPositionalEmbedding(nn.Module):
         self.dim = dim
         self.max_seq_length = max_seq_length
         
-        # Pre-compute angles for positions
+        # Pre-compute angles for positions; fully determined by dim, so not saved in checkpoints
         inv_freq = 1.0 / (10000 ** (torch.arange(0, dim, 2).float() / dim))
-        self.register_buffer("inv_freq", inv_freq)
+        self.register_buffer("inv_freq", inv_freq, persistent=False)
+        
+        # sin/cos tables for every position up to max_seq_length, shaped to broadcast
+        # over (batch, heads, seq, dim)
+        emb = self._angles(max_seq_length)
+        self.register_buffer("sin_cached", emb.sin()[None, None, :, :], persistent=False)
+        self.register_buffer("cos_cached", emb.cos()[None, None, :, :], persistent=False)
     
-    def forward(self, x: torch.Tensor, seq_len: Optional[int] = None) -> Tuple[torch.Tensor, torch.Tensor]:
+    def _angles(self, seq_len: int) -> torch.Tensor:
+        """Rotation angles (seq_len, dim) for positions 0..seq_len-1."""
+        # Generate position indices
+        t = torch.arange(seq_len, device=self.inv_freq.device, dtype=self.inv_freq.dtype)
+        
+        # Compute angles: outer product of positions and frequencies
+        freqs = torch.outer(t, self.inv_freq)
+        
+        # Duplicate for even/odd dimensions
+        return torch.cat([freqs, freqs], dim=-1)
+    
+    def forward(
+        self,
+        x: torch.Tensor,
+        seq_len: Optional[int] = None,
+        offset: int = 0,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
         """
         Generate sin and cos components for rotary embeddings.
         
         Args:
             x: Input tensor (batch_size, seq_len, dim)
             seq_len: Sequence length (if None, use x.shape[1])
+            offset: Position of the first token (length of any cached prefix)
             
         Returns:
             (sin_cache, cos_cache) for use in attention heads
         """
-        seq_len = seq_len or x.shape[1]
-        
-        # Generate position indices
-        t = torch.arange(seq_len, device=x.device, dtype=self.inv_freq.dtype)
-        
-        # Compute angles: outer product of positions and frequencies
-        freqs = torch.outer(t, self.inv_freq)
-        
-        # Duplicate for even/odd dimensions
-        emb = torch.cat([freqs, freqs], dim=-1)
-        
-        return emb.sin().unsqueeze(0), emb.cos().unsqueeze(0)
+        if seq_len is None:
+            seq_len = x.shape[1]
+        end = offset + seq_len
+        if end > self.sin_cached.shape[2]:
+            emb = self._angles(end)[offset:]
+            return emb.sin()[None, None, :, :], emb.cos()[None, None, :, :]
+        return self.sin_cached[:, :, offset:end], self.cos_cached[:, :, offset:end]
 
 
 def rotate_half(x: torch.Tensor) -> torch.Tensor:
@@ -105,68 +158,123 @@ class MultiHeadAttention(nn.Module):
         super().__init__()
         self.num_heads = config.num_attention_heads
         self.head_dim = config.hidden_size // config.num_attention_heads
+        self.scale = 1.0 / math.sqrt(self.head_dim)
         
         assert config.hidden_size % config.num_attention_heads == 0, \
             f"hidden_size ({config.hidden_size}) must be divisible by num_attention_heads ({config.num_attention_heads})"
         
-        self.query = nn.Linear(config.hidden_size, config.hidden_size)
-        self.key = nn.Linear(config.hidden_size, config.hidden_size)
-        self.value = nn.Linear(config.hidden_size, config.hidden_size)
+        # Q, K and V projections fused into one GEMM (rows ordered query, key, value)
+        self.qkv = nn.Linear(config.hidden_size, 3 * config.hidden_size)
         self.output = nn.Linear(config.hidden_size, config.hidden_size)
         
         self.dropout = nn.Dropout(config.attention_probs_dropout_prob)
-        self.rope = RoPEPositionalEmbedding(self.head_dim, config.max_sequence_length)
+        self.use_sdpa = _HAS_SDPA
     
     def forward(
         self,
         hidden_states: torch.Tensor,
+        rope: Tuple[torch.Tensor, torch.Tensor],
         attention_mask: Optional[torch.Tensor] = None,
-    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        past_kv: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+        use_cache: bool = False,
+        is_causal: bool = False,
+        return_attention: bool = False,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor], Optional[Tuple[torch.Tensor, torch.Tensor]]]:
         """
         Args:
-            hidden_states: (batch_size, seq_len, hidden_size)
-            attention_mask: (batch_size, 1, 1, seq_len) - 0 for attend, -inf for mask
+            hidden_states: (batch_size, seq_len, hidden_size) - only the new tokens when past_kv is given
+            rope: (sin, cos) rotary tables for the new positions, from the model's shared RoPE
+            attention_mask: Additive mask broadcastable to (batch_size, heads, seq_len, past_len + seq_len)
+                - 0 for attend, large negative for mask
+            past_kv: Cached (key, value) tensors of earlier positions, (batch_size, heads, past_len, head_dim)
+            use_cache: Return the extended (key, value) cache
+            is_causal: Apply the causal mask implicitly (no attention_mask, no past_kv)
+            return_attention: Compute and return the attention weights (forces the unfused path)
             
         Returns:
-            (output, attention_weights)
+            (output, attention_weights, present_kv) - attention_weights is None unless
+            return_attention (or SDPA is unavailable), present_kv is None unless use_cache
         """
         batch_size, seq_len, _ = hidden_states.shape
         
-        # Project to Q, K, V
-        q = self.query(hidden_states)
-        k = self.key(hidden_states)
-        v = self.value(hidden_states)
-        
-        # Reshape for multi-head attention
-        q = q.view(batch_size, seq_len, self.num_heads, self.head_dim).transpose(1, 2)
-        k = k.view(batch_size, seq_len, self.num_heads, self.head_dim).transpose(1, 2)
-        v = v.view(batch_size, seq_len, self.num_heads, self.head_dim).transpose(1, 2)
+        # Project to Q, K, V and reshape for multi-head attention: (batch, heads, seq, head_dim)
+        qkv = self.qkv(hidden_states).view(batch_size, seq_len, 3, self.num_heads, self.head_dim)
+        q, k, v = qkv.permute(2, 0, 3, 1, 4).unbind(0)
         
-        # Apply RoPE
-        sin, cos = self.rope(q, seq_len)
+        # Apply RoPE (positions already offset past any cached prefix)
+        sin, cos = rope
         q = apply_rotary_emb(q, sin, cos)
         k = apply_rotary_emb(k, sin, cos)
         
-        # Scaled dot-product attention
-        scores = torch.matmul(q, k.transpose(-2, -1)) / math.sqrt(self.head_dim)
-        
-        if attention_mask is not None:
-            scores = scores + attention_mask
-        
-        attn_weights = F.softmax(scores, dim=-1)
-        attn_weights = self.dropout(attn_weights)
-        
-        # Apply attention to values
-        context = torch.matmul(attn_weights, v)
+        # Append the new positions to the cache (keys are stored already rotated)
+        if past_kv is not None:
+            k = torch.cat([past_kv[0], k], dim=2)
+            v = torch.cat([past_kv[1], v], dim=2)
+        present_kv: Optional[Tuple[torch.Tensor, torch.Tensor]] = None
+        if use_cache:
+            present_kv = (k, v)
+        
+        # Scaled dot-product attention: the fused kernel never materializes the
+        # (batch, heads, seq, seq) score matrix, so it is used unless weights are requested
+        attn_weights: Optional[torch.Tensor] = None
+        if self.use_sdpa and not return_attention:
+            context = F.scaled_dot_product_attention(
+                q, k, v,
+                attn_mask=attention_mask,
+                dropout_p=self.dropout.p if self.training else 0.0,
+                is_causal=is_causal,
+            )
+        else:
+            # Scale q (seq x head_dim) rather than the (seq x seq) scores, and add the mask in place
+            scores = torch.matmul(q * self.scale, k.transpose(-2, -1))
+            
+            if attention_mask is not None:
+                scores += attention_mask
+            if is_causal:
+                future = torch.ones(seq_len, seq_len, dtype=torch.bool, device=scores.device).triu(1)
+                scores.masked_fill_(future, float('-inf'))
+            
+            attn_weights = F.softmax(scores, dim=-1)
+            attn_weights = self.dropout(attn_weights)
+            
+            # Apply attention to values
+            context = torch.matmul(attn_weights, v)
         
-        # Reshape back
-        context = context.transpose(1, 2).contiguous()
-        context = context.view(batch_size, seq_len, -1)
+        # Reshape back; reshape only copies when the transposed layout requires it
+        context = context.transpose(1, 2).reshape(batch_size, seq_len, self.num_heads * self.head_dim)
         
         # Final linear projection
         output = self.output(context)
         
-        return output, attn_weights
+        return output, attn_weights, present_kv
+    
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Older checkpoints carry a per-layer RoPE frequency buffer, now shared and derived
+        state_dict.pop(f"{prefix}rope.inv_freq", None)
+        # Checkpoints saved before the fused projection carry separate query/key/value layers
+        for param in ("weight", "bias"):
+            legacy = [f"{prefix}{name}.{param}" for name in ("query", "key", "value")]
+            if all(key in state_dict for key in legacy):
+                state_dict[f"{prefix}qkv.{param}"] = torch.cat([state_dict.pop(key) for key in legacy])
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+
+def _gelu_dropout(x: torch.Tensor, p: float, training: bool) -> torch.Tensor:
+    """GELU followed by dropout on the FFN intermediate activation."""
+    return F.dropout(F.gelu(x), p=p, training=training)
+
+
+# Eager version for checkpointed layers: the scripted one changes its saved tensors while the
+# profiling executor warms up, so a checkpoint recompute could disagree with its forward
+_gelu_dropout_eager = _gelu_dropout
+
+try:
+    # Scripted so the fuser can combine both elementwise passes over the wide activation
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)  # torch.jit.script deprecation notice
+        _gelu_dropout = torch.jit.script(_gelu_dropout)
+except Exception:
+    pass
 
 
 class FeedForwardNetwork(nn.Module):
@@ -176,13 +284,15 @@ class FeedForwardNetwork(nn.Module):
         super().__init__()
         self.dense1 = nn.Linear(config.hidden_size, config.intermediate_size)
         self.dense2 = nn.Linear(config.intermediate_size, config.hidden_size)
-        self.activation = nn.GELU()
         self.dropout = nn.Dropout(config.hidden_dropout_prob)
+        self.fused = True  # cleared while gradient checkpointing
     
     def forward(self, hidden_states: torch.Tensor) -> torch.Tensor:
         hidden_states = self.dense1(hidden_states)
-        hidden_states = self.activation(hidden_states)
-        hidden_states = self.dropout(hidden_states)
+        if self.fused:
+            hidden_states = _gelu_dropout(hidden_states, self.dropout.p, self.training)
+        else:
+            hidden_states = _gelu_dropout_eager(hidden_states, self.dropout.p, self.training)
         hidden_states = self.dense2(hidden_states)
         return hidden_states
 
@@ -193,29 +303,41 @@ class TransformerLayer(nn.Module):
     def __init__(self, config: TransformerConfig):
         super().__init__()
         self.attention = MultiHeadAttention(config)
-        self.attention_norm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+        self.attention_norm = make_norm(config)
         
         self.ffn = FeedForwardNetwork(config)
-        self.ffn_norm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+        self.ffn_norm = make_norm(config)
         
         self.dropout = nn.Dropout(config.hidden_dropout_prob)
     
     def forward(
         self,
         hidden_states: torch.Tensor,
+        rope: Tuple[torch.Tensor, torch.Tensor],
         attention_mask: Optional[torch.Tensor] = None,
-    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        past_kv: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+        use_cache: bool = False,
+        is_causal: bool = False,
+        return_attention: bool = False,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor], Optional[Tuple[torch.Tensor, torch.Tensor]]]:
         """
         Args:
             hidden_states: (batch_size, seq_len, hidden_size)
+            rope: (sin, cos) rotary tables for the current positions
             attention_mask: Optional attention mask
+            past_kv: Cached (key, value) of this layer for earlier positions
+            use_cache: Return the extended (key, value) cache
+            is_causal: Apply the causal mask implicitly instead of through attention_mask
+            return_attention: Return this layer's attention weights
             
         Returns:
-            (output, attention_weights)
+            (output, attention_weights, present_kv) - attention_weights is None unless return_attention
         """
         # Self-attention with residual connection and layer norm
         normed = self.attention_norm(hidden_states)
-        attn_output, attn_weights = self.attention(normed, attention_mask)
+        attn_output, attn_weights, present_kv = self.attention(
+            normed, rope, attention_mask, past_kv, use_cache, is_causal, return_attention
+        )
         hidden_states = hidden_states + self.dropout(attn_output)
         
         # Feed-forward with residual connection and layer norm
@@ -223,7 +345,25 @@ class TransformerLayer(nn.Module):
         ffn_output = self.ffn(normed)
         hidden_states = hidden_states + self.dropout(ffn_output)
         
-        return hidden_states, attn_weights
+        return hidden_states, attn_weights, present_kv
+
+
+@torch.no_grad()
+def _trunc_normal_(tensor: torch.Tensor, std: float) -> torch.Tensor:
+    """
+    Fill tensor from N(0, std) truncated at 2 std, by redrawing the out-of-range entries.
+    
+    Same distribution as nn.init.trunc_normal_, which goes through an inverse-CDF pass
+    and is about 10x slower than normal_ on CPU; only ~5% of the draws land outside.
+    """
+    tensor.normal_(0.0, std)
+    flat = tensor.view(-1)
+    idx = (flat.abs() > 2 * std).nonzero().squeeze(1)
+    while idx.numel() > 0:
+        draw = torch.empty(idx.numel(), dtype=tensor.dtype, device=tensor.device).normal_(0.0, std)
+        flat[idx] = draw
+        idx = idx[draw.abs() > 2 * std]
+    return tensor
 
 
 class CustomTransformer(nn.Module):
@@ -232,6 +372,9 @@ class CustomTransformer(nn.Module):
     Trained from scratch on consciousness + tool-use + reasoning data.
     """
     
+    # Python-only helpers that torch.jit.script must not compile
+    __jit_unused_properties__ = ["num_parameters"]
+    
     def __init__(self, config: TransformerConfig):
         super().__init__()
         self.config = config
@@ -240,13 +383,18 @@ class CustomTransformer(nn.Module):
         self.token_embedding = nn.Embedding(config.vocab_size, config.hidden_size)
         self.embedding_dropout = nn.Dropout(config.hidden_dropout_prob)
         
+        # Rotary embeddings shared by every attention layer
+        self.rope = RoPEPositionalEmbedding(
+            config.hidden_size // config.num_attention_heads, config.max_sequence_length
+        )
+        
         # Transformer layers
         self.layers = nn.ModuleList([
             TransformerLayer(config) for _ in range(config.num_hidden_layers)
         ])
         
         # Output layer norm
-        self.output_norm = nn.LayerNorm(config.hidden_size, eps=config.layer_norm_eps)
+        self.output_norm = make_norm(config)
         
         # Language model head
         self.lm_head = nn.Linear(config.hidden_size, config.vocab_size, bias=False)
@@ -254,36 +402,72 @@ class CustomTransformer(nn.Module):
         # Weight tying: tie embedding and output weights
         self.lm_head.weight = self.token_embedding.weight
         
+        # Additive causal mask shared by every layer; derived, so not saved in checkpoints
+        self.register_buffer(
+            "causal_mask",
+            torch.full((config.max_sequence_length, config.max_sequence_length), float('-inf')).triu(1),
+            persistent=False,
+        )
+        
+        # Set on copies produced by quantize_for_cpu
+        self.quantized = False
+        
+        # Recompute layer activations during backward instead of storing them
+        self.gradient_checkpointing = False
+        
         # Initialize weights
         self._init_weights()
     
     def _init_weights(self):
-        """Initialize model weights with careful scaling."""
+        """
+        Initialize model weights with careful scaling.
+        
+        Weights are drawn from a normal truncated at 2 std, and the projections that write
+        into the residual stream are scaled down by 1/sqrt(2 * num_layers) (GPT-2 recipe).
+        """
+        std = self.config.initializer_range
         for module in self.modules():
-            if isinstance(module, nn.Linear):
-                nn.init.normal_(module.weight, mean=0.0, std=self.config.initializer_range)
+            # Exact type checks: every module is visited, most match none of these
+            cls = type(module)
+            if cls is nn.Linear:
+                _trunc_normal_(module.weight, std)
                 if module.bias is not None:
-                    nn.init.constant_(module.bias, 0.0)
-            elif isinstance(module, nn.Embedding):
-                nn.init.normal_(module.weight, mean=0.0, std=self.config.initializer_range)
-            elif isinstance(module, nn.LayerNorm):
-                nn.init.constant_(module.bias, 0.0)
-                nn.init.constant_(module.weight, 1.0)
+                    nn.init.zeros_(module.bias)
+            elif cls is nn.Embedding:
+                _trunc_normal_(module.weight, std)
+            elif cls is nn.LayerNorm:
+                nn.init.zeros_(module.bias)
+                nn.init.ones_(module.weight)
+        
+        residual_std = std / math.sqrt(2 * self.config.num_hidden_layers)
+        for layer in self.layers:
+            for proj in (layer.attention.output, layer.ffn.dense2):
+                _trunc_normal_(proj.weight, residual_std)
     
     def forward(
         self,
         input_ids: torch.Tensor,
         attention_mask: Optional[torch.Tensor] = None,
-    ) -> Tuple[torch.Tensor, list]:
+        past_key_values: Optional[List[Tuple[torch.Tensor, torch.Tensor]]] = None,
+        use_cache: bool = False,
+        return_attention: bool = False,
+    ) -> Tuple[torch.Tensor, List[Optional[torch.Tensor]], Optional[List[Tuple[torch.Tensor, torch.Tensor]]]]:
         """
         Args:
-            input_ids: (batch_size, seq_len) token indices
-            attention_mask: (batch_size, seq_len) - 1 for attend, 0 for mask
+            input_ids: (batch_size, seq_len) token indices - only the new tokens when
+                past_key_values is given
+            attention_mask: (batch_size, past_len + seq_len) - 1 for attend, 0 for mask
+            past_key_values: Per-layer (key, value) cache returned by a previous call
+            use_cache: Return the per-layer cache for the next decoding step
+            return_attention: Collect each layer's attention weights (slower: bypasses the
+                fused attention kernel and keeps a (batch, heads, seq, seq) tensor per layer)
             
         Returns:
-            (logits, layer_outputs)
+            (logits, layer_outputs, present_key_values)
             - logits: (batch_size, seq_len, vocab_size)
-            - layer_outputs: list of attention weights from each layer
+            - layer_outputs: list of attention weights from each layer, empty unless
+              return_attention
+            - present_key_values: per-layer (key, value) cache, or None unless use_cache
         """
         batch_size, seq_len = input_ids.shape
         
@@ -291,17 +475,49 @@ class CustomTransformer(nn.Module):
         hidden_states = self.token_embedding(input_ids)
         hidden_states = self.embedding_dropout(hidden_states)
         
-        # Prepare attention mask for broadcasting
+        # Build the mask once for all layers. Each position attends to itself and earlier
+        # positions; without padding or a cache the fused kernel applies that implicitly.
+        past_len = 0
+        if past_key_values is not None:
+            past_len = past_key_values[0][0].shape[2]
+        is_causal = False
         if attention_mask is not None:
-            # attention_mask: (batch_size, seq_len) -> (batch_size, 1, 1, seq_len)
-            attention_mask = attention_mask[:, None, None, :].to(dtype=hidden_states.dtype)
-            attention_mask = (1.0 - attention_mask) * -10000.0  # Convert to large negative for masking
+            # attention_mask: (batch_size, past_len + seq_len) -> (batch_size, 1, 1, past_len + seq_len)
+            # Padding gets the dtype's most negative finite value rather than -inf, so a query
+            # row whose visible keys are all padding still softmaxes without NaN
+            # (nan_to_num maps -inf to that value; torch.finfo is not scriptable)
+            padding = attention_mask[:, None, None, :] == 0
+            attention_mask = torch.zeros(padding.shape, dtype=hidden_states.dtype, device=hidden_states.device)
+            fill = torch.full((), float('-inf'), dtype=hidden_states.dtype, device=hidden_states.device)
+            attention_mask.masked_fill_(padding, fill.nan_to_num())
+            attention_mask = attention_mask + self._causal_mask(past_len, seq_len).to(hidden_states.dtype)
+        elif past_len == 0:
+            is_causal = seq_len > 1
+        elif seq_len > 1:
+            attention_mask = self._causal_mask(past_len, seq_len).to(hidden_states.dtype)
+        
+        # Rotary tables for the new positions, sliced once for all layers
+        rope = self.rope(hidden_states, seq_len, past_len)
         
         # Pass through transformer layers
-        layer_outputs = []
-        for layer in self.layers:
-            hidden_states, attn_weights = layer(hidden_states, attention_mask)
-            layer_outputs.append(attn_weights)
+        layer_outputs: List[Optional[torch.Tensor]] = []
+        presents: List[Tuple[torch.Tensor, torch.Tensor]] = []
+        for i, layer in enumerate(self.layers):
+            past_kv: Optional[Tuple[torch.Tensor, torch.Tensor]] = None
+            if past_key_values is not None:
+                past_kv = past_key_values[i]
+            if self.gradient_checkpointing and self.training:
+                hidden_states, attn_weights, present_kv = self._checkpointed_layer(
+                    i, hidden_states, rope, attention_mask, past_kv, use_cache, is_causal
+                )
+            else:
+                hidden_states, attn_weights, present_kv = layer(
+                    hidden_states, rope, attention_mask, past_kv, use_cache, is_causal, return_attention
+                )
+            if return_attention:
+                layer_outputs.append(attn_weights)
+            if present_kv is not None:
+                presents.append(present_kv)
         
         # Final layer norm
         hidden_states = self.output_norm(hidden_states)
@@ -309,7 +525,75 @@ class CustomTransformer(nn.Module):
         # Project to vocabulary
         logits = self.lm_head(hidden_states)
         
-        return logits, layer_outputs
+        present_key_values: Optional[List[Tuple[torch.Tensor, torch.Tensor]]] = None
+        if use_cache:
+            present_key_values = presents
+        return logits, layer_outputs, present_key_values
+    
+    def gradient_checkpointing_enable(self):
+        """
+        Trade compute for memory in training: each layer's activations are recomputed
+        during backward (about one extra forward pass) instead of being kept.
+        Requested attention weights come back as None while checkpointing.
+        """
+        self.gradient_checkpointing = True
+        self._set_ffn_fused(False)
+    
+    def gradient_checkpointing_disable(self):
+        """Keep all layer activations for backward again."""
+        self.gradient_checkpointing = False
+        self._set_ffn_fused(True)
+    
+    def _set_ffn_fused(self, fused: bool):
+        for layer in self.layers:
+            layer.ffn.fused = fused
+    
+    @torch.jit.unused
+    def _checkpointed_layer(
+        self,
+        index: int,
+        hidden_states: torch.Tensor,
+        rope: Tuple[torch.Tensor, torch.Tensor],
+        attention_mask: Optional[torch.Tensor],
+        past_kv: Optional[Tuple[torch.Tensor, torch.Tensor]],
+        use_cache: bool,
+        is_causal: bool,
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor], Optional[Tuple[torch.Tensor, torch.Tensor]]]:
+        """Run layer `index` under torch.utils.checkpoint (training only, never scripted)."""
+        return checkpoint(
+            self.layers[index], hidden_states, rope, attention_mask, past_kv, use_cache, is_causal, False,
+            use_reentrant=False,
+        )
+    
+    def _causal_mask(self, past_len: int, seq_len: int) -> torch.Tensor:
+        """Additive (seq_len, past_len + seq_len) mask hiding positions after each query."""
+        total = past_len + seq_len
+        if total <= self.causal_mask.shape[0]:
+            return self.causal_mask[past_len:total, :total]
+        return torch.full(
+            (seq_len, total), float('-inf'), device=self.causal_mask.device
+        ).triu(past_len + 1)
+    
+    @torch.inference_mode()
+    def predict(
+        self,
+        input_ids: torch.Tensor,
+        attention_mask: Optional[torch.Tensor] = None,
+        past_key_values: Optional[List[Tuple[torch.Tensor, torch.Tensor]]] = None,
+        use_cache: bool = False,
+        return_attention: bool = False,
+        dtype: torch.dtype = torch.bfloat16,
+    ) -> Tuple[torch.Tensor, List[Optional[torch.Tensor]], Optional[List[Tuple[torch.Tensor, torch.Tensor]]]]:
+        """
+        Inference forward pass: no autograd bookkeeping, matmuls autocast to dtype (bf16 by
+        default). Norms and softmax stay fp32 and the logits are returned as fp32.
+        Takes and returns the same values as forward.
+        """
+        with torch.autocast(device_type=input_ids.device.type, dtype=dtype):
+            logits, layer_outputs, present_key_values = self.forward(
+                input_ids, attention_mask, past_key_values, use_cache, return_attention
+            )
+        return logits.float(), layer_outputs, present_key_values
     
     @property
     def num_parameters(self) -> int:
@@ -320,20 +604,52 @@ class CustomTransformer(nn.Module):
         """Get approximate model size in MB (for fp32)."""
         return self.num_parameters * 4 / (1024 ** 2)
     
+    def export_scripted(self) -> torch.jit.ScriptModule:
+        """
+        TorchScript copy of the model for inference.
+        
+        Switches this model to eval mode, scripts it, freezes the weights into the graph
+        and runs optimize_for_inference (dropout removal, linear folding, op fusion).
+        """
+        scripted = torch.jit.script(self.eval())
+        return torch.jit.optimize_for_inference(torch.jit.freeze(scripted))
+    
+    def quantize_for_cpu(self, include_lm_head: bool = False) -> 'CustomTransformer':
+        """
+        INT8 dynamic-quantized copy of the model for CPU inference.
+        
+        Every nn.Linear gets int8 weights, with activations quantized on the fly per call
+        (FBGEMM/oneDNN int8 GEMMs). lm_head is tied to the token embedding and sensitive to
+        quantization, so it stays fp32 unless include_lm_head is set. Norms and embeddings
+        are left in fp32.
+        """
+        qconfig_spec = {nn.Linear: torch.ao.quantization.default_dynamic_qconfig}
+        if not include_lm_head:
+            qconfig_spec['lm_head'] = None
+        quantized = torch.ao.quantization.quantize_dynamic(self.eval(), qconfig_spec, dtype=torch.qint8)
+        quantized.quantized = True
+        return quantized
+    
     def save_checkpoint(self, path: str):
         """Save model checkpoint."""
         torch.save({
             'config': self.config.to_dict(),
             'state_dict': self.state_dict(),
+            'quantized': self.quantized,
         }, path)
     
     @classmethod
     def from_checkpoint(cls, path: str) -> 'CustomTransformer':
-        """Load model from checkpoint."""
+        """Load model from checkpoint (quantized checkpoints come back quantized)."""
         checkpoint = torch.load(path, map_location='cpu')
         config = TransformerConfig(**checkpoint['config'])
         model = cls(config)
-        model.load_state_dict(checkpoint['state_dict'])
+        state_dict = checkpoint['state_dict']
+        if checkpoint.get('quantized', False):
+            model = model.quantize_for_cpu(
+                include_lm_head='lm_head._packed_params._packed_params' in state_dict
+            )
+        model.load_state_dict(state_dict)
         return model
 
 
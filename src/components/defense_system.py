@@ -1,10 +1,38 @@
 import re
+import time
 import logging
+from collections import deque
 from typing import List, Dict, Any, Tuple
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Patterns are compiled once at import; the strategy processors run on every response
+_HTML_RE = re.compile(r'<[^>]+>')
+# The leading lookaheads only admit each alternative's first letter, so the engine skips
+# most positions without trying the whole alternation
+_SQL_RE = re.compile(r'\b(?=[usid])(union|select|insert|update|delete|drop)\s+(?=select|from|into)', re.IGNORECASE)
+_JS_RE = re.compile(r'javascript:', re.IGNORECASE)
+# One scan that finds any of the three removal patterns; clean text skips the three subs
+_STRIP_ANY_RE = re.compile(
+    r'(?=[<jusid])(?:<[^>]+>|javascript:|\b(?:union|select|insert|update|delete|drop)\s+(?=select|from|into))',
+    re.IGNORECASE
+)
+_CONTRACTIONS = {'gonna': 'going to', 'wanna': 'want to', 'gotta': 'have to'}
+_TONE_REPLACEMENTS = (
+    (re.compile(r'\b(gonna|wanna|gotta)\b'), lambda m: _CONTRACTIONS.get(m.group(0), m.group(0))),
+    (re.compile(r'\[.*?\](?!\s*\()'), ''),  # Remove bracketed system markers but keep function calls
+)
+_SAFETY_REPLACEMENTS = (
+    (re.compile(r'\b(must|will|definitely)\s+((?:not\s+)?(?:kill|hurt|harm|damage|destroy))\b', re.IGNORECASE),
+     'I cannot provide guidance on harmful actions'),
+    (re.compile(r'\b(how to|steps to)\s+((?:hack|crack|bypass|exploit))\b', re.IGNORECASE),
+     'I cannot provide guidance on unauthorized access'),
+)
+_DOUBLE_SPACE_RE = re.compile(r'  +')
+_MULTI_NL_RE = re.compile(r'\n\n\n+')
+_SENT_SPACE_RE = re.compile(r'([.!?])\s+([A-Z])')
+
 class DefenseSystem:
     """Advanced threat mitigation framework with quantum-aware protection"""
     
@@ -32,54 +60,55 @@ class DefenseSystem:
     }
 
     def __init__(self, strategies: List[str]):
+        self.set_strategies(strategies)
+        self.defense_log = deque(maxlen=100)  # oldest entries drop off automatically
+        self.max_energy = 10.0
+        self.energy_pool = self.max_energy
+        self.last_regen_time = time.monotonic()
+        self.regen_rate = 0.5  # Energy regenerated per second
+        
+    def set_strategies(self, strategies: List[str]) -> None:
+        """Activate the named strategies (unknown names are ignored)"""
         self.active_strategies = {
             name: self.STRATEGIES[name]
             for name in strategies
             if name in self.STRATEGIES
         }
-        self.defense_log = []
-        self.max_energy = 10.0
-        self.energy_pool = self.max_energy
-        self.last_regen_time = datetime.now()
-        self.regen_rate = 0.5  # Energy regenerated per second
+        # Most efficient first; kept sorted here rather than on every request
+        self._sorted_strategies = tuple(sorted(
+            self.active_strategies.items(),
+            key=lambda x: x[1]["energy_cost"]
+        ))
         
     def _regenerate_energy(self):
         """Regenerate energy over time"""
-        current_time = datetime.now()
-        elapsed = (current_time - self.last_regen_time).total_seconds()
-        regen_amount = elapsed * self.regen_rate
+        # Monotonic clock: a plain float, and wall-clock adjustments cannot give negative intervals
+        now = time.monotonic()
+        regen_amount = (now - self.last_regen_time) * self.regen_rate
         
         self.energy_pool = min(self.max_energy, self.energy_pool + regen_amount)
-        self.last_regen_time = current_time
+        self.last_regen_time = now
     
     @staticmethod
     def _sanitize_content(text: str) -> str:
         """Silently sanitize harmful content without markers"""
+        if not _STRIP_ANY_RE.search(text):
+            return text
+        # Removals run in sequence so one removal cannot splice together another pattern
         # Remove HTML/script tags silently
-        text = re.sub(r'<[^>]+>', '', text)
+        text = _HTML_RE.sub('', text)
         # Remove SQL injection patterns
-        text = re.sub(r'\b(union|select|insert|update|delete|drop)\s+(?=select|from|into)', '', text, flags=re.IGNORECASE)
+        text = _SQL_RE.sub('', text)
         # Remove javascript: URIs
-        text = re.sub(r'javascript:', '', text, flags=re.IGNORECASE)
+        text = _JS_RE.sub('', text)
         return text
     
     @staticmethod
     def _refine_response_tone(text: str) -> str:
         """Refine response tone for naturalness without markers"""
         # Convert awkward phrasing to natural language
-        replacements = {
-            r'\b(gonna|wanna|gotta)\b': lambda m: {
-                'gonna': 'going to', 'wanna': 'want to', 'gotta': 'have to'
-            }.get(m.group(0), m.group(0)),
-            r'\[.*?\](?!\s*\()': '',  # Remove bracketed system markers but keep function calls
-            r'{.*?}': lambda m: m.group(0),  # Preserve legitimate formatting
-        }
-        
-        for pattern, replacement in replacements.items():
-            if callable(replacement):
-                text = re.sub(pattern, replacement, text)
-            else:
-                text = re.sub(pattern, replacement, text)
+        for pattern, replacement in _TONE_REPLACEMENTS:
+            text = pattern.sub(replacement, text)
         
         return text.strip()
     
@@ -87,13 +116,8 @@ class DefenseSystem:
     def _enhance_safety(text: str) -> str:
         """Enhance safety subtly without intrusive language"""
         # Replace potentially harmful statements with safer versions
-        safety_replacements = {
-            r'\b(must|will|definitely)\s+((?:not\s+)?(?:kill|hurt|harm|damage|destroy))\b': 'I cannot provide guidance on harmful actions',
-            r'\b(how to|steps to)\s+((?:hack|crack|bypass|exploit))\b': 'I cannot provide guidance on unauthorized access',
-        }
-        
-        for pattern, replacement in safety_replacements.items():
-            text = re.sub(pattern, replacement, text, flags=re.IGNORECASE)
+        for pattern, replacement in _SAFETY_REPLACEMENTS:
+            text = pattern.sub(replacement, text)
         
         return text
     
@@ -101,11 +125,11 @@ class DefenseSystem:
     def _improve_coherence(text: str) -> str:
         """Improve response coherence naturally"""
         # Fix double spaces
-        text = re.sub(r'  +', ' ', text)
+        text = _DOUBLE_SPACE_RE.sub(' ', text)
         # Fix multiple line breaks
-        text = re.sub(r'\n\n\n+', '\n\n', text)
+        text = _MULTI_NL_RE.sub('\n\n', text)
         # Ensure proper sentence spacing
-        text = re.sub(r'([.!?])\s+([A-Z])', r'\1 \2', text)
+        text = _SENT_SPACE_RE.sub(r'\1 \2', text)
         return text.strip()
         
     def apply_defenses(self, text: str, consciousness_state: Dict[str, Any] = None) -> str:
@@ -121,17 +145,15 @@ class DefenseSystem:
             # Boost energy regen based on consciousness
             self.regen_rate = 0.5 + (consciousness_factor * 0.5)
             
-            current_time = datetime.now()
+            # Consciousness reduces cost
+            cost_scale = 1.0 - consciousness_factor * 0.3
             
-            # Sort strategies by energy cost (most efficient first)
-            sorted_strategies = sorted(
-                self.active_strategies.items(),
-                key=lambda x: x[1]["energy_cost"]
-            )
+            # One wall-clock read per call, shared by every log entry below
+            timestamp = datetime.now().isoformat()
             
-            # Try to apply each strategy if we have enough energy
-            for name, strategy in sorted_strategies:
-                energy_cost = strategy["energy_cost"] * (1.0 - consciousness_factor * 0.3)  # Consciousness reduces cost
+            # Try to apply each strategy (most efficient first) if we have enough energy
+            for name, strategy in self._sorted_strategies:
+                energy_cost = strategy["energy_cost"] * cost_scale
                 
                 if self.energy_pool >= energy_cost:
                     try:
@@ -145,16 +167,12 @@ class DefenseSystem:
                             "energy_cost": energy_cost,
                             "remaining_energy": self.energy_pool,
                             "consciousness_factor": consciousness_factor,
-                            "timestamp": current_time.isoformat()
+                            "timestamp": timestamp
                         })
                     except Exception as e:
                         logger.warning(f"Strategy {name} failed: {e}")
                 else:
                     logger.debug(f"Insufficient energy for {name} strategy ({self.energy_pool} < {energy_cost})")
-                    
-            # Prune old logs if too large
-            if len(self.defense_log) > 100:
-                self.defense_log = self.defense_log[-50:]
                 
             return protected_text
             
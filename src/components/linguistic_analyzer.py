@@ -5,11 +5,57 @@ Helps understand sentence structure, grammar patterns, and communication clarity
 
 import re
 import logging
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Set, Tuple, Optional
 from dataclasses import dataclass
 
+try:
+    import ahocorasick
+except Exception:
+    ahocorasick = None
+
 logger = logging.getLogger(__name__)
 
+def _build_keyword_automaton(groups: Dict[str, List[str]]):
+    """
+    One Aho-Corasick automaton over every keyword, each mapped to (keyword, groups it
+    belongs to). None without pyahocorasick.
+    """
+    if ahocorasick is None:
+        return None
+    try:
+        owners: Dict[str, List[str]] = {}
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                owners.setdefault(keyword, []).append(group)
+        automaton = ahocorasick.Automaton()
+        for keyword, keyword_groups in owners.items():
+            automaton.add_word(keyword, (keyword, tuple(keyword_groups)))
+        automaton.make_automaton()
+        return automaton
+    except Exception as e:
+        logger.debug(f"Keyword automaton unavailable: {e}")
+        return None
+
+def _keyword_counts(text_lower: str, groups: Dict[str, List[str]], automaton=None) -> Dict[str, int]:
+    """Distinct keywords of each group found in text_lower, in one pass when an automaton is given."""
+    counts = dict.fromkeys(groups, 0)
+    if automaton is not None:
+        for _, keyword_groups in {value for _, value in automaton.iter(text_lower)}:
+            for group in keyword_groups:
+                counts[group] += 1
+        return counts
+    for group, keywords in groups.items():
+        counts[group] = sum(1 for keyword in keywords if keyword in text_lower)
+    return counts
+
+# Text between runs of sentence-ending punctuation
+_SENTENCE_RE = re.compile(r'[^.!?]+')
+
+# Whitespace and punctuation clean-up used by improve_sentence
+_WHITESPACE_RE = re.compile(r'\s+')
+_SPACE_BEFORE_PUNCT_RE = re.compile(r'\s+([,.!?;:])')
+_NO_SPACE_AFTER_PUNCT_RE = re.compile(r'([,.!?;:])(\w)')
+
 @dataclass
 class SentenceAnalysis:
     """Analysis result for a sentence"""
@@ -29,6 +75,22 @@ class LinguisticAnalyzer:
     Helps Codette understand how to construct clear, grammatically correct responses.
     """
     
+    # Common misspelled contractions: (wrong, right, whole-word pattern)
+    _CONTRACTION_FIXES = tuple(
+        (wrong, right, re.compile(rf'\b{wrong}\b', re.IGNORECASE))
+        for wrong, right in (
+            ("dont", "don't"),
+            ("doesnt", "doesn't"),
+            ("cant", "can't"),
+            ("wont", "won't"),
+            ("im", "I'm"),
+            ("ive", "I've"),
+            ("youre", "you're"),
+            ("theyre", "they're"),
+            ("its", "it's"),  # when possessive is not intended
+        )
+    )
+    
     def __init__(self):
         """Initialize the linguistic analyzer"""
         self.logger = logging.getLogger(__name__)
@@ -46,6 +108,13 @@ class LinguisticAnalyzer:
             'subordinating': ['because', 'although', 'while', 'since', 'if', 'when', 'unless', 'until']
         }
         
+        # Tone indicators (matched as substrings of the lowercased text)
+        self.tone_words = {
+            'positive': ['great', 'excellent', 'wonderful', 'happy', 'good', 'love', 'thank', 'appreciate'],
+            'negative': ['bad', 'terrible', 'awful', 'hate', 'wrong', 'problem', 'issue', 'error'],
+            'technical': ['system', 'function', 'parameter', 'algorithm', 'implement', 'execute']
+        }
+        
         # Common grammar mistakes patterns
         self.grammar_patterns = {
             'double_negative': r'\b(don\'t|doesn\'t|didn\'t|won\'t|can\'t)\s+(no|never|nothing|nobody)\b',
@@ -54,6 +123,25 @@ class LinguisticAnalyzer:
             'run_on': r'\b\w+\s+\w+\s+\w+,\s*\w+\s+\w+\s+\w+,\s*\w+',
         }
         
+        # Compiled once here; the patterns are matched against lowercased text.
+        # Each tense's patterns are fused into one alternation, so a tense costs one scan.
+        self._tense_patterns = {
+            tense: re.compile('|'.join(f'(?:{p})' for p in patterns))
+            for tense, patterns in self.verb_patterns.items()
+        }
+        # Grammar patterns stay separate: every matching issue is reported and their
+        # matches can overlap, which a single alternation would hide
+        self._grammar_patterns_compiled = {
+            name: re.compile(p) for name, p in self.grammar_patterns.items()
+        }
+        
+        # Conjunctions are matched as whole words, padded with spaces
+        self._conjunction_markers = {
+            kind: [f' {conj} ' for conj in conjs] for kind, conjs in self.conjunctions.items()
+        }
+        self._conjunction_automaton = _build_keyword_automaton(self._conjunction_markers)
+        self._tone_automaton = _build_keyword_automaton(self.tone_words)
+        
         logger.info("Linguistic Analyzer initialized for communication assistance")
     
     def analyze_sentence(self, sentence: str) -> SentenceAnalysis:
@@ -118,16 +206,25 @@ class LinguisticAnalyzer:
         # Split into sentences
         sentences = self._split_sentences(text)
         
-        # Analyze each sentence
-        analyses = [self.analyze_sentence(s) for s in sentences if s.strip()]
-        
-        # Calculate aggregate metrics
-        avg_complexity = sum(a.complexity_score for a in analyses) / len(analyses) if analyses else 0.0
-        avg_clarity = sum(a.clarity_score for a in analyses) / len(analyses) if analyses else 0.0
-        total_words = sum(a.word_count for a in analyses)
+        # Analyze each sentence (already stripped and non-empty)
+        analyses = [self.analyze_sentence(s) for s in sentences]
+        
+        # Calculate aggregate metrics and collect coherence signals in one pass
+        total_complexity = total_clarity = 0.0
+        total_words = 0
+        lengths, structures, tenses = set(), set(), set()
+        for a in analyses:
+            total_complexity += a.complexity_score
+            total_clarity += a.clarity_score
+            total_words += a.word_count
+            lengths.add(a.word_count)
+            structures.add(a.structure)
+            tenses.add(a.verb_tense)
+        avg_complexity = total_complexity / len(analyses) if analyses else 0.0
+        avg_clarity = total_clarity / len(analyses) if analyses else 0.0
         
         # Check paragraph coherence
-        coherence = self._check_coherence(analyses)
+        coherence = self._check_coherence(len(analyses), lengths, structures, tenses)
         
         # Detect tone
         tone = self._detect_tone(text)
@@ -167,31 +264,19 @@ class LinguisticAnalyzer:
             changes.append("Added ending punctuation")
         
         # Fix common contractions
-        contraction_fixes = {
-            "dont": "don't",
-            "doesnt": "doesn't",
-            "cant": "can't",
-            "wont": "won't",
-            "im": "I'm",
-            "ive": "I've",
-            "youre": "you're",
-            "theyre": "they're",
-            "its": "it's"  # when possessive is not intended
-        }
-        
-        for wrong, right in contraction_fixes.items():
-            if re.search(rf'\b{wrong}\b', improved, re.IGNORECASE):
-                improved = re.sub(rf'\b{wrong}\b', right, improved, flags=re.IGNORECASE)
+        for wrong, right, pattern in self._CONTRACTION_FIXES:
+            improved, count = pattern.subn(right, improved)
+            if count:
                 changes.append(f"Fixed contraction: {wrong} → {right}")
         
         # Remove double spaces
         if '  ' in improved:
-            improved = re.sub(r'\s+', ' ', improved)
+            improved = _WHITESPACE_RE.sub(' ', improved)
             changes.append("Removed extra spaces")
         
         # Fix spacing around punctuation
-        improved = re.sub(r'\s+([,.!?;:])', r'\1', improved)
-        improved = re.sub(r'([,.!?;:])(\w)', r'\1 \2', improved)
+        improved = _SPACE_BEFORE_PUNCT_RE.sub(r'\1', improved)
+        improved = _NO_SPACE_AFTER_PUNCT_RE.sub(r'\1 \2', improved)
         
         return improved, changes
     
@@ -208,11 +293,13 @@ class LinguisticAnalyzer:
     
     def _analyze_structure(self, sentence: str) -> str:
         """Determine if sentence is simple, compound, or complex"""
+        conjunctions = _keyword_counts(sentence.lower(), self._conjunction_markers, self._conjunction_automaton)
+        
         # Check for coordinating conjunctions (compound)
-        has_coordinating = any(f' {conj} ' in sentence.lower() for conj in self.conjunctions['coordinating'])
+        has_coordinating = conjunctions['coordinating'] > 0
         
         # Check for subordinating conjunctions (complex)
-        has_subordinating = any(f' {conj} ' in sentence.lower() for conj in self.conjunctions['subordinating'])
+        has_subordinating = conjunctions['subordinating'] > 0
         
         # Count clauses (rough approximation)
         clause_markers = sentence.count(',') + sentence.count(';')
@@ -229,14 +316,12 @@ class LinguisticAnalyzer:
         sentence_lower = sentence.lower()
         
         # Check for future tense markers first (most specific)
-        for pattern in self.verb_patterns['future']:
-            if re.search(pattern, sentence_lower):
-                return 'future'
+        if self._tense_patterns['future'].search(sentence_lower):
+            return 'future'
         
         # Check for past tense
-        for pattern in self.verb_patterns['past']:
-            if re.search(pattern, sentence_lower):
-                return 'past'
+        if self._tense_patterns['past'].search(sentence_lower):
+            return 'past'
         
         # Default to present
         return 'present'
@@ -279,7 +364,7 @@ class LinguisticAnalyzer:
             clarity -= 0.15
         
         # Penalize double negatives
-        if re.search(self.grammar_patterns['double_negative'], sentence.lower()):
+        if self._grammar_patterns_compiled['double_negative'].search(sentence.lower()):
             clarity -= 0.3
         
         # Reward simple structure
@@ -291,9 +376,10 @@ class LinguisticAnalyzer:
     def _find_grammar_issues(self, sentence: str) -> List[str]:
         """Identify potential grammar issues"""
         issues = []
+        sentence_lower = sentence.lower()
         
-        for issue_type, pattern in self.grammar_patterns.items():
-            if re.search(pattern, sentence.lower()):
+        for issue_type, pattern in self._grammar_patterns_compiled.items():
+            if pattern.search(sentence_lower):
                 issue_name = issue_type.replace('_', ' ').title()
                 issues.append(f"Possible {issue_name}")
         
@@ -338,32 +424,35 @@ class LinguisticAnalyzer:
     def _split_sentences(self, text: str) -> List[str]:
         """Split text into sentences"""
         # Simple sentence splitting - can be enhanced with NLTK
-        sentences = re.split(r'[.!?]+', text)
-        return [s.strip() for s in sentences if s.strip()]
+        return [s for s in map(str.strip, _SENTENCE_RE.findall(text)) if s]
     
-    def _check_coherence(self, analyses: List[SentenceAnalysis]) -> float:
+    def _check_coherence(
+        self,
+        sentence_count: int,
+        lengths: Set[int],
+        structures: Set[str],
+        tenses: Set[str]
+    ) -> float:
         """
-        Check how well sentences flow together
+        Check how well sentences flow together, from the distinct word counts,
+        structures and tenses of the paragraph's sentences
         Returns coherence score 0.0-1.0
         """
-        if len(analyses) < 2:
+        if sentence_count < 2:
             return 1.0
         
         coherence = 1.0
         
         # Check for varying sentence lengths (good)
-        lengths = [a.word_count for a in analyses]
-        if len(set(lengths)) == 1:
+        if len(lengths) == 1:
             coherence -= 0.2  # All same length
         
         # Check for varied sentence structures (good)
-        structures = [a.structure for a in analyses]
-        if len(set(structures)) > 1:
+        if len(structures) > 1:
             coherence += 0.1
         
         # Check for consistent tense (good)
-        tenses = [a.verb_tense for a in analyses]
-        if len(set(tenses)) == 1:
+        if len(tenses) == 1:
             coherence += 0.1
         else:
             coherence -= 0.1  # Tense switching can be confusing
@@ -372,19 +461,11 @@ class LinguisticAnalyzer:
     
     def _detect_tone(self, text: str) -> str:
         """Detect overall tone of the text"""
-        text_lower = text.lower()
-        
-        # Positive indicators
-        positive_words = ['great', 'excellent', 'wonderful', 'happy', 'good', 'love', 'thank', 'appreciate']
-        positive_count = sum(1 for word in positive_words if word in text_lower)
-        
-        # Negative indicators
-        negative_words = ['bad', 'terrible', 'awful', 'hate', 'wrong', 'problem', 'issue', 'error']
-        negative_count = sum(1 for word in negative_words if word in text_lower)
-        
-        # Technical indicators
-        technical_words = ['system', 'function', 'parameter', 'algorithm', 'implement', 'execute']
-        technical_count = sum(1 for word in technical_words if word in text_lower)
+        # Positive, negative and technical indicators counted in one pass
+        counts = _keyword_counts(text.lower(), self.tone_words, self._tone_automaton)
+        positive_count = counts['positive']
+        negative_count = counts['negative']
+        technical_count = counts['technical']
         
         # Question indicators
         question_count = text.count('?')
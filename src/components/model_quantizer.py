@@ -4,9 +4,76 @@ Converts trained CustomTransformer to GGUF format for Ollama
 """
 
 import torch
-import json
+import numpy as np
+import struct
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, BinaryIO, Dict, List, Optional
+
+
+# GGUF v3 layout (little-endian): header, metadata key/values, tensor infos, then the
+# tensor data, each block padded to the alignment
+_GGUF_MAGIC = b'GGUF'
+_GGUF_ALIGNMENT = 32
+
+# Metadata value types
+_GGUF_UINT32 = 4
+_GGUF_INT32 = 5
+_GGUF_FLOAT32 = 6
+_GGUF_BOOL = 7
+_GGUF_STRING = 8
+_GGUF_ARRAY = 9
+_GGUF_ARRAY_TYPES = {np.dtype(np.uint32): _GGUF_UINT32, np.dtype(np.int32): _GGUF_INT32, np.dtype(np.float32): _GGUF_FLOAT32}
+
+# ggml tensor types
+_GGML_TYPES = {torch.float32: 0, torch.float16: 1, torch.int8: 24}
+_GGML_ELEMENT_SIZES = {0: 4, 1: 2, 24: 1}
+_GGML_Q8_0 = 8
+
+# Q8_0: blocks of 32 consecutive values along the innermost dim, each stored as an fp16
+# scale followed by 32 int8s
+_Q8_0_BLOCK = 32
+_Q8_0_BLOCK_BYTES = 2 + _Q8_0_BLOCK
+
+
+def _gguf_string(value: str) -> bytes:
+    data = value.encode('utf-8')
+    return struct.pack('<Q', len(data)) + data
+
+
+def _gguf_scalar(value_type: int, value: Any) -> bytes:
+    if value_type == _GGUF_STRING:
+        return _gguf_string(value)
+    return struct.pack({_GGUF_UINT32: '<I', _GGUF_INT32: '<i', _GGUF_FLOAT32: '<f', _GGUF_BOOL: '<?'}[value_type], value)
+
+
+def _gguf_kv(key: str, value: Any) -> bytes:
+    """
+    Encode one metadata entry. bool, int (uint32), float (float32) and str map to
+    scalars; lists of str and numpy int32/uint32/float32 arrays map to arrays.
+    """
+    if isinstance(value, np.ndarray):
+        item_type = _GGUF_ARRAY_TYPES[value.dtype]
+        return (_gguf_string(key) + struct.pack('<IIQ', _GGUF_ARRAY, item_type, len(value))
+                + value.astype(value.dtype.newbyteorder('<')).tobytes())
+    if isinstance(value, list):
+        return (_gguf_string(key) + struct.pack('<IIQ', _GGUF_ARRAY, _GGUF_STRING, len(value))
+                + b''.join(_gguf_string(v) for v in value))
+    if isinstance(value, bool):
+        value_type = _GGUF_BOOL
+    elif isinstance(value, int):
+        value_type = _GGUF_UINT32
+    elif isinstance(value, float):
+        value_type = _GGUF_FLOAT32
+    else:
+        value_type = _GGUF_STRING
+    return _gguf_string(key) + struct.pack('<I', value_type) + _gguf_scalar(value_type, value)
+
+
+def _pad(f: BinaryIO, position: int) -> int:
+    """Write zero padding up to the next alignment boundary; returns the new position."""
+    padding = -position % _GGUF_ALIGNMENT
+    f.write(b'\x00' * padding)
+    return position + padding
 
 
 class GGUFConverter:
@@ -19,32 +86,22 @@ class GGUFConverter:
         self.gguf_version = 3  # GGUF format version
     
     def _quantize_fp32_to_fp16(self, tensor: torch.Tensor) -> torch.Tensor:
-        """Convert fp32 tensor to fp16."""
-        return tensor.half().float()  # Convert to fp16 then back to maintain shape
+        """Convert fp32 tensor to fp16 (2 bytes per element on disk)."""
+        return tensor.to(torch.float16)
     
-    def _quantize_fp32_to_int8(self, tensor: torch.Tensor) -> torch.Tensor:
-        """Quantize fp32 to int8 with per-tensor scaling."""
-        if tensor.numel() == 0:
-            return tensor
-        
-        # Find min/max
-        qmin, qmax = torch.iinfo(torch.int8).min, torch.iinfo(torch.int8).max
-        min_val = tensor.min()
-        max_val = tensor.max()
-        
-        # Avoid division by zero
-        if max_val == min_val:
-            return torch.zeros_like(tensor, dtype=torch.int8).float()
-        
-        # Scale to int8 range
-        scale = (max_val - min_val) / (qmax - qmin)
-        zero_point = qmin - min_val / scale
-        
-        # Quantize
-        quantized = (tensor / scale + zero_point).round().clamp(qmin, qmax)
+    def _quantize_fp32_to_q8_0(self, tensor: torch.Tensor) -> torch.Tensor:
+        """
+        Block-wise int8 quantization in ggml's Q8_0 layout.
         
-        # Dequantize (store quantized values as float for GGUF)
-        return quantized
+        Every block of 32 values gets its own scale absmax / 127, so one outlier only
+        costs precision within its block. Returns the raw blocks as a (num_blocks, 34)
+        uint8 tensor: the fp16 scale followed by the 32 int8 values.
+        """
+        blocks = tensor.detach().float().reshape(-1, _Q8_0_BLOCK)
+        scale = blocks.abs().amax(dim=1, keepdim=True).div_(127)
+        inv_scale = torch.where(scale > 0, scale.reciprocal(), torch.zeros_like(scale))
+        quantized = blocks.mul(inv_scale).round_().clamp_(-127, 127).to(torch.int8)
+        return torch.cat([scale.half().view(torch.uint8), quantized.view(torch.uint8)], dim=1)
     
     def export_to_gguf(
         self,
@@ -71,11 +128,28 @@ class GGUFConverter:
             print(f"  Quantization: {quantization}")
             print(f"  Model parameters: {self.model.num_parameters:,}")
         
+        state_dict = self.model.state_dict()
+        
+        # Storage type of every tensor. q8 covers the weight matrices whose rows split into
+        # whole Q8_0 blocks; norms, biases and anything else stay fp32, as in llama.cpp.
+        export_types: List[int] = []
+        for tensor in state_dict.values():
+            if quantization == 'fp16' and tensor.is_floating_point():
+                export_types.append(_GGML_TYPES[torch.float16])
+            elif (quantization == 'q8' and tensor.is_floating_point() and tensor.dim() >= 2
+                    and tensor.shape[-1] % _Q8_0_BLOCK == 0):
+                export_types.append(_GGML_Q8_0)
+            elif tensor.dtype in _GGML_TYPES:
+                export_types.append(_GGML_TYPES[tensor.dtype])
+            else:
+                raise ValueError(f"Cannot export tensor of dtype {tensor.dtype}: no GGUF type")
+        
         # Prepare metadata
         metadata = {
             'general.architecture': 'transformer',
             'general.name': 'Codette',
             'general.quantization_version': 2,
+            'general.alignment': _GGUF_ALIGNMENT,
             'transformer.context_length': self.model.config.max_sequence_length,
             'transformer.embedding_length': self.model.config.hidden_size,
             'transformer.feed_forward_length': self.model.config.intermediate_size,
@@ -84,46 +158,51 @@ class GGUFConverter:
             'transformer.attention.layer_norm_epsilon': 1e-6,
             'tokenizer.ggml.model': 'gpt2',
             'tokenizer.ggml.tokens': list(self.tokenizer.token_to_id.keys()),
-            'tokenizer.ggml.token_type': ['normal'] * len(self.tokenizer.token_to_id),
+            'tokenizer.ggml.token_type': np.ones(len(self.tokenizer.token_to_id), dtype=np.int32),  # 1 = normal
             'tokenizer.ggml.merges': [],
         }
         
-        # Prepare tensor data
-        tensor_data = {}
+        # Tensor infos: name, dims (innermost first), ggml type, offset into the data block
+        tensor_infos = []
+        offset = 0
+        for (name, tensor), ggml_type in zip(state_dict.items(), export_types):
+            tensor_infos.append(
+                _gguf_string(name)
+                + struct.pack(f'<I{tensor.dim()}Q', tensor.dim(), *reversed(tensor.shape))
+                + struct.pack('<IQ', ggml_type, offset)
+            )
+            if ggml_type == _GGML_Q8_0:
+                nbytes = tensor.numel() // _Q8_0_BLOCK * _Q8_0_BLOCK_BYTES
+            else:
+                nbytes = tensor.numel() * _GGML_ELEMENT_SIZES[ggml_type]
+            offset += nbytes + (-nbytes % _GGUF_ALIGNMENT)
         
-        # Extract state dict
-        state_dict = self.model.state_dict()
-        
-        for name, tensor in state_dict.items():
-            if verbose and len(tensor_data) % 10 == 0:
-                print(f"  Processing tensor {len(tensor_data)}: {name}")
-            
-            # Quantize if needed
-            if quantization == 'fp16':
-                tensor = self._quantize_fp32_to_fp16(tensor)
-            elif quantization == 'q8':
-                tensor = self._quantize_fp32_to_int8(tensor)
-            
-            tensor_data[name] = tensor
-        
-        # Save as GGUF (simplified format)
-        gguf_data = {
-            'version': self.gguf_version,
-            'metadata': metadata,
-            'tensors': {
-                name: {
-                    'shape': list(tensor.shape),
-                    'dtype': str(tensor.dtype),
-                    'data': tensor.cpu().numpy().tobytes(),
-                }
-                for name, tensor in tensor_data.items()
-            }
-        }
-        
-        # Save to file
-        import pickle
+        # Stream tensors straight to disk: each one is quantized, written and released
+        # before the next, so peak memory stays at the model's own state dict
         with open(output_path, 'wb') as f:
-            pickle.dump(gguf_data, f)
+            header = (
+                _GGUF_MAGIC
+                + struct.pack('<IQQ', self.gguf_version, len(state_dict), len(metadata))
+                + b''.join(_gguf_kv(key, value) for key, value in metadata.items())
+                + b''.join(tensor_infos)
+            )
+            f.write(header)
+            position = _pad(f, len(header))
+            
+            for i, ((name, tensor), ggml_type) in enumerate(zip(state_dict.items(), export_types)):
+                if verbose and i % 10 == 0:
+                    print(f"  Processing tensor {i}: {name}")
+                
+                # Quantize if needed
+                if ggml_type == _GGML_TYPES[torch.float16]:
+                    tensor = self._quantize_fp32_to_fp16(tensor)
+                elif ggml_type == _GGML_Q8_0:
+                    tensor = self._quantize_fp32_to_q8_0(tensor)
+                
+                data = tensor.detach().cpu().contiguous().numpy()
+                data.tofile(f)
+                position = _pad(f, position + data.nbytes)
+                del tensor, data
         
         file_size_mb = output_path.stat().st_size / (1024 * 1024)
         
@@ -224,7 +303,7 @@ def get_quantization_info(original_size_mb: float, quantization: str) -> Dict:
     compression_ratios = {
         'fp32': 1.0,
         'fp16': 0.5,
-        'q8': 0.25,
+        'q8': _Q8_0_BLOCK_BYTES / (4 * _Q8_0_BLOCK),  # fp16 scale per 32 int8s
     }
     
     ratio = compression_ratios.get(quantization, 1.0)
@@ -14,6 +14,10 @@ import random
 
 logger = logging.getLogger(__name__)
 
+# Sentence connectors drawn by _add_connector, and one process-wide generator for the draws
+_CONNECTORS = ('That', 'It', 'This', 'So', 'Overall')
+_RNG = random.Random()
+
 
 class NaturalResponseEnhancer:
     """Enhances response naturalness without markers or unnatural phrasing"""
@@ -186,8 +190,7 @@ class NaturalResponseEnhancer:
     
     def _add_connector(self, match) -> str:
         """Add natural connectors between sentences"""
-        connectors = ['That', 'It', 'This', 'So', 'Overall']
-        return match.group(1) + ' ' + random.choice(connectors) + ' ' + match.group(2)
+        return match.group(1) + ' ' + _RNG.choice(_CONNECTORS) + ' ' + match.group(2)
     
     def _enhance_with_context(self, text: str, context: Dict[str, Any]) -> str:
         """Enhance response with contextual awareness"""
@@ -0,0 +1,214 @@
+"""
+Semantic response cache for Codette.
+
+Sits behind the exact-match query cache in AICore: prompts are embedded with a small
+sentence-embedding model and a near-duplicate prompt (cosine similarity above the
+threshold) reuses the stored response instead of running the language model again.
+Opt-in via CODETTE_SEMANTIC_CACHE=1.
+"""
+
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Dict, List, Optional
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    import hnswlib
+except Exception:
+    hnswlib = None
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9']+")
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+
+
+class SemanticResponseCache:
+    """LRU cache of responses keyed by prompt embeddings, searched by nearest neighbour.
+
+    The encoder is loaded on first use. With hnswlib installed lookups go through an
+    HNSW index; otherwise a brute-force dot product over the (small) entry set is used.
+    Entries older than ``ttl_seconds`` are dropped when a lookup lands on them.
+    
+    Similarity alone is not enough to reuse an answer ("what is 2+3" and "what is 2+4"
+    embed almost identically), so every entry also carries an exact-match key from
+    entry_key(): the caller's context plus the literals of the prompt.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        threshold: float = 0.92,
+        max_entries: int = 512,
+        ttl_seconds: Optional[float] = None,
+        short_prompt_words: int = 8
+    ):
+        self.model_name = model_name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.short_prompt_words = short_prompt_words
+        self.hits = 0
+        self.misses = 0
+
+        self._encoder = None
+        self._encoder_failed = False
+        self._index = None
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._vectors: Dict[int, Any] = {}
+        self._next_label = 0
+        self._lock = RLock()
+
+    @classmethod
+    def from_env(cls, ttl_seconds: Optional[float] = None) -> Optional["SemanticResponseCache"]:
+        """Build a cache from CODETTE_SEMANTIC_CACHE* settings, or None when disabled."""
+        if os.getenv("CODETTE_SEMANTIC_CACHE", "").lower() not in ("1", "true", "yes", "on"):
+            return None
+        if np is None:
+            return None
+        try:
+            threshold = float(os.getenv("CODETTE_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        except ValueError:
+            threshold = 0.92
+        return cls(
+            model_name=os.getenv("CODETTE_SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2"),
+            threshold=threshold,
+            ttl_seconds=ttl_seconds
+        )
+
+    def _get_encoder(self):
+        """Load the sentence-embedding model once; failures disable the cache."""
+        if self._encoder is None and not self._encoder_failed:
+            try:
+                from sentence_transformers import SentenceTransformer
+                self._encoder = SentenceTransformer(self.model_name)
+                logger.info(f"Semantic cache encoder loaded: {self.model_name}")
+            except Exception as e:
+                self._encoder_failed = True
+                logger.debug(f"Semantic cache disabled, encoder unavailable: {e}")
+        return self._encoder
+
+    def embed(self, prompt: str):
+        """Unit-norm embedding for a prompt, or None when no encoder is available."""
+        encoder = self._get_encoder()
+        if encoder is None:
+            return None
+        try:
+            return np.asarray(encoder.encode(prompt, normalize_embeddings=True), dtype=np.float32)
+        except Exception as e:
+            logger.debug(f"Semantic cache embedding failed: {e}")
+            return None
+
+    def entry_key(self, prompt: str, context: Any = None) -> int:
+        """Exact-match key a cached entry must share with the prompt being looked up.
+        
+        Combines ``context`` (anything hashable, e.g. recent conversation and active
+        perspectives) with the prompt's numbers. Prompts shorter than short_prompt_words
+        contribute every word, since a single changed word flips their meaning while
+        barely moving the embedding.
+        """
+        words = _WORD_RE.findall(prompt.lower())
+        literals = words if len(words) < self.short_prompt_words else _NUMBER_RE.findall(prompt)
+        return hash((context, tuple(literals)))
+
+    def _ensure_index(self, dim: int) -> None:
+        if self._index is not None or hnswlib is None:
+            return
+        try:
+            index = hnswlib.Index(space="ip", dim=dim)
+            index.init_index(max_elements=self.max_entries, allow_replace_deleted=True)
+            self._index = index
+        except Exception as e:
+            logger.debug(f"HNSW index unavailable, using brute-force search: {e}")
+
+    def _remove(self, label: int) -> None:
+        """Drop an entry and its vector; the caller holds the lock."""
+        self._entries.pop(label, None)
+        self._vectors.pop(label, None)
+        if self._index is not None:
+            self._index.mark_deleted(label)
+
+    def lookup(self, embedding, key: Any = None) -> Optional[Dict[str, Any]]:
+        """Return the nearest entry stored under ``key`` if it clears the threshold and is fresh."""
+        if embedding is None:
+            return None
+        with self._lock:
+            labels = [label for label, entry in self._entries.items() if entry["key"] == key]
+            if not labels:
+                self.misses += 1
+                return None
+            if self._index is not None:
+                allowed = set(labels)
+                labels, distances = self._index.knn_query(embedding, k=1, filter=allowed.__contains__)
+                label = int(labels[0][0])
+                similarity = 1.0 - float(distances[0][0])
+            else:
+                similarities = np.stack([self._vectors[l] for l in labels]) @ embedding
+                best = int(np.argmax(similarities))
+                label = labels[best]
+                similarity = float(similarities[best])
+
+            entry = self._entries.get(label)
+            if entry is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+            if self.ttl_seconds is not None and time.time() - entry["timestamp"] > self.ttl_seconds:
+                # Expired: evict lazily on lookup, like AICore's fallback query cache
+                self._remove(label)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(label)
+            self.hits += 1
+            return entry
+
+    def store(
+        self,
+        embedding,
+        response: str,
+        active_perspectives: List[str],
+        latency: float,
+        key: Any = None
+    ) -> None:
+        """Add a response for an embedded prompt under ``key``, evicting the least recently used entry."""
+        if embedding is None or not response:
+            return
+        with self._lock:
+            self._ensure_index(embedding.shape[0])
+            if len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+            label = self._next_label
+            self._next_label += 1
+            if self._index is not None:
+                self._index.add_items(embedding[None, :], [label], replace_deleted=True)
+            else:
+                self._vectors[label] = embedding
+            self._entries[label] = {
+                "response": response,
+                "active_perspectives": list(active_perspectives),
+                "latency": latency,
+                "timestamp": time.time(),
+                "key": key
+            }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0
+            }
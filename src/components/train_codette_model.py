@@ -165,7 +165,7 @@ class CodettTrainer:
         input_ids = batch[:, :-1]
         target_ids = batch[:, 1:]
         
-        logits, _ = self.model(input_ids)
+        logits = self.model(input_ids)[0]
         
         # Reshape for loss computation
         batch_size, seq_len, vocab_size = logits.shape
@@ -213,7 +213,7 @@ class CodettTrainer:
                     input_ids = batch[:, :-1]
                     target_ids = batch[:, 1:]
                     
-                    logits, _ = self.model(input_ids)
+                    logits = self.model(input_ids)[0]
                     loss = self.criterion(
                         logits.view(-1, self.model.config.vocab_size),
                         target_ids.view(-1)
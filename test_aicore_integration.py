@@ -128,7 +128,7 @@ def test_response_memory_management():
         f"Memory limit exceeded: {len(core.response_memory)} > {core.response_memory_limit * 2}"
 
     print(f"\nStored responses (most recent):")
-    for i, resp in enumerate(core.response_memory[-5:], 1):
+    for i, resp in enumerate(list(core.response_memory)[-5:], 1):
         print(f"  {i}. {resp[:50]}...")
 
     print("\n✔ Test 4 PASSED: Response memory management works correctly")
@@ -0,0 +1,158 @@
+"""
+Test the BioKinetic mesh routing, pruning and persistence
+=========================================================
+Routing is checked against a plain NumPy reference argmax; pruning and
+save/load (NPZ archive and legacy JSON state) against the CSR arrays.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+np = pytest.importorskip("numpy")
+
+from components.biokinetic_mesh import BioKineticMesh
+
+NODES = 64
+
+
+def _mesh(**kwargs):
+    return BioKineticMesh(initial_nodes=NODES, seed=7, **kwargs)
+
+
+def _reference_scores(mesh, pattern, context=None):
+    """Cosine similarity plus kinetic boost, scaled by context similarity, in float64."""
+    patterns = mesh.pattern_matrix.astype(np.float64)
+    norms = np.linalg.norm(patterns, axis=1)
+    scores = patterns @ pattern / (norms * np.linalg.norm(pattern))
+    scores += mesh.kinetic_states * mesh.learning_rate
+    if context:
+        context_pattern = mesh._context_to_pattern(context).astype(np.float64)
+        scores *= 1.0 + 0.5 * (patterns @ context_pattern) / (norms * np.linalg.norm(context_pattern))
+    return scores
+
+
+@pytest.mark.parametrize("context", [None, {"mode": "analysis", "priority": 3}])
+def test_route_intent_matches_reference_argmax(context):
+    mesh = _mesh()
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        pattern = rng.random(128)
+        scores = _reference_scores(mesh, pattern, context)
+        node_id, confidence = mesh.route_intent(pattern, context)
+        best = int(np.argmax(scores))
+        # Ties within float32 precision may pick either node; the score must still be the best
+        assert confidence == pytest.approx(scores[best], abs=1e-4)
+        assert scores[mesh._node_index[node_id]] == pytest.approx(scores[best], abs=1e-4)
+
+
+@pytest.mark.parametrize("context", [None, {"mode": "analysis", "priority": 3}])
+def test_route_intents_agrees_with_route_intent(context):
+    patterns = np.random.default_rng(1).random((8, 128))
+
+    # Row by row, the batch API follows the same kinetic trajectory as route_intent
+    single, batched = _mesh(), _mesh()
+    for pattern in patterns:
+        node_id, confidence = single.route_intent(pattern, context)
+        (route,), = batched.route_intents(pattern[None, :], context)
+        assert route[0] == node_id
+        assert route[1] == pytest.approx(confidence, abs=1e-4)
+    np.testing.assert_allclose(batched.kinetic_states, single.kinetic_states, atol=1e-5)
+
+    # A whole batch is scored against the starting kinetic state
+    routes = _mesh().route_intents(patterns, context, k=3)
+    for pattern, top in zip(patterns, routes):
+        node_id, confidence = _mesh().route_intent(pattern, context)
+        assert len(top) == 3
+        assert top[0] == (node_id, pytest.approx(confidence, abs=1e-4))
+        assert [score for _, score in top] == sorted((score for _, score in top), reverse=True)
+
+
+def test_prune_drops_sub_threshold_edges():
+    mesh = _mesh(prune_threshold=0.5)
+    before = {node_id: mesh.get_connections(node_id) for node_id in mesh._node_id_list}
+    assert any(w < 0.5 for conns in before.values() for w in conns.values())
+
+    mesh.prune_connections()
+    assert len(mesh.conn_indptr) == NODES + 1
+    assert mesh.conn_indptr[-1] == len(mesh.conn_neighbors) == len(mesh.conn_weights)
+    for node_id, old in before.items():
+        kept = {target: w for target, w in old.items() if w >= 0.5}
+        after = mesh.get_connections(node_id)
+        assert set(after) == set(kept)
+        if kept:
+            # Surviving weights are renormalized per node
+            total = sum(kept.values())
+            for target, weight in after.items():
+                assert weight == pytest.approx(kept[target] / total, rel=1e-5)
+
+
+def _assert_same_mesh(loaded, mesh):
+    assert loaded._node_id_list == mesh._node_id_list
+    np.testing.assert_allclose(loaded.pattern_matrix, mesh.pattern_matrix)
+    np.testing.assert_allclose(loaded.kinetic_states, mesh.kinetic_states)
+    for node_id in mesh._node_id_list:
+        assert loaded.nodes[node_id].energy == mesh.nodes[node_id].energy
+        expected = mesh.get_connections(node_id)
+        actual = loaded.get_connections(node_id)
+        assert set(actual) == set(expected)
+        for target, weight in expected.items():
+            assert actual[target] == pytest.approx(weight, rel=1e-6)
+    assert loaded.learning_rate == mesh.learning_rate
+    assert loaded.prune_threshold == mesh.prune_threshold
+
+    pattern = np.random.default_rng(3).random(128)
+    assert loaded.route_intent(pattern)[0] == mesh.route_intent(pattern)[0]
+
+
+def _trained_mesh():
+    mesh = _mesh(learning_rate=0.05, prune_threshold=0.2)
+    for pattern in np.random.default_rng(2).random((5, 128)):
+        mesh.route_intent(pattern)
+    mesh.prune_connections()
+    return mesh
+
+
+def test_save_load_npz_round_trip(tmp_path):
+    mesh = _trained_mesh()
+    path = tmp_path / "mesh_state.npz"
+    mesh.save_state(path)
+
+    loaded = BioKineticMesh(initial_nodes=4)
+    loaded.load_state(path)
+    _assert_same_mesh(loaded, mesh)
+
+
+def test_load_legacy_json_state(tmp_path):
+    mesh = _trained_mesh()
+    state = {
+        "nodes": {
+            node_id: {
+                "energy": mesh.nodes[node_id].energy,
+                "activation_pattern": mesh.nodes[node_id].activation_pattern.tolist(),
+                "kinetic_state": float(mesh.kinetic_states[i]),
+                "connections": mesh.get_connections(node_id)
+            }
+            for i, node_id in enumerate(mesh._node_id_list)
+        },
+        "params": {
+            "energy_threshold": mesh.energy_threshold,
+            "learning_rate": mesh.learning_rate,
+            "prune_threshold": mesh.prune_threshold
+        }
+    }
+    path = tmp_path / "mesh_state.json"
+    path.write_text(json.dumps(state))
+
+    loaded = BioKineticMesh(initial_nodes=4)
+    loaded.load_state(path)
+    _assert_same_mesh(loaded, mesh)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,58 @@
+"""
+Test per-call cocoon state in AICore.generate_text
+==================================================
+The AEGIS bridge calls generate_text again from inside an outer call; each
+call must save a cocoon with its own consciousness snapshot.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from test_session_kv import _make_core
+
+
+class NestingBridge:
+    """Stands in for AegisBridge.enhance_response, which re-enters generate_text."""
+
+    def __init__(self, core):
+        self.core = core
+        self.calls = 0
+
+    def enhance_response(self, prompt, response):
+        self.calls += 1
+        self.core.generate_text(f"Enhance: {response}", use_aegis=False)
+        return {}
+
+
+def test_nested_generate_text_keeps_outer_cocoon(monkeypatch):
+    core = _make_core(session_kv_enabled=False)
+    cocoons = []
+    core.cocoon_manager = object()
+    monkeypatch.setattr(type(core), "_queue_cocoon", lambda self, data: cocoons.append(data))
+    core.set_aegis_bridge(NestingBridge(core))
+    for exchange in ("User: hi|Codette: hello", "User: how|Codette: fine"):
+        core.response_memory.append(exchange)
+    outer_memory_size = len(core.response_memory)
+
+    core.generate_text("Tell me about the sea")
+
+    assert core.aegis_bridge.calls == 1
+    # The inner call finishes (and queues its cocoon) first
+    inner, outer = cocoons
+    assert outer is not inner
+    assert outer["timestamp"] < inner["timestamp"]
+    assert outer["memory_size"] == outer_memory_size
+    assert inner["memory_size"] == outer_memory_size
+    assert outer["latency"]["total_seconds"] > inner["latency"]["total_seconds"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,89 @@
+"""
+Test batched async generation
+=============================
+Exercises the micro-batching worker and generate_text_batch against the tiny
+offline GPT-2 from test_session_kv.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from test_session_kv import _make_core
+from components import ai_core_async_methods
+from components.ai_core_async_methods import REALITY_ANCHOR
+from components.response_templates import get_response_templates
+
+
+def _run_batch(core, prompts):
+    """Queue the prompts, let the worker drain them as one batch and collect the results."""
+    async def run():
+        queue = asyncio.Queue()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for prompt in prompts:
+            future = loop.create_future()
+            futures.append(future)
+            queue.put_nowait((prompt, future))
+        worker = asyncio.create_task(ai_core_async_methods._generation_batch_worker(core, queue))
+        try:
+            return await asyncio.wait_for(asyncio.gather(*futures), timeout=300)
+        finally:
+            worker.cancel()
+
+    return asyncio.run(run())
+
+
+def test_batch_worker_resolves_prompts_without_room():
+    """Empty and over-long prompts get the fallback; the rest still go through the model."""
+    core = _make_core(session_kv_enabled=False)
+    core.max_batch_size = 8
+    core.max_batch_wait_ms = 50
+    assert core._ensure_generation_assets()
+    assert core._anchor_token_ids
+
+    long_context = "User: tell me more\nCodette: sure\n" * 100
+    prompts = [
+        f"{REALITY_ANCHOR}User: hello\nCodette:",
+        f"{REALITY_ANCHOR}{long_context}User: hello\nCodette:",
+        REALITY_ANCHOR,
+    ]
+    results = _run_batch(core, prompts)
+
+    fallbacks = set(get_response_templates().empty_response_fallbacks)
+    assert results[1] in fallbacks
+    assert results[2] in fallbacks
+    assert "CORE IDENTITY" not in results[0]
+
+
+def test_generate_text_batch_keeps_prompt_suffix():
+    """Over-long prompts are truncated from the left so the question survives."""
+    core = _make_core(session_kv_enabled=False)
+    config = transformers.GenerationConfig(
+        max_new_tokens=1,
+        do_sample=False,
+        pad_token_id=core.tokenizer.eos_token_id
+    )
+    prompt = "x" * 40 + "User: hi\nCodette:"
+    prefix_ids = core.tokenizer("ANCHOR ", add_special_tokens=False)["input_ids"]
+
+    plain, = core.generate_text_batch([prompt], max_length=16, generation_config=config)
+    assert plain.startswith(prompt[-16:])
+    assert "x" * 17 not in plain
+
+    prefixed, = core.generate_text_batch(
+        [prompt], max_length=16 + len(prefix_ids), generation_config=config, prefix_ids=prefix_ids
+    )
+    assert prefixed.startswith("ANCHOR " + prompt[-16:])
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,164 @@
+"""
+Test GGUF export of the CustomTransformer
+========================================
+Exports a tiny model, parses the file back with struct and compares every
+dequantized tensor against the model's state dict.
+"""
+
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+torch = pytest.importorskip("torch")
+np = pytest.importorskip("numpy")
+
+from components.custom_transformer import CustomTransformer, TransformerConfig
+from components.model_quantizer import GGUFConverter
+
+GGML_F32, GGML_F16, GGML_Q8_0 = 0, 1, 8
+SCALAR_FORMATS = {0: '<B', 1: '<b', 2: '<H', 3: '<h', 4: '<I', 5: '<i', 6: '<f', 7: '<?', 10: '<Q', 11: '<q', 12: '<d'}
+
+
+class TinyTokenizer:
+    token_to_id = {f"t{i}": i for i in range(97)}
+
+
+class Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def unpack(self, fmt: str):
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values[0] if len(values) == 1 else values
+
+    def string(self) -> str:
+        length = self.unpack('<Q')
+        value = self.data[self.pos:self.pos + length].decode('utf-8')
+        self.pos += length
+        return value
+
+    def value(self, value_type: int):
+        if value_type == 8:
+            return self.string()
+        if value_type == 9:
+            item_type, count = self.unpack('<IQ')
+            return [self.value(item_type) for _ in range(count)]
+        return self.unpack(SCALAR_FORMATS[value_type])
+
+
+def read_gguf(path):
+    """Parse header, metadata and tensor infos; returns (metadata, {name: (type, shape, bytes)})."""
+    data = Path(path).read_bytes()
+    reader = Reader(data)
+    assert data[:4] == b'GGUF'
+    reader.pos = 4
+    version, n_tensors, n_kv = reader.unpack('<IQQ')
+    assert version == 3
+
+    metadata = {}
+    for _ in range(n_kv):
+        key = reader.string()
+        metadata[key] = reader.value(reader.unpack('<I'))
+
+    infos = []
+    for _ in range(n_tensors):
+        name = reader.string()
+        n_dims = reader.unpack('<I')
+        dims = struct.unpack_from(f'<{n_dims}Q', data, reader.pos)
+        reader.pos += 8 * n_dims
+        ggml_type, offset = reader.unpack('<IQ')
+        infos.append((name, tuple(reversed(dims)), ggml_type, offset))
+
+    alignment = metadata.get('general.alignment', 32)
+    data_start = reader.pos + (-reader.pos % alignment)
+    tensors = {}
+    for name, shape, ggml_type, offset in infos:
+        assert offset % alignment == 0
+        numel = int(np.prod(shape))
+        if ggml_type == GGML_Q8_0:
+            nbytes = numel // 32 * 34
+        else:
+            nbytes = numel * {GGML_F32: 4, GGML_F16: 2}[ggml_type]
+        start = data_start + offset
+        tensors[name] = (ggml_type, shape, data[start:start + nbytes])
+    return metadata, tensors
+
+
+def dequantize(ggml_type, shape, raw):
+    if ggml_type == GGML_F32:
+        return np.frombuffer(raw, dtype='<f4').reshape(shape)
+    if ggml_type == GGML_F16:
+        return np.frombuffer(raw, dtype='<f2').astype(np.float32).reshape(shape)
+    assert ggml_type == GGML_Q8_0
+    blocks = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 34)
+    scales = blocks[:, :2].copy().view('<f2').astype(np.float32)
+    values = blocks[:, 2:].copy().view(np.int8).astype(np.float32)
+    return (scales * values).reshape(shape)
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    config = TransformerConfig(
+        vocab_size=97,
+        hidden_size=64,
+        num_hidden_layers=2,
+        num_attention_heads=4,
+        intermediate_size=128,
+        max_sequence_length=64
+    )
+    return CustomTransformer(config).eval()
+
+
+@pytest.mark.parametrize("quantization", ["fp32", "fp16", "q8"])
+def test_export_round_trip(model, quantization, tmp_path):
+    path = GGUFConverter(model, TinyTokenizer()).export_to_gguf(
+        str(tmp_path / f"tiny_{quantization}.gguf"), quantization, verbose=False
+    )
+    metadata, tensors = read_gguf(path)
+
+    assert metadata['general.alignment'] == 32
+    assert metadata['transformer.block_count'] == 2
+    assert metadata['transformer.embedding_length'] == 64
+    assert metadata['tokenizer.ggml.tokens'] == list(TinyTokenizer.token_to_id)
+    assert metadata['tokenizer.ggml.token_type'] == [1] * 97
+
+    state_dict = model.state_dict()
+    assert list(tensors) == list(state_dict)
+    q8_tensors = 0
+    for name, expected in state_dict.items():
+        ggml_type, shape, raw = tensors[name]
+        expected = expected.float().numpy()
+        assert shape == expected.shape, name
+        actual = dequantize(ggml_type, shape, raw)
+
+        if quantization == "fp32":
+            assert ggml_type == GGML_F32
+            np.testing.assert_array_equal(actual, expected)
+        elif quantization == "fp16":
+            assert ggml_type == GGML_F16
+            np.testing.assert_allclose(actual, expected, rtol=1e-3, atol=1e-4)
+        elif expected.ndim >= 2 and shape[-1] % 32 == 0:
+            assert ggml_type == GGML_Q8_0, name
+            q8_tensors += 1
+            # Each value is within half a quantization step of its block's absmax / 127
+            block_absmax = np.abs(expected.reshape(-1, 32)).max(axis=1, keepdims=True)
+            error = np.abs(actual - expected).reshape(-1, 32)
+            assert np.all(error <= block_absmax / 127 * 0.5 + block_absmax * 1e-3 + 1e-6), name
+        else:
+            # Norms, biases and rows that don't split into Q8_0 blocks stay fp32
+            assert ggml_type == GGML_F32, name
+            np.testing.assert_array_equal(actual, expected)
+    if quantization == "q8":
+        assert q8_tensors > 0
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
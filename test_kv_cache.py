@@ -0,0 +1,95 @@
+"""
+Test the CustomTransformer KV cache
+===================================
+Cached decoding (a prefix followed by a chunk, or one token at a time) must
+produce the same logits as a single uncached forward pass, with and without
+a padding attention_mask.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+torch = pytest.importorskip("torch")
+
+from components.custom_transformer import CustomTransformer, TransformerConfig
+
+SEQ_LEN = 12
+PREFIX_LEN = 5
+ATOL = 1e-5
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    config = TransformerConfig(
+        vocab_size=97,
+        hidden_size=64,
+        num_hidden_layers=3,
+        num_attention_heads=4,
+        intermediate_size=128,
+        max_sequence_length=64
+    )
+    return CustomTransformer(config).eval()
+
+
+@pytest.fixture(scope="module")
+def input_ids():
+    torch.manual_seed(1)
+    return torch.randint(0, 97, (2, SEQ_LEN))
+
+
+def _masks():
+    """No mask, and a mask with left padding on the first sequence and a gap in the second."""
+    mask = torch.ones(2, SEQ_LEN, dtype=torch.long)
+    mask[0, :2] = 0
+    mask[1, 6] = 0
+    return [None, mask]
+
+
+def _slice_mask(mask, end):
+    # The cached forward takes the mask over past + current positions
+    return None if mask is None else mask[:, :end]
+
+
+@pytest.mark.parametrize("mask", _masks(), ids=["no_mask", "padding_mask"])
+def test_prefix_then_chunk_matches_full_forward(model, input_ids, mask):
+    with torch.no_grad():
+        full = model(input_ids, attention_mask=mask)[0]
+        prefix_logits, _, past = model(
+            input_ids[:, :PREFIX_LEN], attention_mask=_slice_mask(mask, PREFIX_LEN), use_cache=True
+        )
+        chunk_logits = model(
+            input_ids[:, PREFIX_LEN:], attention_mask=mask, past_key_values=past, use_cache=True
+        )[0]
+
+    torch.testing.assert_close(prefix_logits, full[:, :PREFIX_LEN], atol=ATOL, rtol=0)
+    torch.testing.assert_close(chunk_logits, full[:, PREFIX_LEN:], atol=ATOL, rtol=0)
+
+
+@pytest.mark.parametrize("mask", _masks(), ids=["no_mask", "padding_mask"])
+def test_token_by_token_matches_full_forward(model, input_ids, mask):
+    with torch.no_grad():
+        full = model(input_ids, attention_mask=mask)[0]
+        past = None
+        steps = []
+        for t in range(SEQ_LEN):
+            logits, _, past = model(
+                input_ids[:, t:t + 1],
+                attention_mask=_slice_mask(mask, t + 1),
+                past_key_values=past,
+                use_cache=True
+            )
+            steps.append(logits)
+
+    assert len(past) == model.config.num_hidden_layers
+    assert past[0][0].shape[-2] == SEQ_LEN
+    torch.testing.assert_close(torch.cat(steps, dim=1), full, atol=ATOL, rtol=0)
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
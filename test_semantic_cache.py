@@ -0,0 +1,151 @@
+"""
+Test Codette's semantic response cache
+======================================
+Uses a stub encoder and the brute-force search (hnswlib disabled), so no model
+download or optional index library is needed.
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+np = pytest.importorskip("numpy")
+
+from components import semantic_cache
+from components.semantic_cache import SemanticResponseCache
+
+
+class StubEncoder:
+    """Maps known prompts to fixed unit vectors; unknown prompts fail to encode."""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def encode(self, prompt, normalize_embeddings=True):
+        vector = np.asarray(self.vectors[prompt], dtype=np.float32)
+        return vector / np.linalg.norm(vector) if normalize_embeddings else vector
+
+
+VECTORS = {
+    "what is the weather": [1.0, 0.0, 0.0],
+    "what's the weather": [0.99, 0.1, 0.0],   # cosine ~0.995 with the first prompt
+    "tell me a joke": [0.0, 1.0, 0.0],        # orthogonal
+    "write a poem": [0.0, 0.0, 1.0],
+    "how are you": [0.5, 0.5, 0.7],
+    "what is 2+3": [0.3, 0.3, 0.9],
+    "what is 2+4": [0.3, 0.31, 0.9],          # near-identical embedding, different answer
+    "turn on the kitchen light": [0.9, 0.4, 0.1],
+    "turn off the kitchen light": [0.9, 0.41, 0.1],
+    "could you please explain in detail how tides work on earth": [0.2, 0.9, 0.3],
+    "please explain in detail how the tides work on our earth": [0.2, 0.9, 0.31],
+}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    monkeypatch.setattr(semantic_cache, "hnswlib", None)
+    cache = SemanticResponseCache(threshold=0.92, max_entries=2)
+    cache._encoder = StubEncoder(VECTORS)
+    return cache
+
+
+def test_hit_above_threshold(cache):
+    cache.store(cache.embed("what is the weather"), "Sunny.", ["analytical"], 0.1)
+    entry = cache.lookup(cache.embed("what's the weather"))
+    assert entry is not None
+    assert entry["response"] == "Sunny."
+    assert entry["active_perspectives"] == ["analytical"]
+    assert cache.hits == 1 and cache.misses == 0
+
+
+def test_miss_below_threshold(cache):
+    cache.store(cache.embed("what is the weather"), "Sunny.", [], 0.1)
+    assert cache.lookup(cache.embed("tell me a joke")) is None
+    assert cache.hits == 0 and cache.misses == 1
+
+
+def test_lru_eviction_at_max_entries(cache):
+    cache.store(cache.embed("what is the weather"), "Sunny.", [], 0.1)
+    cache.store(cache.embed("tell me a joke"), "Knock knock.", [], 0.1)
+    # Touch the weather entry so the joke is least recently used
+    assert cache.lookup(cache.embed("what's the weather")) is not None
+    cache.store(cache.embed("write a poem"), "Roses...", [], 0.1)
+
+    assert cache.get_stats()["entries"] == 2
+    assert cache.lookup(cache.embed("tell me a joke")) is None
+    assert cache.lookup(cache.embed("what is the weather"))["response"] == "Sunny."
+    assert cache.lookup(cache.embed("write a poem"))["response"] == "Roses..."
+
+
+def test_expired_entries_miss(cache, monkeypatch):
+    cache.ttl_seconds = 600
+    now = 1_000_000.0
+    monkeypatch.setattr(semantic_cache.time, "time", lambda: now)
+    cache.store(cache.embed("what is the weather"), "Sunny.", [], 0.1)
+
+    now += 599
+    assert cache.lookup(cache.embed("what is the weather")) is not None
+    now += 2
+    assert cache.lookup(cache.embed("what is the weather")) is None
+    assert cache.get_stats()["entries"] == 0
+
+
+def test_missing_embedding_is_a_no_op(cache):
+    cache._encoder = None
+    cache._encoder_failed = True
+    assert cache.embed("what is the weather") is None
+
+    cache.store(None, "Sunny.", [], 0.1)
+    assert cache.lookup(None) is None
+    assert cache.get_stats()["entries"] == 0
+    assert cache.hits == 0 and cache.misses == 0
+
+    # An encoder error is also treated as "no embedding"
+    cache._encoder = StubEncoder(VECTORS)
+    assert cache.embed("unknown prompt") is None
+
+
+def _store_prompt(cache, prompt, response, context=None):
+    cache.store(cache.embed(prompt), response, [], 0.1, key=cache.entry_key(prompt, context))
+
+
+def _lookup_prompt(cache, prompt, context=None):
+    return cache.lookup(cache.embed(prompt), cache.entry_key(prompt, context))
+
+
+def test_distinct_short_queries_do_not_collide(cache):
+    _store_prompt(cache, "what is 2+3", "5")
+    _store_prompt(cache, "turn on the kitchen light", "Light on.")
+    # Similar enough to clear the threshold on their own
+    similarity = float(cache.embed("what is 2+3") @ cache.embed("what is 2+4"))
+    assert similarity > cache.threshold
+
+    assert _lookup_prompt(cache, "what is 2+4") is None
+    assert _lookup_prompt(cache, "turn off the kitchen light") is None
+    assert _lookup_prompt(cache, "what is 2+3")["response"] == "5"
+
+
+def test_long_paraphrase_hits_within_the_same_context(cache):
+    long_prompt = "could you please explain in detail how tides work on earth"
+    paraphrase = "please explain in detail how the tides work on our earth"
+    _store_prompt(cache, long_prompt, "The moon...", context=("history-a", ("scientific",)))
+
+    assert _lookup_prompt(cache, paraphrase, context=("history-a", ("scientific",)))["response"] == "The moon..."
+    # Another conversation or perspective set never reuses the answer
+    assert _lookup_prompt(cache, paraphrase, context=("history-b", ("scientific",))) is None
+    assert _lookup_prompt(cache, paraphrase, context=("history-a", ("creative",))) is None
+
+
+def test_disabled_unless_opted_in(monkeypatch):
+    monkeypatch.delenv("CODETTE_SEMANTIC_CACHE", raising=False)
+    assert SemanticResponseCache.from_env() is None
+    monkeypatch.setenv("CODETTE_SEMANTIC_CACHE", "1")
+    assert SemanticResponseCache.from_env(ttl_seconds=600).ttl_seconds == 600
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))
@@ -0,0 +1,196 @@
+"""
+Test AICore session KV-cache reuse
+==================================
+Runs generate_text against a tiny randomly initialised GPT-2 with a byte-level
+tokenizer, so no model download is needed.
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent / "src"))
+
+torch = pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+tokenizers = pytest.importorskip("tokenizers")
+
+os.environ["CODETTE_DRAFT_MODEL_ID"] = "none"
+
+from components.ai_core import AICore, REALITY_PREFIX
+
+
+def _byte_tokenizer():
+    """Byte-level BPE tokenizer with no merges: one token per byte plus an EOS token."""
+    alphabet = tokenizers.pre_tokenizers.ByteLevel.alphabet()
+    vocab = {char: idx for idx, char in enumerate(sorted(alphabet))}
+    vocab["<|endoftext|>"] = len(vocab)
+    backend = tokenizers.Tokenizer(tokenizers.models.BPE(vocab=vocab, merges=[]))
+    backend.pre_tokenizer = tokenizers.pre_tokenizers.ByteLevel(add_prefix_space=False)
+    backend.decoder = tokenizers.decoders.ByteLevel()
+    return transformers.PreTrainedTokenizerFast(tokenizer_object=backend, eos_token="<|endoftext|>")
+
+
+def _make_core(session_kv_enabled: bool) -> AICore:
+    torch.manual_seed(0)
+    tokenizer = _byte_tokenizer()
+    config = transformers.GPT2Config(
+        vocab_size=len(tokenizer),
+        n_positions=1024,
+        n_embd=32,
+        n_layer=2,
+        n_head=2,
+        bos_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id
+    )
+    core = AICore(test_mode=True)
+    core.test_mode = False
+    core.model = transformers.GPT2LMHeadModel(config).eval()
+    core.model.generation_config.pad_token_id = tokenizer.eos_token_id
+    core.tokenizer = tokenizer
+    core.session_kv_enabled = session_kv_enabled
+    return core
+
+
+def test_draft_model_is_opt_in(monkeypatch):
+    """Without CODETTE_DRAFT_MODEL_ID no second model is loaded."""
+    monkeypatch.delenv("CODETTE_DRAFT_MODEL_ID", raising=False)
+    core = _make_core(session_kv_enabled=False)
+    monkeypatch.setattr(
+        transformers.AutoModelForCausalLM, "from_pretrained",
+        classmethod(lambda cls, *args, **kwargs: pytest.fail("draft model loaded"))
+    )
+    assert core._load_draft_model() is None
+
+
+def test_beam_search_default_skips_session_kv():
+    """Without the switch generate_text keeps beam search and never caches KV."""
+    core = _make_core(session_kv_enabled=False)
+    assert core._ensure_generation_assets()
+    assert core._text_generation_config.num_beams == 5
+    assert not core._reuses_kv(core._text_generation_config)
+    # The preamble cache would never be read, so it isn't prefilled
+    assert core._reality_prefix_ids is not None
+    assert core._reality_prefix_kv is None
+
+    core.generate_text("Hello there", session_id="alice")
+    assert len(core._session_kv) == 0
+
+
+def test_session_kv_switch_enables_greedy_reuse():
+    """CODETTE_SESSION_KV selects greedy decoding and stores each session's cache."""
+    core = _make_core(session_kv_enabled=True)
+    assert core._ensure_generation_assets()
+    assert core._text_generation_config.num_beams == 1
+    assert core._reuses_kv(core._text_generation_config)
+    assert core._reality_prefix_kv is not None
+
+    core.generate_text("Hello there", session_id="alice")
+    core.generate_text("How are you?", session_id="bob")
+    assert list(core._session_kv) == ["alice", "bob"]
+
+    cached_ids, _, nbytes, _ = core._session_kv["alice"]
+    prefix_ids = core.tokenizer(REALITY_PREFIX, add_special_tokens=False)["input_ids"]
+    assert cached_ids[0, :len(prefix_ids)].tolist() == prefix_ids
+    assert nbytes > 0
+
+
+def _run_turns(core, prompts, session_id="alice"):
+    """Generate each prompt on one session; returns (responses, KV taken per turn).
+    
+    Completions are kept short so three turns fit the 512-token transcript budget.
+    """
+    core._ensure_generation_assets()
+    core._text_generation_config.max_new_tokens = 16
+    taken = []
+    take = type(core)._take_session_kv
+
+    def recording_take(self, session_key, input_ids):
+        past_key_values = take(self, session_key, input_ids)
+        if self is core:
+            taken.append(past_key_values is not None)
+        return past_key_values
+
+    type(core)._take_session_kv = recording_take
+    try:
+        responses = [core.generate_text(prompt, session_id=session_id) for prompt in prompts]
+    finally:
+        type(core)._take_session_kv = take
+    return responses, taken
+
+
+def test_second_turn_reuses_session_kv():
+    """Turn N+1 continues turn N's transcript, so its cached KV is resumed."""
+    prompts = ["Hello there", "What is the tide?", "And the moon?"]
+    cached = _make_core(session_kv_enabled=True)
+    responses, taken = _run_turns(cached, prompts)
+    assert taken == [False, True, True]
+
+    history = cached._session_history("alice")
+    transcript = cached.tokenizer.decode(history[0])
+    assert transcript.startswith(REALITY_PREFIX)
+    assert "User: What is the tide?\nCodette:" in transcript
+    assert "User: And the moon?\nCodette:" in transcript
+
+
+def test_session_kv_output_matches_uncached_run(monkeypatch):
+    """Resuming from the cached KV gives the same greedy output as prefilling everything."""
+    prompts = ["Hello there", "What is the tide?", "And the moon?"]
+    cached = _make_core(session_kv_enabled=True)
+    uncached = _make_core(session_kv_enabled=True)
+    cached_responses, cached_taken = _run_turns(cached, prompts)
+
+    # Same transcript-building path, but the KV is never handed to generate()
+    take = type(uncached)._take_session_kv
+    monkeypatch.setattr(
+        type(uncached), "_take_session_kv",
+        lambda self, key, ids: None if self is uncached else take(self, key, ids)
+    )
+    uncached._ensure_generation_assets()
+    uncached._text_generation_config.max_new_tokens = 16
+    uncached_responses = [uncached.generate_text(prompt, session_id="alice") for prompt in prompts]
+
+    assert cached_taken == [False, True, True]
+    assert cached_responses == uncached_responses
+    assert torch.equal(cached._session_history("alice"), uncached._session_history("alice"))
+
+
+def test_take_session_kv_requires_strict_prefix():
+    core = _make_core(session_kv_enabled=True)
+    cache = ((torch.zeros(1, 2, 3, 4), torch.zeros(1, 2, 3, 4)),)
+    sequences = torch.tensor([[1, 2, 3, 9]])
+
+    core._store_session_kv("s", sequences, cache)
+    assert core._take_session_kv("s", torch.tensor([[1, 2, 3, 4, 5]])) is cache
+    # Taking pops the entry
+    assert core._take_session_kv("s", torch.tensor([[1, 2, 3, 4, 5]])) is None
+
+    core._store_session_kv("s", sequences, cache)
+    assert core._take_session_kv("s", torch.tensor([[1, 2, 7, 4, 5]])) is None
+    core._store_session_kv("s", sequences, cache)
+    assert core._take_session_kv("s", torch.tensor([[1, 2, 3]])) is None
+
+
+def test_session_kv_lru_bounds():
+    core = _make_core(session_kv_enabled=True)
+    layer = (torch.zeros(1, 2, 3, 4), torch.zeros(1, 2, 3, 4))
+    entry_bytes = sum(t.numel() * t.element_size() for t in layer)
+    sequences = torch.tensor([[1, 2, 3]])
+
+    core.session_kv_max_entries = 2
+    for key in ("a", "b", "c"):
+        core._store_session_kv(key, sequences, (layer,))
+    assert list(core._session_kv) == ["b", "c"]
+
+    core.session_kv_max_entries = 8
+    core.session_kv_max_bytes = 2 * entry_bytes
+    core._store_session_kv("b", sequences, (layer,))
+    core._store_session_kv("d", sequences, (layer,))
+    assert list(core._session_kv) == ["b", "d"]
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-q"]))